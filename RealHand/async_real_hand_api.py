@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys, os
+import asyncio
+import functools
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from real_hand_api import RealHandApi
+from utils.color_msg import ColorMsg
+
+
+class AsyncRealHandApi:
+    '''
+    asyncio front end for RealHandApi, so one event loop can drive many hands.
+
+    On CAN hands queries never block the loop: the getter runs once in the default executor to send
+    all of its requests back-to-back, the coroutine awaits the replies completed by the shared
+    receive thread, then the getter runs again in the executor to assemble the result without
+    sending. Concurrent queries on several hands (asyncio.gather) therefore share one bus round trip.
+    A getter that picks its requests from an earlier reply (get_touch_type) may need a request the
+    send pass skipped on stale state, the read pass reports it and the query takes another round,
+    up to QUERY_ROUNDS before the blocking getter is used.
+    CAN writes pace their frames with short sleeps and run in the loop's default executor.
+    O6/L6/L10 RS485 hands use the native async Modbus backend instead of RealHandApi.
+
+        hand = await AsyncRealHandApi.open(hand_type="right", hand_joint="L10")
+        state = await hand.get_state()
+    '''
+    # Send/await/read rounds of a CAN query before falling back to the blocking getter
+    QUERY_ROUNDS = 3
+    # AsyncRealHandApi method -> AsyncRealHandRS485 method
+    RS485_CALLS = {
+        "finger_move": "set_joint_positions",
+        "set_speed": "set_speed",
+        "set_joint_speed": "set_speed",
+        "set_torque": "set_torque",
+        "get_state": "get_state",
+        "get_speed": "get_speed",
+        "get_joint_speed": "get_joint_speed",
+        "get_torque": "get_torque",
+        "get_temperature": "get_temperature",
+        "get_fault": "get_fault",
+        "get_embedded_version": "get_version",
+        "get_touch_type": "get_touch_type",
+        "get_matrix_touch": "get_matrix_touch",
+        "get_matrix_frame": "get_matrix_frame",
+    }
+
+    def __init__(self, api=None, rs485=None):
+        self.api = api
+        self.rs485 = rs485
+        if rs485 is not None:
+            self.hand = rs485
+            self.hand_joint = rs485.hand_joint
+            self.hand_type = "left" if rs485.slave == 0x28 else "right"
+        else:
+            self.hand = api.hand
+            self.hand_joint = api.hand_joint
+            self.hand_type = api.hand_type
+        # RS485 drivers have no reply waiter
+        self.reply_waiter = getattr(self.hand, "reply_waiter", None)
+
+    @classmethod
+    async def open(cls, hand_type="left", hand_joint="L10", modbus="None", can="can0", interface=None):
+        '''Create the hand without blocking the loop'''
+        if modbus != "None" and hand_joint.upper() in ("O6", "L6", "L10"):
+            from core.rs485.async_real_hand_rs485 import AsyncRealHandRS485
+            hand_id = 0x28 if hand_type == "left" else 0x27
+            rs485 = AsyncRealHandRS485(hand_joint, hand_id=hand_id, modbus_port=modbus, baudrate=115200)
+            return cls(rs485=await rs485.connect())
+        loop = asyncio.get_running_loop()
+        api = await loop.run_in_executor(None, functools.partial(
+            RealHandApi, hand_type=hand_type, hand_joint=hand_joint, modbus=modbus, can=can, interface=interface))
+        return cls(api)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _rs485(self, name, *args):
+        method = self.RS485_CALLS.get(name)
+        if method is None:
+            ColorMsg(msg=f"{name} is not supported on {self.hand_joint} RS485", color="yellow")
+            return None
+        return await getattr(self.rs485, method)(*args)
+
+    async def _call(self, name, *args):
+        if self.rs485 is not None:
+            return await self._rs485(name, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(getattr(self.api, name), *args))
+
+    def _send_pass(self, method, args):
+        waiter = self.reply_waiter
+        waiter.defer()
+        try:
+            method(*args)
+        finally:
+            pending = waiter.finish()
+        return pending
+
+    def _read_pass(self, method, args, pending):
+        waiter = self.reply_waiter
+        waiter.collect(pending)
+        try:
+            result = method(*args)
+            return result, waiter.missed()
+        finally:
+            waiter.finish()
+
+    async def _query(self, name, *args):
+        waiter = self.reply_waiter
+        if waiter is None:
+            return await self._call(name, *args)
+        loop = asyncio.get_running_loop()
+        method = getattr(self.api, name)
+        for _ in range(self.QUERY_ROUNDS):
+            pending = await loop.run_in_executor(None, self._send_pass, method, args)
+            if pending:
+                # Replies come back in request order, allow the same total time as the blocking getter
+                mark = {}
+                for keys, _ in pending:
+                    for key, count in keys.items():
+                        mark[key] = min(count, mark.get(key, count))
+                await waiter.wait_async(mark, sum(timeout for _, timeout in pending))
+            result, missed = await loop.run_in_executor(None, self._read_pass, method, args, pending)
+            if not missed:
+                return result
+            # The getter branched on a reply and needs a request the send pass did not make, the
+            # next round sends it with the state just read
+        return await self._call(name, *args)
+
+    async def call(self, name, *args):
+        '''Run any other RealHandApi method, in the default executor on CAN hands'''
+        return await self._call(name, *args)
+
+    ''' -------------------Commands---------------------- '''
+    async def finger_move(self, pose=[]):
+        return await self._call("finger_move", pose)
+
+    async def set_speed(self, speed=[100]*5):
+        return await self._call("set_speed", speed)
+
+    async def set_joint_speed(self, speed=[100]*5):
+        return await self._call("set_joint_speed", speed)
+
+    async def set_torque(self, torque=[180]*5):
+        return await self._call("set_torque", torque)
+
+    async def set_current(self, current=[250]*5):
+        return await self._call("set_current", current)
+
+    async def clear_faults(self):
+        return await self._call("clear_faults")
+
+    async def set_enable(self):
+        return await self._call("set_enable")
+
+    async def set_disable(self):
+        return await self._call("set_disable")
+
+    ''' -------------------Queries---------------------- '''
+    async def get_state(self):
+        return await self._query("get_state")
+
+    async def get_speed(self):
+        return await self._query("get_speed")
+
+    async def get_joint_speed(self):
+        return await self._query("get_joint_speed")
+
+    async def get_torque(self):
+        return await self._query("get_torque")
+
+    async def get_temperature(self):
+        return await self._query("get_temperature")
+
+    async def get_fault(self):
+        return await self._query("get_fault")
+
+    async def get_current(self):
+        return await self._query("get_current")
+
+    async def get_embedded_version(self):
+        return await self._query("get_embedded_version")
+
+    async def get_force(self):
+        return await self._query("get_force")
+
+    async def get_touch_type(self):
+        return await self._query("get_touch_type")
+
+    async def get_touch(self):
+        return await self._query("get_touch")
+
+    async def get_matrix_touch(self):
+        return await self._query("get_matrix_touch")
+
+    async def get_matrix_frame(self):
+        return await self._query("get_matrix_frame")
+
+    async def close(self):
+        if self.rs485 is not None:
+            await self.rs485.close()
+        else:
+            await self._call("close_can")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Benchmark RealHand models and write the report as JSON.
+
+    python -m RealHand.bench --models L10,G20 --can sim0 --interface virtual
+    python -m RealHand.bench --models L10 --can can0 --output l10_can.json
+    python -m RealHand.bench --models O6 --modbus /dev/ttyUSB0
+'''
+import os
+import sys
+import json
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from benchmarks import run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RealHand latency and throughput benchmark")
+    parser.add_argument("--models", default="L10", help="comma separated models, e.g. L10,G20,L25")
+    parser.add_argument("--can", default="can0", help="CAN channel")
+    parser.add_argument("--interface", default=None,
+                        help="python-can interface, 'virtual' runs against simulated hands, "
+                             "'rawcan' uses the raw AF_CAN transport")
+    parser.add_argument("--modbus", default="None", help="RS485 port, benchmarks RS485 instead of CAN")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per measurement")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated reply latency in seconds")
+    parser.add_argument("--output", default=None, help="JSON report path, stdout when omitted")
+    args = parser.parse_args()
+
+    report = run([m.strip() for m in args.models.split(",") if m.strip()], can=args.can,
+                 interface=args.interface, modbus=args.modbus, iterations=args.iterations,
+                 latency=args.latency)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import platform
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from real_hand_api import RealHandApi
+from utils.color_msg import ColorMsg
+
+RS485_MODELS = ("O6", "L6", "L10")
+# Models RealHandApi builds on CAN, L24 has a driver but no RealHandApi branch
+CAN_MODELS = ("O6", "L6", "L7", "L10", "L20", "G20", "L21", "L25")
+# Bits of a standard 11-bit frame besides the data field, without stuffing bits
+FRAME_OVERHEAD_BITS = 47
+
+
+class BusCounter:
+    '''Frame and bit counter attached to a SharedCanBus through its recorder hook'''
+    def __init__(self):
+        self.frames = 0
+        self.bits = 0
+
+    def record(self, msg, direction):
+        self.frames += 1
+        self.bits += FRAME_OVERHEAD_BITS + 8 * msg.dlc
+
+
+def thread_cpu_seconds(thread):
+    '''CPU time of another thread of this process, None where /proc is not available'''
+    native_id = getattr(thread, "native_id", None)
+    path = f"/proc/self/task/{native_id}/stat"
+    if native_id is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        # Fields after the parenthesised command name, utime and stime are fields 14 and 15
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def latency_stats(samples):
+    '''p50/p99/max latency in milliseconds and the loop rate they allow'''
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "n": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "hz": round(float(1000.0 / ms.mean()), 1),
+    }
+
+
+def time_calls(fn, iterations, warmup=5):
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    return samples
+
+
+def bench_hand(api, transport, iterations=200):
+    '''
+    Run the benchmark set on one RealHandApi.
+    Return a dict with finger_move, get_state, get_force and get_matrix_touch latencies, tactile
+    frames per second and, on CAN, receive thread CPU usage and bus utilisation.
+    '''
+    hand = api.hand
+    dof = hand.DOF
+    poses = [[100] * dof, [200] * dof]
+    counter = [0]
+
+    def move():
+        counter[0] += 1
+        api.finger_move(poses[counter[0] & 1])
+
+    bus = getattr(hand, "bus", None) if transport == "can" else None
+    bus_counter = BusCounter()
+    if bus is not None:
+        bus.set_recorder(bus_counter)
+        cpu_start = thread_cpu_seconds(bus.receive_thread)
+    wall_start = time.perf_counter()
+
+    results = {}
+    results["finger_move"] = latency_stats(time_calls(move, iterations))
+    results["get_state"] = latency_stats(time_calls(api.get_state, iterations))
+    for name in ("get_force", "get_matrix_touch"):
+        if not hasattr(hand, name):
+            # Not supported by this model and transport
+            results[name] = None
+            continue
+        try:
+            results[name] = latency_stats(time_calls(getattr(api, name), iterations))
+        except Exception as e:
+            ColorMsg(msg=f"{name} failed: {e}", color="yellow")
+            results[name] = {"error": str(e)}
+    touch = results.get("get_matrix_touch")
+    # One get_matrix_touch call completes one five finger frame
+    results["tactile_fps"] = touch["hz"] if touch and "hz" in touch else None
+
+    wall = time.perf_counter() - wall_start
+    if bus is not None:
+        bus.set_recorder(None)
+        cpu_end = thread_cpu_seconds(bus.receive_thread)
+        results["rx_thread_cpu_percent"] = (round(100.0 * (cpu_end - cpu_start) / wall, 1)
+                                            if cpu_start is not None else None)
+        results["bus_frames_per_s"] = round(bus_counter.frames / wall, 1)
+        # Share of the nominal bitrate. A virtual bus has no bitrate limit and can exceed 100.
+        results["bus_utilization_percent"] = round(100.0 * bus_counter.bits / (bus.bitrate * wall), 2)
+    else:
+        results["rx_thread_cpu_percent"] = None
+        results["bus_frames_per_s"] = None
+        results["bus_utilization_percent"] = None
+    results["duration_s"] = round(wall, 2)
+    return results
+
+
+def close_hand(api):
+    '''
+    Stop the API helpers and release the hand's bus or serial port.
+    RealHandApi.close_can() is not used: it brings can0 down, which a benchmark must not do to the host.
+    '''
+    api.stop_trajectory()
+    api.stop_state_poller()
+    api.unsubscribe_tactile()
+    api.stop_recording()
+    close = getattr(api.hand, "close_can_interface", None) or getattr(api.hand, "close", None)
+    if close is not None:
+        close()
+
+
+def run(models, can="can0", interface=None, modbus="None", iterations=200, latency=0.0):
+    '''
+    Benchmark each model on one transport.
+    With interface="virtual" every model is answered by a utils.virtual_hand simulator with the
+    given reply latency, otherwise the hands must be connected.
+    '''
+    transport = "rs485" if modbus != "None" else "can"
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "transport": transport,
+        "interface": interface if transport == "can" else modbus,
+        "iterations": iterations,
+        "results": {},
+    }
+    for model in models:
+        supported = RS485_MODELS if transport == "rs485" else CAN_MODELS
+        if model.upper() not in supported:
+            ColorMsg(msg=f"{model} is not supported by RealHandApi over {transport}, skipped", color="yellow")
+            report["results"][model] = {"skipped": f"not supported over {transport}"}
+            continue
+        sim = None
+        if transport == "can" and interface == "virtual":
+            from utils.virtual_hand import VirtualHand
+            sim = VirtualHand(model, can_id=0x27, channel=can, latency=latency).start()
+        api = None
+        try:
+            api = RealHandApi(hand_type="right", hand_joint=model, modbus=modbus, can=can, interface=interface)
+            ColorMsg(msg=f"Benchmarking {model} over {transport}", color="green")
+            report["results"][model] = bench_hand(api, transport, iterations=iterations)
+        except Exception as e:
+            ColorMsg(msg=f"{model} benchmark failed: {e}", color="red")
+            report["results"][model] = {"error": str(e)}
+        finally:
+            if api is not None:
+                close_hand(api)
+            if sim is not None:
+                sim.stop()
+    return report
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import can
+import time
+import itertools
+from utils.open_can import OpenCan
+from utils.color_msg import ColorMsg
+from utils.reply_waiter import ReplyWaiter
+from utils.bus_scheduler import query_class
+from utils.can_bus_manager import CanBusManager
+from utils.frame_table import build_frame_table
+from utils.region_encoder import RegionEncoder
+from utils.tactile_buffer import TactileFrameBuffer
+
+# Row flag byte of a matrix frame -> row of the 12x6 finger matrix
+MATRIX_ROW_MAP = {
+    0: 0, 16: 1, 32: 2, 48: 3, 64: 4, 80: 5,
+    96: 6, 112: 7, 128: 8, 144: 9, 160: 10, 176: 11,
+}
+
+
+class HandDriver:
+    '''
+    Common base of the CAN hand drivers.
+    A model declares its protocol in the class attributes below. Bus setup, sending with reconnect,
+    batched commands, query/reply waiting, table-driven decoding and the tactile buffer are built
+    from them here, so every model shares one I/O path.
+    '''
+    # Offsets from can_id of the arbitration ids the hand answers on
+    RX_ID_OFFSETS = (0,)
+    # Frame byte -> attribute, payload stored on the driver as a list
+    SLOTS = {}
+    # Frame byte -> attribute, payload stored as a list of floats
+    FLOATS = {}
+    # Frame byte -> (touch type attribute, finger index) of the tactile matrix frames.
+    # A model with matrix frames gets self.tactile and self.matrix_map.
+    MATRICES = {}
+    # Frame byte -> name of a decode(frame_type, payload) method for frames with their own decoding
+    HANDLERS = {}
+    # Shortest frame worth decoding, frame byte included
+    MIN_FRAME_LEN = 1
+    # Length of the command pose, and its JointPermutation when the frame order differs
+    DOF = None
+    JOINT_PERMUTATION = None
+    # Position frames of a hand with serial (per finger) and parallel (per joint class) regions:
+    # frame byte -> command pose index of each payload byte, None for a reserved byte. A model
+    # declaring them gets self.position_encoder, see utils.region_encoder.
+    SERIAL_POSITION_FRAMES = {}
+    PARALLEL_POSITION_FRAMES = {}
+    # Frame byte -> pose indices the hand actually takes from it, where that differs from the payload
+    POSITION_FRAME_DRIVES = None
+    # Getter group -> frame bytes whose replies make up its values, see get_sample_time().
+    # The tactile group is added from MATRICES.
+    STAMP_GROUPS = {}
+    # Frame bytes of the queries sent in the bus_scheduler DIAGNOSTICS class
+    DIAGNOSTIC_FRAMES = ()
+    # Timing in seconds: pause after a single frame, reply timeout of a query, gap inside a batch
+    SEND_SLEEP = 0.003
+    REPLY_TIMEOUT = 0.003
+    TX_GAP = 0.0002
+    # utils.metrics.Metrics receiving the driver counters, None keeps the hooks idle
+    metrics = None
+
+    def __init__(self, can_id, can_channel='can0', baudrate=1000000, yaml="", interface=None):
+        '''
+        :param interface: python-can interface of the channel, None for the platform default.
+                          "virtual" runs against utils.virtual_hand without CAN hardware,
+                          "rawcan" uses the raw AF_CAN socket of utils.raw_can on Linux.
+        '''
+        self.can_id = can_id
+        self.can_channel = can_channel
+        self.baudrate = baudrate
+        self.interface = interface
+        self.open_can = OpenCan(load_yaml=yaml)
+        self.running = True
+        if self.MATRICES:
+            # Thumb, index, middle, ring and little finger 12x6 matrices in one uint8 frame
+            self.tactile = TactileFrameBuffer()
+            self.matrix_map = dict(MATRIX_ROW_MAP)
+        self.reply_waiter = ReplyWaiter()
+        # Frame byte -> (receive timestamp, sequence number) of its last decoded reply
+        self.rx_stamps = {}
+        self._rx_seq = itertools.count(1)
+        self.stamp_groups = dict(self.STAMP_GROUPS)
+        if self.MATRICES:
+            self.stamp_groups["tactile"] = tuple(sorted(self.MATRICES))
+        # Set to None to send every position frame of set_joint_positions
+        self.position_encoder = None
+        if self.SERIAL_POSITION_FRAMES:
+            self.position_encoder = RegionEncoder(self.SERIAL_POSITION_FRAMES, self.PARALLEL_POSITION_FRAMES,
+                                                  self.DOF, drives=self.POSITION_FRAME_DRIVES)
+        self.frame_table = self._frame_table()
+        # Inter-frame gap for batched commands in seconds
+        self.tx_gap = self.TX_GAP
+        self.rx_ids = tuple(can_id + offset for offset in self.RX_ID_OFFSETS)
+        self.bus = self.init_can_bus(can_channel, baudrate)
+        self.message_class = getattr(self.bus, "message_class", can.Message)
+        # Replies are dispatched by the shared bus receive thread
+        if self.bus is not None:
+            self.bus.register(self.rx_ids, self.process_response)
+            if self.bus.supervisor.open_can is None:
+                # The supervisor brings the link up with the settings of the first hand on the channel
+                self.bus.supervisor.open_can = self.open_can
+
+    def init_can_bus(self, channel, baudrate):
+        try:
+            return CanBusManager.acquire(channel, bitrate=baudrate, interface=self.interface)
+        except Exception:
+            ColorMsg(msg="Warning: Please insert CAN device", color="red")
+            return None
+
+    def _frame_table(self):
+        """Frame byte -> decoder table used by process_response"""
+        return build_frame_table(
+            self,
+            slots=self.SLOTS,
+            floats=self.FLOATS,
+            matrices=self.MATRICES,
+            handlers={frame_type: getattr(self, name) for frame_type, name in self.HANDLERS.items()},
+        )
+
+    def _message(self, frame_property, data_list):
+        frame_property_value = int(frame_property.value) if hasattr(frame_property, 'value') else frame_property
+        try:
+            # Integer payloads (ints, NumPy integers) go straight into the frame's bytearray
+            data = bytearray((frame_property_value, *data_list))
+        except TypeError:
+            data = bytearray([frame_property_value] + [int(val) for val in data_list])
+        return self.message_class(arbitration_id=self.can_id, data=data, is_extended_id=False)
+
+    def _reconnect(self, e):
+        """Send failed: the channel's supervisor recovers the bus in the background, see utils.connection_supervisor"""
+        print(f"Failed to send message: {e}")
+        if self.metrics is not None:
+            self.metrics.count("send_errors")
+        if self.position_encoder is not None:
+            # Frames may have been lost, resend the whole pose with the next command
+            self.position_encoder.reset()
+
+    def send_frame(self, frame_property, data_list, sleep=None):
+        """Send a single CAN frame, then pause sleep seconds (SEND_SLEEP by default)."""
+        msg = self._message(frame_property, data_list)
+        encoder = self.position_encoder
+        if encoder is not None:
+            # A position frame written directly makes the encoder's last pose stale
+            encoder.invalidate(msg.data)
+        try:
+            sent = self.bus.send(msg)
+        except can.CanError as e:
+            sent = None
+            self._reconnect(e)
+        if sent is False and encoder is not None and encoder.writes(msg.data):
+            # Held while the channel reconnects, only the latest frame of each byte is kept
+            encoder.reset()
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.count("frames_sent" if sent is not False else "frames_dropped", msg.data[0])
+        time.sleep(self.SEND_SLEEP if sleep is None else sleep)
+
+    def send_command(self, frame_property, data_list, sleep_time=None):
+        self.send_frame(frame_property, data_list, sleep_time)
+
+    def request_frame(self, frame_property, data_list, timeout=None, reply=None):
+        """Send a query frame and return as soon as its reply arrives, False on timeout."""
+        frame_property_value = int(frame_property.value) if hasattr(frame_property, 'value') else frame_property
+        key = frame_property_value if reply is None else reply
+        mark = self.reply_waiter.mark(key)
+        if mark is None:
+            # Read pass of an async query, see ReplyWaiter.collect()
+            return True
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        with self.bus.priority(query_class(key, self.DIAGNOSTIC_FRAMES)):
+            self.send_frame(frame_property, data_list, sleep=0)
+        replied = self.reply_waiter.wait(mark, self.REPLY_TIMEOUT if timeout is None else timeout)
+        if metrics is not None and not self.reply_waiter.deferring():
+            if replied:
+                metrics.observe("reply_latency_seconds", key, time.perf_counter() - start)
+            else:
+                metrics.count("reply_timeouts", key)
+        return replied
+
+    request_command = request_frame
+
+    def send_commands(self, frames, gap=None):
+        """
+        Send several frames back-to-back as one command
+        :param frames: list of (frame_property, data_list)
+        :param gap: inter-frame gap in seconds, defaults to self.tx_gap
+        """
+        msgs = [self._message(frame_property, data_list) for frame_property, data_list in frames]
+        try:
+            sent = self.bus.send_batch(msgs, gap=self.tx_gap if gap is None else gap)
+        except can.CanError as e:
+            sent = None
+            self._reconnect(e)
+        encoder = self.position_encoder
+        if sent is False and encoder is not None and any(encoder.writes(msg.data) for msg in msgs):
+            # Held while the channel reconnects: only the latest frame of each byte is kept, so the
+            # next pose must go out whole
+            encoder.reset()
+        metrics = self.metrics
+        if metrics is not None:
+            name = "frames_sent" if sent is not False else "frames_dropped"
+            for msg in msgs:
+                metrics.count(name, msg.data[0])
+
+    def process_response(self, msg):
+        """Process received CAN messages."""
+        if msg.arbitration_id in self.rx_ids:
+            metrics = self.metrics
+            if len(msg.data) < self.MIN_FRAME_LEN:
+                if metrics is not None:
+                    metrics.count("short_frames", msg.arbitration_id)
+                return
+            frame_type = msg.data[0]
+            decode = self.frame_table.get(frame_type)
+            if metrics is not None:
+                metrics.count("frames_received" if decode is not None else "unknown_frames", frame_type)
+            if decode is not None:
+                # Stamped before decoding, so a woken requester finds the stamp of its reply
+                self.rx_stamps[frame_type] = (msg.timestamp, next(self._rx_seq))
+                decode(frame_type, msg.data[1:])
+            self.reply_waiter.notify(frame_type)
+
+    def get_sample_time(self, group="position"):
+        '''
+        Receive time of the values a getter group returns.
+        @return: (timestamp, seq): the receive timestamp in seconds since the epoch of the oldest frame
+                 of the group, the kernel timestamp on socketcan and rawcan, and the sequence number of
+                 its newest frame, which grows with every decoded reply. (None, 0) while a frame of the
+                 group has not been received or for a group the model does not have.
+        '''
+        frames = self.stamp_groups.get(group)
+        if not frames:
+            return None, 0
+        stamps = self.rx_stamps
+        oldest = None
+        seq = 0
+        for frame_type in frames:
+            stamp = stamps.get(frame_type)
+            if stamp is None:
+                return None, 0
+            if oldest is None or stamp[0] < oldest:
+                oldest = stamp[0]
+            if stamp[1] > seq:
+                seq = stamp[1]
+        return oldest, seq
+
+    def get_sample_times(self):
+        '''Group -> (timestamp, seq) of get_sample_time() for every group of the model'''
+        return {group: self.get_sample_time(group) for group in self.stamp_groups}
+
+    def close_can_interface(self):
+        """Stop the CAN communication."""
+        self.running = False
+        if self.bus:
+            self.bus.unregister(self.process_response)
+            self.bus.shutdown()
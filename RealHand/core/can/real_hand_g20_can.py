@@ -4,7 +4,9 @@ import time, sys, os
 import threading
 import numpy as np
 from enum import Enum
-from utils.open_can import OpenCan
+from utils.joint_permutation import JointPermutation
+from utils.bus_scheduler import query_class
+from core.can.hand_driver import HandDriver
 current_dir = os.path.dirname(os.path.abspath(__file__))
 target_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(target_dir)
@@ -154,15 +156,98 @@ class FrameProperty(Enum):
     HAND_COMM_ID_SET = 0xD1  # Set communication ID
     HAND_UID_SET = 0xF0  # Set unique identifier
 
-class RealHandG20Can:
-    def __init__(self, can_channel='can0', baudrate=1000000, can_id=0x28, yaml=""):
-        self.can_id = can_id
-        self.can_channel = can_channel
-        self.baudrate = baudrate
-        self.open_can = OpenCan(load_yaml=yaml)
-
-        self.running = True
-        
+class RealHandG20Can(HandDriver):
+    SLOTS = {
+        0x01: "x01", 0x02: "x02", 0x03: "x03", 0x04: "x04", 0x05: "x05", 0x06: "x06",
+        0x09: "x09", 0x0A: "x0A", 0x0B: "x0B", 0x0C: "x0C", 0x0D: "x0D", 0x0E: "x0E",
+        0x11: "x11", 0x12: "x12", 0x13: "x13", 0x14: "x14", 0x15: "x15", 0x16: "x16",
+        0x19: "x19", 0x1A: "x1A", 0x1B: "x1B", 0x1C: "x1C", 0x1D: "x1D", 0x1E: "x1E",
+        0x21: "x21", 0x22: "x22", 0x23: "x23", 0x24: "x24", 0x25: "x25", 0x26: "x26",
+        0x41: "x41", 0x42: "x42", 0x43: "x43", 0x44: "x44", 0x45: "x45", 0x49: "x49",
+        0x4A: "x4A", 0x4B: "x4B", 0x4C: "x4C", 0x4D: "x4D", 0x51: "x51", 0x52: "x52",
+        0x53: "x53", 0x54: "x54", 0x55: "x55", 0x59: "x59", 0x5A: "x5A", 0x5B: "x5B",
+        0x5C: "x5C", 0x5D: "x5D", 0x61: "x61", 0x62: "x62", 0x63: "x63", 0x64: "x64",
+        0x65: "x65", 0x81: "x81", 0x82: "x82", 0x83: "x83", 0x84: "x84", 0x90: "x90",
+        0x91: "x91", 0x92: "x92", 0x93: "x93", 0xB0: "xB0", 0xB6: "xB6", 0xC0: "xC0",
+        0xC1: "xC1", 0xC2: "xC2", 0xC3: "xC3", 0xC4: "xC4",
+    }
+    HANDLERS = {
+        0x98: "_decode_all_data", 0x99: "_decode_all_data", 0x9A: "_decode_all_data",
+        0x9B: "_decode_all_data", 0x9C: "_decode_all_data",
+    }
+    MATRICES = {
+        0xB1: ("xB1", 0),
+        0xB2: ("xB2", 1),
+        0xB3: ("xB3", 2),
+        0xB4: ("xB4", 3),
+        0xB5: ("xB5", 4),
+    }
+    DOF = 20
+    # Frames behind each getter group, see HandDriver.get_sample_time
+    STAMP_GROUPS = {
+        "position": (0x41, 0x42, 0x43, 0x44, 0x45),
+        "speed": (0x49, 0x4A, 0x4B, 0x4C, 0x4D),
+        "torque": (0x51, 0x52, 0x53, 0x54, 0x55),
+        "temperature": (0x61, 0x62, 0x63, 0x64, 0x65),
+        "fault": (0x59, 0x5A, 0x5B, 0x5C, 0x5D),
+        "force": (0x90, 0x91, 0x92, 0x93),
+    }
+    # Temperature, fault and version queries, sent behind position and tactile queries
+    DIAGNOSTIC_FRAMES = (0x59, 0x5A, 0x5B, 0x5C, 0x5D,
+                         0x61, 0x62, 0x63, 0x64, 0x65, 0x84, 0xC0, 0xC1, 0xC2, 0xC3, 0xC4)
+    SEND_SLEEP = 0.003
+    REPLY_TIMEOUT = 0.003
+
+    # All finger data frames, thumb to pinky, used by get_full_state(all_data=True). Each is assumed
+    # to answer a query with one frame per field:
+    # [frame byte, field index, 6 values in the slot order of the finger frames 0x41-0x45].
+    ALL_DATA_FRAMES = (0x98, 0x99, 0x9A, 0x9B, 0x9C)
+    # Field index -> (field name, thumb frame of the per-finger query holding the same values)
+    ALL_DATA_FIELDS = (
+        ("position", 0x41),
+        ("speed", 0x49),
+        ("torque", 0x51),
+        ("fault", 0x59),
+        ("temperature", 0x61),
+    )
+    ALL_DATA_TIMEOUT = 0.02
+
+    # Command index of the 6 slots of each finger frame: thumb, index, middle, ring, pinky
+    FINGER_MAPPING = [
+        [5, 10, 0, 11, 12, 15],
+        [6, 11, 1, 13, 14, 16],
+        [7, 12, 2, 13, 14, 17],
+        [8, 13, 3, 14, 15, 18],
+        [9, 14, 4, 15, 16, 19],
+    ]
+    # Finger frame slot (finger * 6 + slot) reported in each of the 20 command state positions.
+    # The reserved positions 11-14 are shared by several fingers, the last finger written wins.
+    # The thumb and index tips 15/16 are read from their own tip slots, not the pinky reserved ones.
+    STATE_SLOTS = [2, 8, 14, 20, 26, 0, 6, 12, 18, 24, 1, 7, 13, 19, 25, 5, 11, 17, 23, 29]
+    JOINT_PERMUTATION = JointPermutation(
+        {finger * 6 + slot: index for finger, indices in enumerate(FINGER_MAPPING) for slot, index in enumerate(indices)},
+        [(frame_idx, pose_idx) for pose_idx, frame_idx in enumerate(STATE_SLOTS)],
+        frame_len=30, pose_len=20)
+    # Finger frames 0x41-0x45 carry the FINGER_MAPPING slots. Only roll, base and tip (and the thumb
+    # yaw) are joints, the reserved slots repeat other pose values, so the joints driven are listed apart.
+    SERIAL_POSITION_FRAMES = {0x41 + finger: list(indices) for finger, indices in enumerate(FINGER_MAPPING)}
+    # Joint class frames ROLL_POS, YAW_POS, ROOT1_POS and TIP_POS, thumb to pinky
+    PARALLEL_POSITION_FRAMES = {
+        0x01: [5, 6, 7, 8, 9],
+        0x02: [10, 11, 12, 13, 14],
+        0x03: [0, 1, 2, 3, 4],
+        0x06: [15, 16, 17, 18, 19],
+    }
+    POSITION_FRAME_DRIVES = {
+        0x41: [5, 10, 0, 15],
+        0x42: [6, 1, 16],
+        0x43: [7, 2, 17],
+        0x44: [8, 3, 18],
+        0x45: [9, 4, 19],
+        0x02: [10],
+    }
+
+    def __init__(self, can_channel='can0', baudrate=1000000, can_id=0x28, yaml="", interface=None):
         # Initialize data storage variables
         self.last_thumb_pos, self.last_index_pos, self.last_ring_pos, self.last_middle_pos, self.last_little_pos = None, None, None, None, None
         self.last_root1, self.last_yaw, self.last_roll, self.last_root2, self.last_tip = None, None, None, None, None
@@ -187,215 +272,15 @@ class RealHandG20Can:
         # Sensor data storage
         self.x90, self.x91, self.x92, self.x93 = [], [], [], []
         self.x98, self.x99, self.x9A, self.x9B, self.x9C = [], [], [], [], []
+        # None until get_full_state(all_data=True) learned whether the firmware answers the all data frames
+        self.all_data_supported = None
         self.xB0, self.xB1, self.xB2, self.xB3, self.xB4, self.xB5, self.xB6 = [], [], [], [], [], [], []
         self.normal_force, self.tangential_force, self.tangential_force_dir, self.approach_inc = [[-1] * 5 for _ in range(4)]
         
         # Query command data storage
         self.xC0, self.xC1, self.xC2, self.xC3, self.xC4 = [], [], [], [], []
         
-        # Tactile sensor matrix data
-        self.thumb_matrix = np.full((12, 6), -1)
-        self.index_matrix = np.full((12, 6), -1)
-        self.middle_matrix = np.full((12, 6), -1)
-        self.ring_matrix = np.full((12, 6), -1)
-        self.little_matrix = np.full((12, 6), -1)
-        self.matrix_map = {
-            0: 0, 16: 1, 32: 2, 48: 3, 64: 4, 80: 5,
-            96: 6, 112: 7, 128: 8, 144: 9, 160: 10, 176: 11,
-        }
-        
-        # Initialize CAN bus
-        try:
-            if sys.platform == "linux":
-                self.bus = can.interface.Bus(
-                    channel=can_channel, interface="socketcan", bitrate=baudrate, 
-                    can_filters=[{"can_id": can_id, "can_mask": 0x7FF}]
-                )
-            elif sys.platform == "win32":
-                self.bus = can.interface.Bus(
-                    channel=can_channel, interface='pcan', bitrate=baudrate, 
-                    can_filters=[{"can_id": can_id, "can_mask": 0x7FF}]
-                )
-            else:
-                raise EnvironmentError("Unsupported platform for CAN interface")
-        except:
-            print("Please insert CAN device")
-
-        # Start receive thread
-        self.receive_thread = threading.Thread(target=self.receive_response)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
-
-    def send_command(self, frame_property, data_list, sleep_time=0.003):
-        """
-        Send a command to the CAN bus
-        :param frame_property: frame property
-        :param data_list: payload
-        """
-        frame_property_value = int(frame_property.value) if hasattr(frame_property, 'value') else frame_property
-        data = [frame_property_value] + [int(val) for val in data_list]
-        msg = can.Message(arbitration_id=self.can_id, data=data, is_extended_id=False)
-        try:
-            self.bus.send(msg)
-        except can.CanError as e:
-            print(f"Failed to send message: {e}")
-            self.open_can.open_can(self.can_channel)
-            time.sleep(1)
-            self.is_can = self.open_can.is_can_up_sysfs(interface=self.can_channel)
-            time.sleep(1)
-            if self.is_can:
-                self.bus = can.interface.Bus(channel=self.can_channel, interface="socketcan", bitrate=self.baudrate)
-            else:
-                print("Reconnecting CAN devices ....")
-        time.sleep(sleep_time)
-
-    def receive_response(self):
-        """
-        Receive and process CAN bus response messages
-        """
-        while self.running:
-            try:
-                msg = self.bus.recv(timeout=1.0)
-                if msg:
-                    self.process_response(msg)
-            except can.CanError as e:
-                print(f"Error receiving message: {e}")
-
-    def process_response(self, msg):
-        """
-        Process CAN response message
-        """
-        if msg.arbitration_id == self.can_id:
-            frame_type = msg.data[0]
-            response_data = msg.data[1:]
-            
-            # Parallel control command responses
-            if frame_type == 0x01: self.x01 = list(response_data)
-            elif frame_type == 0x02: self.x02 = list(response_data)
-            elif frame_type == 0x03: self.x03 = list(response_data)
-            elif frame_type == 0x04: self.x04 = list(response_data)
-            elif frame_type == 0x05: self.x05 = list(response_data)
-            elif frame_type == 0x06: self.x06 = list(response_data)
-            elif frame_type == 0x09: self.x09 = list(response_data)
-            elif frame_type == 0x0A: self.x0A = list(response_data)
-            elif frame_type == 0x0B: self.x0B = list(response_data)
-            elif frame_type == 0x0C: self.x0C = list(response_data)
-            elif frame_type == 0x0D: self.x0D = list(response_data)
-            elif frame_type == 0x0E: self.x0E = list(response_data)
-            elif frame_type == 0x11: self.x11 = list(response_data)
-            elif frame_type == 0x12: self.x12 = list(response_data)
-            elif frame_type == 0x13: self.x13 = list(response_data)
-            elif frame_type == 0x14: self.x14 = list(response_data)
-            elif frame_type == 0x15: self.x15 = list(response_data)
-            elif frame_type == 0x16: self.x16 = list(response_data)
-            elif frame_type == 0x19: self.x19 = list(response_data)
-            elif frame_type == 0x1A: self.x1A = list(response_data)
-            elif frame_type == 0x1B: self.x1B = list(response_data)
-            elif frame_type == 0x1C: self.x1C = list(response_data)
-            elif frame_type == 0x1D: self.x1D = list(response_data)
-            elif frame_type == 0x1E: self.x1E = list(response_data)
-            elif frame_type == 0x21: self.x21 = list(response_data)
-            elif frame_type == 0x22: self.x22 = list(response_data)
-            elif frame_type == 0x23: self.x23 = list(response_data)
-            elif frame_type == 0x24: self.x24 = list(response_data)
-            elif frame_type == 0x25: self.x25 = list(response_data)
-            elif frame_type == 0x26: self.x26 = list(response_data)
-            
-            # Series control command responses
-            elif frame_type == 0x41: self.x41 = list(response_data)
-            elif frame_type == 0x42: self.x42 = list(response_data)
-            elif frame_type == 0x43: self.x43 = list(response_data)
-            elif frame_type == 0x44: self.x44 = list(response_data)
-            elif frame_type == 0x45: self.x45 = list(response_data)
-            elif frame_type == 0x49: self.x49 = list(response_data)
-            elif frame_type == 0x4A: self.x4A = list(response_data)
-            elif frame_type == 0x4B: self.x4B = list(response_data)
-            elif frame_type == 0x4C: self.x4C = list(response_data)
-            elif frame_type == 0x4D: self.x4D = list(response_data)
-            elif frame_type == 0x51: self.x51 = list(response_data)
-            elif frame_type == 0x52: self.x52 = list(response_data)
-            elif frame_type == 0x53: self.x53 = list(response_data)
-            elif frame_type == 0x54: self.x54 = list(response_data)
-            elif frame_type == 0x55: self.x55 = list(response_data)
-            elif frame_type == 0x59: self.x59 = list(response_data)
-            elif frame_type == 0x5A: self.x5A = list(response_data)
-            elif frame_type == 0x5B: self.x5B = list(response_data)
-            elif frame_type == 0x5C: self.x5C = list(response_data)
-            elif frame_type == 0x5D: self.x5D = list(response_data)
-            elif frame_type == 0x61: self.x61 = list(response_data)
-            elif frame_type == 0x62: self.x62 = list(response_data)
-            elif frame_type == 0x63: self.x63 = list(response_data)
-            elif frame_type == 0x64: self.x64 = list(response_data)
-            elif frame_type == 0x65: self.x65 = list(response_data)
-            
-            # Combined command region responses
-            elif frame_type == 0x81: self.x81 = list(response_data)
-            elif frame_type == 0x82: self.x82 = list(response_data)
-            elif frame_type == 0x83: self.x83 = list(response_data)
-            elif frame_type == 0x84: self.x84 = list(response_data)
-            
-            # Sensor data responses
-            elif frame_type == 0x90: self.x90 = list(response_data)
-            elif frame_type == 0x91: self.x91 = list(response_data)
-            elif frame_type == 0x92: self.x92 = list(response_data)
-            elif frame_type == 0x93: self.x93 = list(response_data)
-            elif frame_type == 0x98: self.x98 = list(response_data)
-            elif frame_type == 0x99: self.x99 = list(response_data)
-            elif frame_type == 0x9A: self.x9A = list(response_data)
-            elif frame_type == 0x9B: self.x9B = list(response_data)
-            elif frame_type == 0x9C: self.x9C = list(response_data)
-            
-            # Tactile sensor responses
-            elif frame_type == 0xB0: self.xB0 = list(response_data)
-            elif frame_type == 0xB1:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xB1 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.thumb_matrix[index] = d[1:]
-                        
-            elif frame_type == 0xB2: 
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xB2 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.index_matrix[index] = d[1:]
-            elif frame_type == 0xB3: 
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xB3 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.middle_matrix[index] = d[1:]
-            elif frame_type == 0xB4: 
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xB4 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.ring_matrix[index] = d[1:]
-            elif frame_type == 0xB5: 
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xB5 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.little_matrix[index] = d[1:]
-            elif frame_type == 0xB6: self.xB6 = list(response_data)
-            
-            # Query command responses
-            elif frame_type == 0xC0: self.xC0 = list(response_data)
-            elif frame_type == 0xC1: self.xC1 = list(response_data)
-            elif frame_type == 0xC2: self.xC2 = list(response_data)
-            elif frame_type == 0xC3: self.xC3 = list(response_data)
-            elif frame_type == 0xC4: self.xC4 = list(response_data)
+        HandDriver.__init__(self, can_id, can_channel, baudrate, yaml, interface)
 
     # Parallel control command methods
     def set_roll_positions(self, joint_ranges):
@@ -488,118 +373,118 @@ class RealHandG20Can:
     # Queries
     def get_thumb_positions(self):
         """Get current positions of all thumb joints"""
-        self.send_command(FrameProperty.THUMB_POS, [])
+        self.request_command(FrameProperty.THUMB_POS, [])
         return self.x41
     
     def get_index_positions(self):
         """Get current positions of all index finger joints"""
-        self.send_command(FrameProperty.INDEX_POS, [])
+        self.request_command(FrameProperty.INDEX_POS, [])
         return self.x42
     
     def get_middle_positions(self):
         """Get current positions of all middle finger joints"""
-        self.send_command(FrameProperty.MIDDLE_POS, [])
+        self.request_command(FrameProperty.MIDDLE_POS, [])
         return self.x43
     
     def get_ring_positions(self):
         """Get current positions of all ring finger joints"""
-        self.send_command(FrameProperty.RING_POS, [])
+        self.request_command(FrameProperty.RING_POS, [])
         return self.x44
     
     def get_little_positions(self):
         """Get current positions of all pinky finger joints"""
-        self.send_command(FrameProperty.LITTLE_POS, [])
+        self.request_command(FrameProperty.LITTLE_POS, [])
         return self.x45
 
 
     def get_thumb_speed(self):
         """Get thumb speed"""
-        self.send_command(FrameProperty.THUMB_SPEED, [])
+        self.request_command(FrameProperty.THUMB_SPEED, [])
     
     def get_index_speed(self):
         """Get index finger speed"""
-        self.send_command(FrameProperty.INDEX_SPEED, [])
+        self.request_command(FrameProperty.INDEX_SPEED, [])
     
     def get_middle_speed(self):
         """Get middle finger speed"""
-        self.send_command(FrameProperty.MIDDLE_SPEED, [])
+        self.request_command(FrameProperty.MIDDLE_SPEED, [])
     
     def get_ring_speed(self):
         """Get ring finger speed"""
-        self.send_command(FrameProperty.RING_SPEED, [])
+        self.request_command(FrameProperty.RING_SPEED, [])
     
     def get_little_speed(self):
         """Get pinky finger speed"""
-        self.send_command(FrameProperty.LITTLE_SPEED, [])
+        self.request_command(FrameProperty.LITTLE_SPEED, [])
 
     def get_thumb_torque(self):
         """Get thumb torque"""
-        self.send_command(FrameProperty.THUMB_TORQUE, [])
+        self.request_command(FrameProperty.THUMB_TORQUE, [])
     
     def get_index_torque(self):
         """Get index finger torque"""
-        self.send_command(FrameProperty.INDEX_TORQUE, [])
+        self.request_command(FrameProperty.INDEX_TORQUE, [])
     
     def get_middle_torque(self):
         """Get middle finger torque"""
-        self.send_command(FrameProperty.MIDDLE_TORQUE, [])
+        self.request_command(FrameProperty.MIDDLE_TORQUE, [])
     
     def get_ring_torque(self):
         """Get ring finger torque"""
-        self.send_command(FrameProperty.RING_TORQUE, [])
+        self.request_command(FrameProperty.RING_TORQUE, [])
     
     def get_little_torque(self):
         """Get pinky finger torque"""
-        self.send_command(FrameProperty.LITTLE_TORQUE, [])
+        self.request_command(FrameProperty.LITTLE_TORQUE, [])
 
     def get_thumb_fault(self):
         """Get fault codes for all thumb joints"""
-        self.send_command(FrameProperty.THUMB_FAULT, [])
+        self.request_command(FrameProperty.THUMB_FAULT, [])
         return self.x59
     
     def get_index_fault(self):
         """Get fault codes for all index finger joints"""
-        self.send_command(FrameProperty.INDEX_FAULT, [])
+        self.request_command(FrameProperty.INDEX_FAULT, [])
         return self.x5A
     
     def get_middle_fault(self):
         """Get fault codes for all middle finger joints"""
-        self.send_command(FrameProperty.MIDDLE_FAULT, [])
+        self.request_command(FrameProperty.MIDDLE_FAULT, [])
         return self.x5B
     
     def get_ring_fault(self):
         """Get fault codes for all ring finger joints"""
-        self.send_command(FrameProperty.RING_FAULT, [])
+        self.request_command(FrameProperty.RING_FAULT, [])
         return self.x5C
     
     def get_little_fault(self):
         """Get fault codes for all pinky finger joints"""
-        self.send_command(FrameProperty.LITTLE_FAULT, [])
+        self.request_command(FrameProperty.LITTLE_FAULT, [])
         return self.x5D
 
     def get_thumb_temperature(self):
         """Get current temperatures of all thumb joints"""
-        self.send_command(FrameProperty.THUMB_TEMPERATURE, [])
+        self.request_command(FrameProperty.THUMB_TEMPERATURE, [])
         return self.x61
     
     def get_index_temperature(self):
         """Get current temperatures of all index finger joints"""
-        self.send_command(FrameProperty.INDEX_TEMPERATURE, [])
+        self.request_command(FrameProperty.INDEX_TEMPERATURE, [])
         return self.x62
     
     def get_middle_temperature(self):
         """Get current temperatures of all middle finger joints"""
-        self.send_command(FrameProperty.MIDDLE_TEMPERATURE, [])
+        self.request_command(FrameProperty.MIDDLE_TEMPERATURE, [])
         return self.x63
     
     def get_ring_temperature(self):
         """Get current temperatures of all ring finger joints"""
-        self.send_command(FrameProperty.RING_TEMPERATURE, [])
+        self.request_command(FrameProperty.RING_TEMPERATURE, [])
         return self.x64
     
     def get_little_temperature(self):
         """Get current temperatures of all pinky finger joints"""
-        self.send_command(FrameProperty.LITTLE_TEMPERATURE, [])
+        self.request_command(FrameProperty.LITTLE_TEMPERATURE, [])
         return self.x65
 
     # Combined command region methods    
@@ -618,90 +503,90 @@ class RealHandG20Can:
     
     def get_finger_temperature(self):
         """Get temperatures of finger joints"""
-        self.send_command(FrameProperty.FINGER_TEMPERATURE, [])
+        self.request_command(FrameProperty.FINGER_TEMPERATURE, [])
         return self.x84
 
     # Sensor data getters
     def get_normal_force(self):
         """Get normal force of five fingers"""
-        self.send_command(FrameProperty.HAND_NORMAL_FORCE, [])
+        self.request_command(FrameProperty.HAND_NORMAL_FORCE, [])
         return self.x90
     
     def get_tangential_force(self):
         """Get tangential force of five fingers"""
-        self.send_command(FrameProperty.HAND_TANGENTIAL_FORCE, [])
+        self.request_command(FrameProperty.HAND_TANGENTIAL_FORCE, [])
         return self.x91
     
     def get_tangential_force_dir(self):
         """Get tangential force directions of five fingers"""
-        self.send_command(FrameProperty.HAND_TANGENTIAL_FORCE_DIR, [])
+        self.request_command(FrameProperty.HAND_TANGENTIAL_FORCE_DIR, [])
         return self.x92
     
     def get_approach_sensing(self):
         """Get proximity sensing of five fingers"""
-        self.send_command(FrameProperty.HAND_APPROACH_INC, [])
+        self.request_command(FrameProperty.HAND_APPROACH_INC, [])
         return self.x93
 
     # Tactile sensor methods
     def get_touch_sensor_type(self):
         """Get tactile sensor type"""
-        self.send_command(FrameProperty.TOUCH_SENSOR_TYPE, [])
+        self.request_command(FrameProperty.TOUCH_SENSOR_TYPE, [])
         return self.xB0
     
     def get_thumb_touch(self):
         """Get thumb tactile sensing data"""
-        self.send_command(FrameProperty.THUMB_TOUCH, [0xC6], sleep_time=0.007)
+        self.request_command(FrameProperty.THUMB_TOUCH, [0xC6], timeout=0.007, reply=("matrix", FrameProperty.THUMB_TOUCH.value))
         #return self.thumb_matrix
     
     def get_index_touch(self):
         """Get index finger tactile sensing data"""
-        self.send_command(FrameProperty.INDEX_TOUCH, [0xC6], sleep_time=0.007)
+        self.request_command(FrameProperty.INDEX_TOUCH, [0xC6], timeout=0.007, reply=("matrix", FrameProperty.INDEX_TOUCH.value))
         #return self.xB2
     
     def get_middle_touch(self):
         """Get middle finger tactile sensing data"""
-        self.send_command(FrameProperty.MIDDLE_TOUCH, [0xC6], sleep_time=0.007)
+        self.request_command(FrameProperty.MIDDLE_TOUCH, [0xC6], timeout=0.007, reply=("matrix", FrameProperty.MIDDLE_TOUCH.value))
         #33333return self.xB3
     
     def get_ring_touch(self):
         """Get ring finger tactile sensing data"""
-        self.send_command(FrameProperty.RING_TOUCH, [0xC6], sleep_time=0.007)
+        self.request_command(FrameProperty.RING_TOUCH, [0xC6], timeout=0.007, reply=("matrix", FrameProperty.RING_TOUCH.value))
         #return self.xB4
     
     def get_little_touch(self):
         """Get pinky finger tactile sensing data"""
-        self.send_command(FrameProperty.LITTLE_TOUCH, [0xC6], sleep_time=0.007)
+        self.request_command(FrameProperty.LITTLE_TOUCH, [0xC6], timeout=0.007, reply=("matrix", FrameProperty.LITTLE_TOUCH.value))
         #return self.xB5
     
     def get_palm_touch(self):
         """Get palm tactile sensing data"""
-        self.send_command(FrameProperty.PALM_TOUCH, [], sleep_time=0.015)
+        self.request_command(FrameProperty.PALM_TOUCH, [], timeout=0.015)
         #return self.xB6
 
     # Query command methods
     def get_uid(self):
         """Get device unique identifier"""
-        self.send_command(FrameProperty.HAND_UID_GET, [])
+        self.request_command(FrameProperty.HAND_UID_GET, [])
         return self.xC0
     
     def get_hardware_version(self):
         """Get hardware version"""
-        self.send_command(FrameProperty.HAND_HARDWARE_VERSION_GET, [])
+        self.request_command(FrameProperty.HAND_HARDWARE_VERSION_GET, [])
         return self.xC1
     
     def get_software_version(self):
         """Get software version"""
-        self.send_command(FrameProperty.HAND_SOFTWARE_VERSION_GET, [])
+        self.request_command(FrameProperty.HAND_SOFTWARE_VERSION_GET, [])
         return self.xC2
     
     def get_comm_id(self):
         """Get device communication ID"""
-        self.send_command(FrameProperty.HAND_COMM_ID_GET, [])
+        self.request_command(FrameProperty.HAND_COMM_ID_GET, [])
         return self.xC3
     
     def get_struct_version(self):
         """Get structural version number"""
-        self.send_command(FrameProperty.HAND_STRUCT_VERSION_GET, [])
+        self.request_command(FrameProperty.HAND_STRUCT_VERSION_GET, [])
         return self.xC4
 
     # Factory command methods
@@ -726,12 +611,20 @@ class RealHandG20Can:
     #------------------------------------------------------
     def set_joint_positions(self, joint_ranges):
         """API: set positions of all finger joints"""
+        if self.position_encoder is not None:
+            # Only the frames carrying the joints that changed, see utils.region_encoder
+            frames = self.position_encoder.encode(joint_ranges)
+            if frames:
+                self.send_commands(frames)
+            return
         j = self.cmd_range_to_joint_range(cmd_list=joint_ranges)
-        self.set_thumb_positions(j[0])
-        self.set_index_positions(j[1])
-        self.set_middle_positions(j[2])
-        self.set_ring_positions(j[3])
-        self.set_little_positions(j[4])
+        self.send_commands([
+            (FrameProperty.THUMB_POS, j[0]),
+            (FrameProperty.INDEX_POS, j[1]),
+            (FrameProperty.MIDDLE_POS, j[2]),
+            (FrameProperty.RING_POS, j[3]),
+            (FrameProperty.LITTLE_POS, j[4]),
+        ])
 
     def set_speed(self, speed=[250] * 5):
         """API: set finger speeds"""
@@ -761,7 +654,6 @@ class RealHandG20Can:
         self.get_middle_positions()
         self.get_ring_positions()
         self.get_little_positions()
-        time.sleep(0.002)
         s = [self.x41, self.x42, self.x43, self.x44, self.x45]
         cmd_state = self.joint_state_to_cmd_state(list=s)
         return cmd_state
@@ -777,7 +669,6 @@ class RealHandG20Can:
         self.get_middle_speed()
         self.get_ring_speed()
         self.get_little_speed()
-        time.sleep(0.002)
 
         joint_speed = [self.x49, self.x4A, self.x4B, self.x4C, self.x4D]
         state_speed = self.joint_state_to_cmd_state(list=joint_speed)
@@ -785,17 +676,13 @@ class RealHandG20Can:
 
     def get_touch_type(self):
         """API: get tactile sensor type"""
-        self.send_command(0xb0,[],sleep_time=0.03)
-        self.send_command(0xb1,[],sleep_time=0.03)
-        t = []
-        for i in range(3):
-            t = self.xB1
-            time.sleep(0.01)
+        self.request_command(0xb0,[],timeout=0.03)
+        self.request_command(0xb1,[],timeout=0.06)
+        t = self.xB1
         if len(t) == 2:
             return 2
         else:
-            self.send_command(0x20,[],sleep_time=0.03)
-            time.sleep(0.01)
+            self.request_command(0x20,[],timeout=0.04)
             if self.normal_force[0] == -1:
                 return -1
             else:
@@ -808,7 +695,7 @@ class RealHandG20Can:
         self.get_middle_touch()
         self.get_ring_touch()
         self.get_little_touch()
-        return self.thumb_matrix , self.index_matrix , self.middle_matrix , self.ring_matrix , self.little_matrix
+        return self.tactile.fingers()
 
     def get_matrix_touch_v2(self):
         """API: get finger tactile sensor matrix data"""
@@ -817,36 +704,35 @@ class RealHandG20Can:
     def get_thumb_matrix_touch(self,sleep_time=0):
         """API: get [Thumb] tactile sensor matrix data"""
         self.get_thumb_touch()
-        return self.thumb_matrix
+        return self.tactile.finger(0)
     
     def get_index_matrix_touch(self,sleep_time=0):
         """API: get [Index] tactile sensor matrix data"""
         self.get_index_touch()
-        return self.index_matrix
+        return self.tactile.finger(1)
     
     def get_middle_matrix_touch(self,sleep_time=0):
         """API: get [Middle] tactile sensor matrix data"""
         self.get_middle_touch()
-        return self.middle_matrix
+        return self.tactile.finger(2)
     
     def get_ring_matrix_touch(self,sleep_time=0):
         """API: get [Ring] tactile sensor matrix data"""
         self.get_ring_touch()
-        return self.ring_matrix
+        return self.tactile.finger(3)
     
     def get_little_matrix_touch(self,sleep_time=0):
         """API: get [Pinky] tactile sensor matrix data"""
         self.get_little_touch()
-        return self.little_matrix
+        return self.tactile.finger(4)
 
     def get_torque(self):
         """API: get maximum finger torques"""
         self.get_thumb_torque()
         self.get_index_torque()
         self.get_middle_torque()
-        self.get_middle_torque()
+        self.get_ring_torque()
         self.get_little_torque()
-        time.sleep(0.003)
         t = [self.x51, self.x52, self.x53, self.x54, self.x55]
         cmd_torque = self.joint_state_to_cmd_state(list=t)
         return cmd_torque
@@ -874,52 +760,16 @@ class RealHandG20Can:
 
     def cmd_range_to_joint_range(self,cmd_list):
         """Convert hand command list into per-finger grouped data according to the mapping"""
-        # Define finger mapping rules
-        finger_mapping = {
-            'Thumb': [5, 10, 0, 11, 12, 15],
-            'Index': [6, 11, 1, 13, 14, 16],
-            'Middle': [7, 12, 2, 13, 14, 17],
-            'Ring': [8, 13, 3, 14, 15, 18],
-            'Pinky': [9, 14, 4, 15, 16, 19]
-        }
-        
-        result = []
-        
-        for finger, indices in finger_mapping.items():
-            finger_data = [cmd_list[i] for i in indices]
-            result.append(finger_data)
-        
-        return result
+        frame = self.JOINT_PERMUTATION.encode(cmd_list)
+        return [frame[i:i + 6] for i in range(0, 30, 6)]
 
     def joint_state_to_cmd_state(self,list):
         """
         Convert list of per-finger joint states into command sequence state list
         """
-        original = [""] * 20
-        try:        
-            for i, finger_data in enumerate(list):
-                # Basic position mapping
-                original[i] = finger_data[2]        # Base
-                original[i + 5] = finger_data[0]    # Roll
-                original[i + 15] = finger_data[5]   # Tip
-                
-                # Special positions
-                if i == 0:  # Thumb
-                    original[10] = finger_data[1]   # Yaw
-                    original[11] = finger_data[3]   # Reserved
-                    original[12] = finger_data[4]   # Reserved
-                else:  # Other fingers
-                    original[10 + i] = finger_data[1]  # Reserved position
-                    if i <= 2:  # Index, Middle
-                        original[12 + i] = finger_data[3]  # Reserved
-                        original[13 + i] = finger_data[4]  # Reserved
-                    else:  # Ring, Pinky
-                        original[11 + i] = finger_data[3]  # Reserved
-                        original[12 + i] = finger_data[4]  # Reserved
-            
-            return original
-        except:
+        if len(list) != 5 or any(len(finger_data) < 6 for finger_data in list):
             return [-1] * 20
+        return self.JOINT_PERMUTATION.decode([v for finger_data in list for v in finger_data[:6]])
 
     def _list_d_value(self, list1, list2):
         """Check if there is a significant difference between two lists"""
@@ -930,11 +780,63 @@ class RealHandG20Can:
                 return True
         return False
 
-    def close_can_interface(self):
-        """Close CAN interface"""
-        if self.bus:
-            self.bus.shutdown()
-            self.running = False
+    def _decode_all_data(self, frame_type, data):
+        """Store one field frame of an all finger data reply into the per-finger slot it mirrors"""
+        attrs = self.__dict__
+        attrs[f"x{frame_type:02X}"] = list(data)
+        if len(data) != 7 or data[0] >= len(self.ALL_DATA_FIELDS):
+            return
+        finger = frame_type - self.ALL_DATA_FRAMES[0]
+        slot = self.ALL_DATA_FIELDS[data[0]][1] + finger
+        attrs[f"x{slot:02X}"] = list(data[1:])
+        self.rx_stamps[slot] = self.rx_stamps[frame_type]
+        # Wake the requester on the last field, the slots of a lost field keep their previous values
+        if data[0] == len(self.ALL_DATA_FIELDS) - 1:
+            self.reply_waiter.notify(("all", frame_type))
+
+    def get_full_state(self, timeout=None, fallback=True, all_data=False):
+        """
+        API: position, speed, torque, fault and temperature of every joint in one refresh.
+        By default the 25 per-finger queries are sent. all_data=True sends the five all finger data
+        queries back-to-back instead and awaits their replies together; their reply layout (see
+        ALL_DATA_FRAMES) is assumed, not confirmed on firmware. Firmware that does not answer them
+        is read with the per-finger queries when fallback is True.
+        Returns {"position", "speed", "torque", "fault", "temperature": command order lists of 20,
+        "fingers": per finger {field: 6 slot values}, "source": "all_data" or "per_finger"}.
+        """
+        keys = [("all", frame_type) for frame_type in self.ALL_DATA_FRAMES]
+        source = "all_data"
+        if all_data and self.all_data_supported is not False:
+            mark = self.reply_waiter.mark(*keys)
+            replied = True
+            if mark is not None:
+                counts = dict(mark)
+                with self.bus.priority(query_class(keys[0])):
+                    self.send_commands([(frame_type, []) for frame_type in self.ALL_DATA_FRAMES])
+                replied = self.reply_waiter.wait(mark, self.ALL_DATA_TIMEOUT if timeout is None else timeout)
+                if not replied and self.all_data_supported is None and self.reply_waiter.mark(*keys) == counts:
+                    # Not a single finger answered, stop asking this firmware
+                    self.all_data_supported = False
+                elif replied and not self.reply_waiter.deferring():
+                    self.all_data_supported = True
+            if not replied and fallback:
+                source = "per_finger"
+        else:
+            source = "per_finger"
+        if source == "per_finger":
+            self.get_current_status()
+            self.get_speed()
+            self.get_torque()
+            self.get_fault()
+            self.get_temperature()
+        state = {"source": source, "fingers": []}
+        for finger in range(5):
+            state["fingers"].append({
+                name: list(self.__dict__[f"x{base + finger:02X}"]) for name, base in self.ALL_DATA_FIELDS
+            })
+        for name, base in self.ALL_DATA_FIELDS:
+            state[name] = self.joint_state_to_cmd_state(list=[self.__dict__[f"x{base + finger:02X}"] for finger in range(5)])
+        return state
 
     def get_finger_order(self):
         return ["Thumb Base", "Index Finger Base", "Middle Finger Base", "Ring Finger Base", "Pinky Finger Base", "Thumb Roll", "Index Finger Roll", "Middle Finger Roll", "Ring Finger Roll", "Pinky Finger Roll", "Thumb Yaw", "Reserved", "Reserved", "Reserved", "Reserved", "Thumb Tip", "Index Finger Tip", "Middle Finger Tip", "Ring Finger Tip", "Pinky Finger Tip"]
\ No newline at end of file
@@ -4,7 +4,8 @@ import time, sys, os
 import threading
 import numpy as np
 from enum import Enum
-from utils.open_can import OpenCan
+from utils.joint_permutation import JointPermutation
+from core.can.hand_driver import HandDriver
 current_dir = os.path.dirname(os.path.abspath(__file__))
 target_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(target_dir)
@@ -13,6 +14,7 @@ class FrameProperty(Enum):
     # Finger motion control - parallel control commands
     ROLL_POS = 0x01  # Roll joint position
     YAWPOS = 0x02  # Yaw joint position
+    YAW_POS = 0x02  # Alias used by set_yaw_positions
     ROOT1_POS = 0x03  # Root joint 1 position
     ROOT2_POS = 0x04  # Root joint 2 position
     ROOT3_POS = 0x05  # Root joint 3 position
@@ -106,14 +108,83 @@ class FrameProperty(Enum):
     FINGER_FAULT = 0x83  # Clear finger faults and fault codes
     FINGER_TEMPERATURE = 0x84  # Finger joint temperatures
 
-class RealHandL21Can:
-    def __init__(self, can_channel='can0', baudrate=1000000, can_id=0x28,yaml=""):
-        self.can_id = can_id
-        self.can_channel = can_channel
-        self.baudrate = baudrate
-        self.open_can = OpenCan(load_yaml=yaml)
-
-        self.running = True
+class RealHandL21Can(HandDriver):
+    SLOTS = {
+        0x01: "x01", 0x02: "x02", 0x03: "x03", 0x04: "x04", 0x05: "x05", 0x06: "x06",
+        0x08: "x08", 0x09: "x09", 0x0A: "x0A", 0x0B: "x0B", 0x0C: "x0C", 0x0D: "x0D",
+        0x41: "x41", 0x42: "x42", 0x43: "x43", 0x44: "x44", 0x45: "x45", 0x49: "x49",
+        0x4a: "x4a", 0x4b: "x4b", 0x4c: "x4c", 0x4d: "x4d", 0xc1: "xc1", 0x51: "x51",
+        0x52: "x52", 0x53: "x53", 0x54: "x54", 0x55: "x55", 0x59: "x59", 0x5a: "x5a",
+        0x5b: "x5b", 0x5c: "x5c", 0x5d: "x5d", 0x61: "x61", 0x62: "x62", 0x63: "x63",
+        0x64: "x64", 0x65: "x65", 0x83: "x83", 0x90: "x90", 0x91: "x91", 0x92: "x92",
+        0x93: "x93", 0xb0: "xb0", 0xb6: "xb6",
+    }
+    FLOATS = {
+        0x22: "tangential_force_dir",
+        0x23: "approach_inc",
+    }
+    MATRICES = {
+        0xb1: ("xb1", 0),
+        0xb2: ("xb2", 1),
+        0xb3: ("xb3", 2),
+        0xb4: ("xb4", 3),
+        0xb5: ("xb5", 4),
+    }
+    HANDLERS = {
+        0xC0: "_decode_device_info",
+    }
+    DOF = 25
+    # Frames behind each getter group, see HandDriver.get_sample_time
+    STAMP_GROUPS = {
+        "position": (0x41, 0x42, 0x43, 0x44, 0x45),
+        "speed": (0x49, 0x4A, 0x4B, 0x4C, 0x4D),
+        "torque": (0x51, 0x52, 0x53, 0x54, 0x55),
+        "temperature": (0x61, 0x62, 0x63, 0x64, 0x65),
+        "fault": (0x59, 0x5A, 0x5B, 0x5C, 0x5D),
+        "force": (0x90, 0x91, 0x92, 0x93),
+    }
+    # Temperature, fault and version queries, sent behind position and tactile queries
+    DIAGNOSTIC_FRAMES = (0x59, 0x5A, 0x5B, 0x5C, 0x5D,
+                         0x61, 0x62, 0x63, 0x64, 0x65, 0xC0, 0xC1, 0xC2, 0xC3)
+    SEND_SLEEP = 0.003
+    REPLY_TIMEOUT = 0.003
+
+    # Command pose index of every CAN frame slot, None for a reserved slot
+    FRAME_FROM_POSE = {
+        0: 10,  1: 5,   2: 0,   3: 15,  4: None,  5: 20,
+        6: None, 7: 6,   8: 1,   9: 16,  10: None, 11: 21,
+        12: None, 13: 7, 14: 2,  15: 17, 16: None, 17: 22,
+        18: None, 19: 8,  20: 3,   21: 18, 22: None, 23: 23,
+        24: None, 25: 9,  26: 4,   27: 19, 28: None, 29: 24
+    }
+    # CAN frame slots reported back in the command pose
+    POSE_FROM_FRAME = {
+        0: 10,  1: 5,   2: 0,   3: 15,  5: 20,  7: 6,
+        8: 1,   9: 16,  11: 21, 13:7, 14: 2,  15: 17, 17: 22,
+        19: 8,  20: 3,  21: 18, 23: 23, 25: 9,   26: 4,
+        27: 19, 29: 24
+    }
+    JOINT_PERMUTATION = JointPermutation(FRAME_FROM_POSE, POSE_FROM_FRAME, frame_len=30, pose_len=25)
+    # Finger frames 0x41-0x45, the FRAME_FROM_POSE slots of each finger
+    SERIAL_POSITION_FRAMES = {
+        0x41: [10, 5, 0, 15, None, 20],
+        0x42: [None, 6, 1, 16, None, 21],
+        0x43: [None, 7, 2, 17, None, 22],
+        0x44: [None, 8, 3, 18, None, 23],
+        0x45: [None, 9, 4, 19, None, 24],
+    }
+    # Joint class frames ROLL_POS, YAW_POS, ROOT1_POS, ROOT2_POS and TIP_POS, thumb to pinky
+    PARALLEL_POSITION_FRAMES = {
+        0x01: [10, 11, 12, 13, 14],
+        0x02: [5, 6, 7, 8, 9],
+        0x03: [0, 1, 2, 3, 4],
+        0x04: [15, 16, 17, 18, 19],
+        0x06: [20, 21, 22, 23, 24],
+    }
+    # Only the thumb has a roll joint, pose 11-14 are reserved
+    POSITION_FRAME_DRIVES = {0x01: [10]}
+
+    def __init__(self, can_channel='can0', baudrate=1000000, can_id=0x28,yaml="", interface=None):
         self.last_thumb_pos, self.last_index_pos,self.last_ring_pos,self.last_middle_pos, self.last_little_pos = None,None,None,None,None
         self.x01, self.x02, self.x03, self.x04,self.x05,self.x06,self.x07, self.x08,self.x09,self.x0A,self.x0B,self.x0C,self.x0D,self.x0E,self.speed = [],[],[],[],[],[],[],[],[],[],[],[],[],[],[]
         self.last_root1,self.last_yaw,self.last_roll,self.last_root2,self.last_tip = None,None,None,None,None
@@ -131,99 +202,28 @@ class RealHandL21Can:
         self.x90,self.x91,self.x92,self.x93 = [],[],[],[]
         # New pressure sensors
         self.xb0,self.xb1,self.xb2,self.xb3,self.xb4,self.xb5,self.xb6 = [-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5
-        self.thumb_matrix = np.full((12, 6), -1)
-        self.index_matrix = np.full((12, 6), -1)
-        self.middle_matrix = np.full((12, 6), -1)
-        self.ring_matrix = np.full((12, 6), -1)
-        self.little_matrix = np.full((12, 6), -1)
-        self.matrix_map = {
-            0: 0,
-            16: 1,
-            32: 2,
-            48: 3,
-            64: 4,
-            80: 5,
-            96: 6,
-            112: 7,
-            128: 8,
-            144: 9,
-            160: 10,
-            176: 11,
-        }
-        # Initialize CAN bus according to operating system
-        try:
-            if sys.platform == "linux":
-                self.bus = can.interface.Bus(
-                    channel=can_channel, interface="socketcan", bitrate=baudrate, 
-                    can_filters=[{"can_id": can_id, "can_mask": 0x7FF}]
-                )
-            elif sys.platform == "win32":
-                self.bus = can.interface.Bus(
-                    channel=can_channel, interface='pcan', bitrate=baudrate, 
-                    can_filters=[{"can_id": can_id, "can_mask": 0x7FF}]
-                )
-            else:
-                raise EnvironmentError("Unsupported platform for CAN interface")
-        except:
-            print("Please insert CAN device")
-
-        # Start receive thread
-        self.receive_thread = threading.Thread(target=self.receive_response)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
-
-    def send_command(self, frame_property, data_list,sleep_time=0.003):
-        """
-        Send command to CAN bus
-        :param frame_property: Data frame property
-        :param data_list: Data payload
-        """
-        frame_property_value = int(frame_property.value) if hasattr(frame_property, 'value') else frame_property
-        data = [frame_property_value] + [int(val) for val in data_list]
-        msg = can.Message(arbitration_id=self.can_id, data=data, is_extended_id=False)
-        try:
-            self.bus.send(msg)
-        except can.CanError as e:
-            print(f"Failed to send message: {e}")
-            self.open_can.open_can(self.can_channel)
-            time.sleep(1)
-            self.is_can = self.open_can.is_can_up_sysfs(interface=self.can_channel)
-            time.sleep(1)
-            if self.is_can:
-                self.bus = can.interface.Bus(channel=self.can_channel, interface="socketcan", bitrate=self.baudrate)
-            else:
-                print("Reconnecting CAN devices ....")
-        time.sleep(sleep_time)
-
-    def receive_response(self):
-        """
-        Receive and process CAN bus response messages
-        """
-        while self.running:
-            try:
-                msg = self.bus.recv(timeout=1.0)
-                if msg:
-                    self.process_response(msg)
-            except can.CanError as e:
-                print(f"Error receiving message: {e}")
-    
+        HandDriver.__init__(self, can_id, can_channel, baudrate, yaml, interface)
 
     def set_joint_positions(self, joint_ranges):
         if len(joint_ranges) == 25:
+            if self.position_encoder is not None:
+                # Only the frames carrying the joints that changed, see utils.region_encoder
+                frames = self.position_encoder.encode(joint_ranges)
+                if frames:
+                    self.send_commands(frames * 3)
+                return
             l21_pose = self.joint_map(joint_ranges)
             # Use list comprehension to split the list into subarrays of 6 elements each
             chunks = [l21_pose[i:i+6] for i in range(0, 30, 6)]
-            for i in range(3):
-                self.send_command(FrameProperty.THUMB_POS, chunks[0])
-                time.sleep(0.001)
-                self.send_command(FrameProperty.INDEX_POS, chunks[1])
-                time.sleep(0.001)
-                self.send_command(FrameProperty.MIDDLE_POS, chunks[2])
-                time.sleep(0.001)
-                self.send_command(FrameProperty.RING_POS, chunks[3])
-                time.sleep(0.001)
-                self.send_command(FrameProperty.LITTLE_POS, chunks[4])
-                time.sleep(0.001)
+            frames = [
+                (FrameProperty.THUMB_POS, chunks[0]),
+                (FrameProperty.INDEX_POS, chunks[1]),
+                (FrameProperty.MIDDLE_POS, chunks[2]),
+                (FrameProperty.RING_POS, chunks[3]),
+                (FrameProperty.LITTLE_POS, chunks[4]),
+            ]
+            # The pose is repeated three times as before, now as one back-to-back batch
+            self.send_commands(frames * 3)
 
     def set_joint_positions_by_topic(self, joint_ranges):
         if len(joint_ranges) == 25:
@@ -303,49 +303,49 @@ class RealHandL21Can:
 
     # Get thumb joint positions
     def get_thumb_positions(self,j=[0]):
-        self.send_command(FrameProperty.THUMB_POS, j)
+        self.request_command(FrameProperty.THUMB_POS, j)
     # Get index finger joint positions
     def get_index_positions(self, j=[0]):
-        self.send_command(FrameProperty.INDEX_POS,j)
+        self.request_command(FrameProperty.INDEX_POS,j)
     # Get middle finger joint positions
     def get_middle_positions(self, j=[0]):
-        self.send_command(FrameProperty.MIDDLE_POS,j)
+        self.request_command(FrameProperty.MIDDLE_POS,j)
     # Get ring finger joint positions
     def get_ring_positions(self, j=[0]):
-        self.send_command(FrameProperty.RING_POS,j)
+        self.request_command(FrameProperty.RING_POS,j)
     # Get little finger joint positions
     def get_little_positions(self, j=[0]):
-        self.send_command(FrameProperty.LITTLE_POS, j)
+        self.request_command(FrameProperty.LITTLE_POS, j)
     # Get all thumb motor fault codes
     def get_thumbn_fault(self,j=[]):
-        self.send_command(FrameProperty.THUMB_FAULT,j)
+        self.request_command(FrameProperty.THUMB_FAULT,j)
     # Get all index finger motor fault codes
     def get_index_fault(self,j=[]):
-        self.send_command(FrameProperty.INDEX_FAULT,j)
+        self.request_command(FrameProperty.INDEX_FAULT,j)
     # Get all middle finger motor fault codes
     def get_middle_fault(self,j=[]):
-        self.send_command(FrameProperty.MIDDLE_FAULT,j)
+        self.request_command(FrameProperty.MIDDLE_FAULT,j)
     # Get all ring finger motor fault codes
     def get_ring_fault(self,j=[]):
-        self.send_command(FrameProperty.RING_FAULT,j)
+        self.request_command(FrameProperty.RING_FAULT,j)
     # Get all little finger motor fault codes
     def get_little_fault(self,j=[]):
-        self.send_command(FrameProperty.LITTLE_FAULT,j)
+        self.request_command(FrameProperty.LITTLE_FAULT,j)
     # Get thumb temperature threshold
     def get_thumb_threshold(self,j=[]):
-        self.send_command(FrameProperty.THUMB_TEMPERATURE, '')
+        self.request_command(FrameProperty.THUMB_TEMPERATURE, '')
     # Get index finger temperature threshold
     def get_index_threshold(self,j=[]):
-        self.send_command(FrameProperty.INDEX_TEMPERATURE, j)
+        self.request_command(FrameProperty.INDEX_TEMPERATURE, j)
     # Get middle finger temperature threshold
     def get_middle_threshold(self,j=[]):
-        self.send_command(FrameProperty.MIDDLE_TEMPERATURE, j)
+        self.request_command(FrameProperty.MIDDLE_TEMPERATURE, j)
     # Get ring finger temperature threshold
     def get_ring_threshold(self,j=[]):
-        self.send_command(FrameProperty.RING_TEMPERATURE, j)
+        self.request_command(FrameProperty.RING_TEMPERATURE, j)
     # Get little finger temperature threshold
     def get_little_threshold(self,j=[]):
-        self.send_command(FrameProperty.LITTLE_TEMPERATURE, j)
+        self.request_command(FrameProperty.LITTLE_TEMPERATURE, j)
 
     # Disable mode 01
     def set_disability_mode(self, j=[1,1,1,1,1]):
@@ -397,191 +397,28 @@ class RealHandL21Can:
 
     def save_parameters(self):
         self.send_command(0xCF, [])
-    def process_response(self, msg):
-        if msg.arbitration_id == self.can_id:
-            frame_type = msg.data[0]
-            response_data = msg.data[1:]
-            if frame_type == 0x01:
-                self.x01 = list(response_data)
-            elif frame_type == 0x02:
-                self.x02 = list(response_data)
-            elif frame_type == 0x03:
-                self.x03 = list(response_data)
-            elif frame_type == 0x04:
-                self.x04 = list(response_data)
-            elif frame_type == 0x05:
-                self.x05 = list(response_data)
-            elif frame_type == 0x06:
-                self.x06 = list(response_data)
-            elif frame_type == 0xC0:
-                print(f"Device ID info: {response_data}")
-                if self.can_id == 0x28:
-                    self.right_hand_info = response_data
-                elif self.can_id == 0x27:
-                    self.left_hand_info = response_data
-            elif frame_type == 0x08:
-                self.x08 = list(response_data)
-            elif frame_type == 0x09:
-                self.x09 = list(response_data)
-            elif frame_type == 0x0A:
-                self.x0A = list(response_data)
-            elif frame_type == 0x0B:
-                self.x0B = list(response_data)
-            elif frame_type == 0x0C:
-                self.x0C = list(response_data)
-            elif frame_type == 0x0D:
-                self.x0D = list(response_data)
-            elif frame_type == 0x22:
-                d = list(response_data)
-                self.tangential_force_dir = [float(i) for i in d]
-            elif frame_type == 0x23:
-                d = list(response_data)
-                self.approach_inc = [float(i) for i in d]
-            elif frame_type == 0x41:
-                self.x41 = list(response_data)
-            elif frame_type == 0x42:
-                self.x42 = list(response_data)
-            elif frame_type == 0x43:
-                self.x43 = list(response_data)
-            elif frame_type == 0x44:
-                self.x44 = list(response_data)
-            elif frame_type == 0x45:
-                self.x45 = list(response_data)
-            elif frame_type == 0x49:
-                self.x49 = list(response_data)
-            elif frame_type == 0x4a:
-                self.x4a = list(response_data)
-            elif frame_type == 0x4b:
-                self.x4b = list(response_data)
-            elif frame_type == 0x4c:
-                self.x4c = list(response_data)
-            elif frame_type == 0x4d:
-                self.x4d = list(response_data)
-            elif frame_type == 0xc1:
-                self.xc1 = list(response_data)
-            elif frame_type == 0x51:
-                self.x51 = list(response_data)
-            elif frame_type == 0x52:
-                self.x52 = list(response_data)
-            elif frame_type == 0x53:
-                self.x53 = list(response_data)
-            elif frame_type == 0x54:
-                self.x54 = list(response_data)
-            elif frame_type == 0x55:
-                self.x55 = list(response_data)
-            elif frame_type == 0x59:
-                self.x59 = list(response_data)
-            elif frame_type == 0x5a:
-                self.x5a = list(response_data)
-            elif frame_type == 0x5b:
-                self.x5b = list(response_data)
-            elif frame_type == 0x5c:
-                self.x5c = list(response_data)
-            elif frame_type == 0x5d:
-                self.x5d = list(response_data)
-            elif frame_type == 0x61:
-                self.x61 = list(response_data)
-            elif frame_type == 0x62:
-                self.x62 = list(response_data)
-            elif frame_type == 0x63:
-                self.x63 = list(response_data)
-            elif frame_type == 0x64:
-                self.x64 = list(response_data)
-            elif frame_type == 0x65:
-                self.x65 = list(response_data)
-            elif frame_type == 0x83:
-                self.x83 = list(response_data)
-            elif frame_type == 0x90:
-                self.x90 = list(response_data)
-            elif frame_type == 0x91:
-                self.x91 = list(response_data)
-            elif frame_type == 0x92:
-                self.x92 = list(response_data)
-            elif frame_type == 0x93:
-                self.x93 = list(response_data)
-            elif frame_type == 0xb0:
-                self.xb0 = list(response_data)
-            elif frame_type == 0xb1:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb1 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.thumb_matrix[index] = d[1:]
-            elif frame_type == 0xb2:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb2 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.index_matrix[index] = d[1:]
-            elif frame_type == 0xb3:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb3 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.middle_matrix[index] = d[1:]
-            elif frame_type == 0xb4:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb4 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.ring_matrix[index] = d[1:]
-            elif frame_type == 0xb5:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb5 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.little_matrix[index] = d[1:]
-            elif frame_type == 0xb6:
-                self.xb6 = list(response_data)
-
-    def joint_map(self, pose):
-        # l21 CAN data by default receives 30 data
-        l21_pose = [0.0] * 30
 
-        mapping = {
-            0: 10,  1: 5,   2: 0,   3: 15,  4: None,  5: 20,
-            6: None, 7: 6,   8: 1,   9: 16,  10: None, 11: 21,
-            12: None, 13: 7, 14: 2,  15: 17, 16: None, 17: 22,
-            18: None, 19: 8,  20: 3,   21: 18, 22: None, 23: 23,
-            24: None, 25: 9,  26: 4,   27: 19, 28: None, 29: 24
-        }
+    def _decode_device_info(self, frame_type, data):
+        print(f"Device ID info: {data}")
+        if self.can_id == 0x28:
+            self.right_hand_info = data
+        elif self.can_id == 0x27:
+            self.left_hand_info = data
 
-        for l21_idx, pose_idx in mapping.items():
-            if pose_idx is not None:
-                l21_pose[l21_idx] = pose[pose_idx]
-
-        return l21_pose
+    def joint_map(self, pose):
+        # L21 CAN data by default receives 30 data, reserved slots are 0
+        return self.JOINT_PERMUTATION.encode(pose)
 
     def state_to_cmd(self, l21_state):
-        pose = [0.0] * 25
-
-        mapping = {
-            0: 10,  1: 5,   2: 0,   3: 15,  5: 20,  7: 6,
-            8: 1,   9: 16,  11: 21, 13:7, 14: 2,  15: 17, 17: 22,
-            19: 8,  20: 3,  21: 18, 23: 23, 25: 9,   26: 4,
-            27: 19, 29: 24
-        }
-        for l21_idx, pose_idx in mapping.items():
-            pose[pose_idx] = l21_state[l21_idx]
-        return pose
+        return self.JOINT_PERMUTATION.decode(l21_state)
     def action_play(self):
         self.send_command(0xA0,[])
     def get_current_status(self, j=''):
-        self.send_command(FrameProperty.THUMB_POS, j,sleep_time=0.001)
-        self.send_command(FrameProperty.INDEX_POS,j,sleep_time=0.001)
-        self.send_command(FrameProperty.MIDDLE_POS,j,sleep_time=0.001)
-        self.send_command(FrameProperty.RING_POS,j,sleep_time=0.001)
-        self.send_command(FrameProperty.LITTLE_POS, j,sleep_time=0.001)
+        self.request_command(FrameProperty.THUMB_POS, j)
+        self.request_command(FrameProperty.INDEX_POS,j)
+        self.request_command(FrameProperty.MIDDLE_POS,j)
+        self.request_command(FrameProperty.RING_POS,j)
+        self.request_command(FrameProperty.LITTLE_POS, j)
         state= self.x41+ self.x42+ self.x43+ self.x44+ self.x45
         if len(state) == 30:
             l21_state = self.state_to_cmd(l21_state=state)
@@ -594,20 +431,20 @@ class RealHandL21Can:
             return l21_state
         
     def get_current_state_topic(self):
-        self.send_command(0x01,[])
-        self.send_command(0x02,[])
-        self.send_command(0x03,[])
-        self.send_command(0x04,[])
-        self.send_command(0x06,[])
+        self.request_command(0x01,[])
+        self.request_command(0x02,[])
+        self.request_command(0x03,[])
+        self.request_command(0x04,[])
+        self.request_command(0x06,[])
         state = self.x03+self.x02+self.x01+self.x04+self.x06
         return state
     
     def get_speed(self,j=''):
-        self.send_command(FrameProperty.THUMB_SPEED, j)
-        self.send_command(FrameProperty.INDEX_SPEED, j)
-        self.send_command(FrameProperty.MIDDLE_SPEED, j)
-        self.send_command(FrameProperty.RING_SPEED, j)
-        self.send_command(FrameProperty.LITTLE_SPEED, j)
+        self.request_command(FrameProperty.THUMB_SPEED, j)
+        self.request_command(FrameProperty.INDEX_SPEED, j)
+        self.request_command(FrameProperty.MIDDLE_SPEED, j)
+        self.request_command(FrameProperty.RING_SPEED, j)
+        self.request_command(FrameProperty.LITTLE_SPEED, j)
         speed = self.x49+ self.x4a+ self.x4b+ self.x4c+ self.x4d
         if len(speed) == 30:
             l21_speed = self.state_to_cmd(l21_state=speed)
@@ -631,34 +468,34 @@ class RealHandL21Can:
         return [self.x61]+[self.x62]+[self.x63]+[self.x64]+[self.x65]
     def get_version(self):
         if self.xc1 == []:
-            self.send_command(FrameProperty.HAND_HARDWARE_VERSION,[])
+            self.request_command(FrameProperty.HAND_HARDWARE_VERSION,[])
         return self.xc1
     def get_normal_force(self):
-        self.send_command(FrameProperty.HAND_NORMAL_FORCE,[])
+        self.request_command(FrameProperty.HAND_NORMAL_FORCE,[])
         return self.x90
     def get_tangential_force(self):
-        self.send_command(FrameProperty.HAND_TANGENTIAL_FORCE,[])
+        self.request_command(FrameProperty.HAND_TANGENTIAL_FORCE,[])
         return self.x91
     def get_tangential_force_dir(self):
-        self.send_command(FrameProperty.HAND_TANGENTIAL_FORCE_DIR,[])
+        self.request_command(FrameProperty.HAND_TANGENTIAL_FORCE_DIR,[])
         return self.x92
     def get_approach_inc(self):
-        self.send_command(FrameProperty.HAND_APPROACH_INC,[])
+        self.request_command(FrameProperty.HAND_APPROACH_INC,[])
         return self.x93
     
     def get_touch_type(self):
         '''Get tactile sensor type data'''
-        self.send_command(FrameProperty.TOUCH_SENSOR_TYPE,[])
+        self.request_command(FrameProperty.TOUCH_SENSOR_TYPE,[],timeout=0.03)
         try:
             return self.xb0[0]
         except:
             pass
     def get_finger_torque(self):
-        self.send_command(FrameProperty.THUMB_TORQUE,[])
-        self.send_command(FrameProperty.INDEX_TORQUE,[])
-        self.send_command(FrameProperty.MIDDLE_TORQUE,[])
-        self.send_command(FrameProperty.RING_TORQUE,[])
-        self.send_command(FrameProperty.LITTLE_TORQUE,[])
+        self.request_command(FrameProperty.THUMB_TORQUE,[])
+        self.request_command(FrameProperty.INDEX_TORQUE,[])
+        self.request_command(FrameProperty.MIDDLE_TORQUE,[])
+        self.request_command(FrameProperty.RING_TORQUE,[])
+        self.request_command(FrameProperty.LITTLE_TORQUE,[])
         return self.x51+self.x52+self.x53+self.x54+self.x55
     
     def get_torque(self):
@@ -666,32 +503,32 @@ class RealHandL21Can:
     
     def get_thumb_touch(self):
         '''Get thumb tactile sensor data'''
-        self.send_command(FrameProperty.THUMB_TOUCH,[],sleep_time=0.015)
+        self.request_command(FrameProperty.THUMB_TOUCH,[],timeout=0.015)
         return self.xb1
     
     def get_index_touch(self):
         '''Get index finger tactile sensor data'''
-        self.send_command(FrameProperty.INDEX_TOUCH,[0xc6],sleep_time=0.015)
+        self.request_command(FrameProperty.INDEX_TOUCH,[0xc6],timeout=0.015)
         return self.xb2
     
     def get_middle_touch(self):
         '''Get middle finger tactile sensor data'''
-        self.send_command(FrameProperty.MIDDLE_TOUCH,[],sleep_time=0.015)
+        self.request_command(FrameProperty.MIDDLE_TOUCH,[],timeout=0.015)
         return self.xb3
     
     def get_ring_touch(self):
         '''Get ring finger tactile sensor data'''
-        self.send_command(FrameProperty.RING_TOUCH,[],sleep_time=0.015)
+        self.request_command(FrameProperty.RING_TOUCH,[],timeout=0.015)
         return self.xb4
     
     def get_little_touch(self):
         '''Get little finger tactile sensor data'''
-        self.send_command(FrameProperty.LITTLE_TOUCH,[],sleep_time=0.015)
+        self.request_command(FrameProperty.LITTLE_TOUCH,[],timeout=0.015)
         return self.xb5
     
     def get_palm_touch(self):
         '''Get palm tactile sensor data'''
-        self.send_command(FrameProperty.PALM_TOUCH,[],sleep_time=0.015)
+        self.request_command(FrameProperty.PALM_TOUCH,[],timeout=0.015)
         return self.xb6
     
     def get_force(self):
@@ -712,12 +549,12 @@ class RealHandL21Can:
             pass
 
     def get_matrix_touch(self):
-        self.send_command(0xb1,[0xc6],sleep_time=0.04)
-        self.send_command(0xb2,[0xc6],sleep_time=0.04)
-        self.send_command(0xb3,[0xc6],sleep_time=0.04)
-        self.send_command(0xb4,[0xc6],sleep_time=0.04)
-        self.send_command(0xb5,[0xc6],sleep_time=0.04)
-        return self.thumb_matrix , self.index_matrix , self.middle_matrix , self.ring_matrix , self.little_matrix
+        self.request_command(0xb1,[0xc6],timeout=0.04,reply=("matrix", 0xb1))
+        self.request_command(0xb2,[0xc6],timeout=0.04,reply=("matrix", 0xb2))
+        self.request_command(0xb3,[0xc6],timeout=0.04,reply=("matrix", 0xb3))
+        self.request_command(0xb4,[0xc6],timeout=0.04,reply=("matrix", 0xb4))
+        self.request_command(0xb5,[0xc6],timeout=0.04,reply=("matrix", 0xb5))
+        return self.tactile.fingers()
 
     def get_current(self):
         '''Not supported yet'''
@@ -763,7 +600,3 @@ class RealHandL21Can:
         '''Clear motor faults'''
         self.send_command(0x83, [1, 1, 1, 1, 1],sleep_time=0.003)
         return self.x83
-
-    def close_can_interface(self):
-        if self.bus:
-            self.bus.shutdown()  # Close CAN bus
@@ -8,6 +8,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 target_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(target_dir)
 from utils.color_msg import ColorMsg
+from utils.joint_permutation import JointPermutation
+from core.can.hand_driver import HandDriver
 
 class FrameProperty(Enum):
     INVALID_FRAME_PROPERTY = 0x00  # Invalid CAN frame property | no return
@@ -110,29 +112,54 @@ class FrameProperty(Enum):
     WHOLE_FRAME = 0xF0  # Whole-frame transmission | Returns one-byte frame property + entire structure for 485 and network transmission
 
 
-class RealHandL24Can:
-    def __init__(self, config, can_channel='can0', baudrate=1000000, can_id=0x28):
+class RealHandL24Can(HandDriver):
+    SLOTS = {
+        0x01: "x01", 0x02: "x02", 0x03: "x03", 0x04: "x04", 0x05: "x05", 0x06: "x06",
+        0x08: "x08", 0x09: "x09", 0x0A: "x0A", 0x0B: "x0B", 0x0C: "x0C", 0x0D: "x0D",
+        0x41: "x41", 0x42: "x42", 0x43: "x43", 0x44: "x44", 0x45: "x45", 0x49: "x49",
+        0x4a: "x4a", 0x4b: "x4b", 0x4c: "x4c", 0x4d: "x4d",
+    }
+    FLOATS = {
+        0x22: "tangential_force_dir",
+        0x23: "approach_inc",
+    }
+    HANDLERS = {
+        0xC0: "_decode_device_info",
+    }
+    DOF = 25
+    # Frames behind each getter group, see HandDriver.get_sample_time
+    STAMP_GROUPS = {
+        "position": (0x41, 0x42, 0x43, 0x44, 0x45),
+        "speed": (0x49, 0x4A, 0x4B, 0x4C, 0x4D),
+    }
+    # Temperature, fault and version queries, sent behind position and tactile queries
+    DIAGNOSTIC_FRAMES = (0x07,)
+    SEND_SLEEP = 0.002
+    REPLY_TIMEOUT = 0.01
+
+    # Command pose index of every CAN frame slot, None for a reserved slot
+    FRAME_FROM_POSE = {
+        0: 10,  1: 5,   2: 0,   3: 15,  4: None,  5: 20,
+        6: None, 7: 6,   8: 1,   9: 16,  10: None, 11: 21,
+        12: None, 13: None, 14: 2,  15: 17, 16: None, 17: 22,
+        18: None, 19: 8,  20: 3,   21: 18, 22: None, 23: 23,
+        24: None, 25: 9,  26: 4,   27: 19, 28: None, 29: 24
+    }
+    # CAN frame slots reported back in the command pose
+    POSE_FROM_FRAME = {
+        0: 10,  1: 5,   2: 0,   3: 15,  5: 20,  7: 6,
+        8: 1,   9: 16,  11: 21, 14: 2,  15: 17, 17: 22,
+        19: 8,  20: 3,  21: 18, 23: 23, 25: 9,   26: 4,
+        27: 19, 29: 24
+    }
+    JOINT_PERMUTATION = JointPermutation(FRAME_FROM_POSE, POSE_FROM_FRAME, frame_len=30, pose_len=25)
+
+    def __init__(self, config, can_channel='can0', baudrate=1000000, can_id=0x28, interface=None):
         self.config = config
-        self.can_id = can_id
-        self.running = True
         self.x01, self.x02, self.x03, self.x04,self.x05,self.x06,self.x07, self.x08,self.x09,self.x0A,self.x0B,self.x0C,self.x0D,self.x0E,self.speed = [],[],[],[],[],[],[],[],[],[],[],[],[],[],[]
         # Speed
         self.x49, self.x4a, self.x4b, self.x4c, self.x4d = [],[],[],[],[]
         self.x41,self.x42,self.x43,self.x44,self.x45 = [],[],[],[],[]
-        # Initialize CAN bus according to operating system
-        if sys.platform == "linux":
-            self.bus = can.interface.Bus(
-                channel=can_channel, interface="socketcan", bitrate=baudrate, 
-                can_filters=[{"can_id": can_id, "can_mask": 0x7FF}]
-            )
-        elif sys.platform == "win32":
-            self.bus = can.interface.Bus(
-                channel=can_channel, interface='pcan', bitrate=baudrate, 
-                can_filters=[{"can_id": can_id, "can_mask": 0x7FF}]
-            )
-        else:
-            raise EnvironmentError("Unsupported platform for CAN interface")
-
         # Initialize publisher and related parameters according to can_id
         if can_id == 0x28:  # Left hand
             self.hand_exists = config['REAL_HAND']['LEFT_HAND']['EXISTS']
@@ -144,40 +171,7 @@ class RealHandL24Can:
             self.hand_joint = config['REAL_HAND']['RIGHT_HAND']['JOINT']
             self.hand_names = config['REAL_HAND']['RIGHT_HAND']['NAME']
 
-
-        # Start receiving thread
-        self.receive_thread = threading.Thread(target=self.receive_response)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
-
-    def send_command(self, frame_property, data_list):
-        """
-        Send command to CAN bus
-        :param frame_property: Data frame property
-        :param data_list: Data payload
-        """
-        frame_property_value = int(frame_property.value) if hasattr(frame_property, 'value') else frame_property
-        data = [frame_property_value] + [int(val) for val in data_list]
-        msg = can.Message(arbitration_id=self.can_id, data=data, is_extended_id=False)
-        try:
-            self.bus.send(msg)
-            #print(f"Message sent: ID={hex(self.can_id)}, Data={data}")
-        except can.CanError as e:
-            print(f"Failed to send message: {e}")
-        time.sleep(0.002)
-
-    def receive_response(self):
-        """
-        Receive and process CAN bus response messages
-        """
-        while self.running:
-            try:
-                msg = self.bus.recv(timeout=1.0)  # Blocking receive, 1 second timeout
-                if msg:
-                    self.process_response(msg)
-            except can.CanError as e:
-                print(f"Error receiving message: {e}")
-    
+        HandDriver.__init__(self, can_id, can_channel, baudrate, interface=interface)
 
     def set_joint_positions(self, joint_ranges):
         if len(joint_ranges) == 25:
@@ -212,19 +206,19 @@ class RealHandL24Can:
         self.send_command(FrameProperty.TIP_POS, joint_ranges)
     # Get thumb joint positions
     def get_thumb_positions(self,j=[0]):
-        self.send_command(FrameProperty.THUMB_POS, j)
+        self.request_command(FrameProperty.THUMB_POS, j)
     # Get index finger joint positions
     def get_index_positions(self, j=[0]):
-        self.send_command(FrameProperty.INDEX_POS,j)
+        self.request_command(FrameProperty.INDEX_POS,j)
     # Get middle finger joint positions
     def get_middle_positions(self, j=[0]):
-        self.send_command(FrameProperty.MIDDLE_POS,j)
+        self.request_command(FrameProperty.MIDDLE_POS,j)
     # Get ring finger joint positions
     def get_ring_positions(self, j=[0]):
-        self.send_command(FrameProperty.RING_POS,j)
+        self.request_command(FrameProperty.RING_POS,j)
     # Get little finger joint positions
     def get_little_positions(self, j=[0]):
-        self.send_command(FrameProperty.LITTLE_POS, j)
+        self.request_command(FrameProperty.LITTLE_POS, j)
     # Disable 01 mode
     def set_disability_mode(self, j=[1,1,1,1,1]):
         self.send_command(0x85,j)
@@ -252,131 +246,42 @@ class RealHandL24Can:
 
     def save_parameters(self):
         self.send_command(0xCF, [])
-    def process_response(self, msg):
-        if msg.arbitration_id == self.can_id:
-            frame_type = msg.data[0]
-            response_data = msg.data[1:]
-            if frame_type == 0x01:
-                self.x01 = list(response_data)
-            elif frame_type == 0x02:
-                self.x02 = list(response_data)
-            elif frame_type == 0x03:
-                self.x03 = list(response_data)
-            elif frame_type == 0x04:
-                self.x04 = list(response_data)
-            elif frame_type == 0x05:
-                self.x05 = list(response_data)
-            elif frame_type == 0x06:
-                self.x06 = list(response_data)
-                print("_-"*20)
-                print(self.x06)
-            elif frame_type == 0xC0:
-                print(f"Device ID info: {response_data}")
-                if self.can_id == 0x28:
-                    self.right_hand_info = response_data
-                elif self.can_id == 0x27:
-                    self.left_hand_info = response_data
-            elif frame_type == 0x08:
-                self.x08 = list(response_data)
-            elif frame_type == 0x09:
-                self.x09 = list(response_data)
-            elif frame_type == 0x0A:
-                self.x0A = list(response_data)
-            elif frame_type == 0x0B:
-                self.x0B = list(response_data)
-            elif frame_type == 0x0C:
-                self.x0C = list(response_data)
-            elif frame_type == 0x0D:
-                self.x0D = list(response_data)
-            elif frame_type == 0x22:
-                #ColorMsg(msg=f"Five-finger tangential force direction: {list(response_data)}")
-                d = list(response_data)
-                self.tangential_force_dir = [float(i) for i in d]
-            elif frame_type == 0x23:
-                #ColorMsg(msg=f"Five-finger approach: {list(response_data)}")
-                d = list(response_data)
-                self.approach_inc = [float(i) for i in d]
-            elif frame_type == 0x41: # Thumb joint position return value
-                self.x41 = list(response_data)
-            elif frame_type == 0x42: # Index finger joint position return value
-                self.x42 = list(response_data)
-            elif frame_type == 0x43: # Middle finger joint position return value
-                self.x43 = list(response_data)
-            elif frame_type == 0x44: # Ring finger joint position return value
-                self.x44 = list(response_data)
-            elif frame_type == 0x45: # Little finger joint position return value
-                self.x45 = list(response_data)
-            elif frame_type == 0x49: # Thumb speed return value
-                self.x49 = list(response_data)
-            elif frame_type == 0x4a: # Index finger speed return value
-                self.x4a = list(response_data)
-            elif frame_type == 0x4b: # Middle finger speed return value
-                self.x4b = list(response_data)
-            elif frame_type == 0x4c: # Ring finger speed return value
-                self.x4c = list(response_data)
-            elif frame_type == 0x4d: # Little finger speed return value
-                self.x4d = list(response_data)
+
+    def _decode_device_info(self, frame_type, data):
+        print(f"Device ID info: {data}")
+        if self.can_id == 0x28:
+            self.right_hand_info = data
+        elif self.can_id == 0x27:
+            self.left_hand_info = data
 
     # Topic mapping for L24
     def joint_map(self, pose):
-        # L24 CAN data by default receives 30 data points
-        l24_pose = [0.0] * 30  # Initialize l24_pose as 30 zeros
-
-        # Mapping table, using a dictionary to simplify the mapping relationship
-        mapping = {
-            0: 10,  1: 5,   2: 0,   3: 15,  4: None,  5: 20,
-            6: None, 7: 6,   8: 1,   9: 16,  10: None, 11: 21,
-            12: None, 13: None, 14: 2,  15: 17, 16: None, 17: 22,
-            18: None, 19: 8,  20: 3,   21: 18, 22: None, 23: 23,
-            24: None, 25: 9,  26: 4,   27: 19, 28: None, 29: 24
-        }
-
-        # Iterate over the mapping dictionary to map values
-        for l24_idx, pose_idx in mapping.items():
-            if pose_idx is not None:
-                l24_pose[l24_idx] = pose[pose_idx]
-
-        return l24_pose
+        # L24 CAN data by default receives 30 data, reserved slots are 0
+        return self.JOINT_PERMUTATION.encode(pose)
 
     # Convert L24 state values to CMD format state values
     def state_to_cmd(self, l24_state):
-        # L24 CAN by default receives 30 data points, initialize pose as 25 zeros
-        pose = [0.0] * 25  # Original command data controlling L24 has 25 values
-
-        # Mapping relationship: dictionary storing the mapping between l24_state indices and pose indices
-        mapping = {
-            0: 10,  1: 5,   2: 0,   3: 15,  5: 20,  7: 6,
-            8: 1,   9: 16,  11: 21, 14: 2,  15: 17, 17: 22,
-            19: 8,  20: 3,  21: 18, 23: 23, 25: 9,   26: 4,
-            27: 19, 29: 24
-        }
-        # Iterate over mapping dictionary and update pose values
-        for l24_idx, pose_idx in mapping.items():
-            pose[pose_idx] = l24_state[l24_idx]
-        return pose
+        return self.JOINT_PERMUTATION.decode(l24_state)
 
     # Get all joint data
     def get_current_status(self, j=''):
-        time.sleep(0.01)
-        self.send_command(FrameProperty.THUMB_POS, j)
-        self.send_command(FrameProperty.INDEX_POS,j)
-        self.send_command(FrameProperty.MIDDLE_POS,j)
-        self.send_command(FrameProperty.RING_POS,j)
-        self.send_command(FrameProperty.LITTLE_POS, j)
+        self.request_command(FrameProperty.THUMB_POS, j)
+        self.request_command(FrameProperty.INDEX_POS,j)
+        self.request_command(FrameProperty.MIDDLE_POS,j)
+        self.request_command(FrameProperty.RING_POS,j)
+        self.request_command(FrameProperty.LITTLE_POS, j)
         #return self.x41, self.x42, self.x43, self.x44, self.x45
-        time.sleep(0.1)
         state= self.x41+ self.x42+ self.x43+ self.x44+ self.x45
         if len(state) == 30:
             l24_state = self.state_to_cmd(l24_state=state)
             return l24_state
     
     def get_speed(self,j=''):
-        time.sleep(0.1)
-        self.send_command(FrameProperty.THUMB_SPEED, j) # Thumb speed
-        self.send_command(FrameProperty.INDEX_SPEED, j) # Index finger speed
-        self.send_command(FrameProperty.MIDDLE_SPEED, j) # Middle finger speed
-        self.send_command(FrameProperty.RING_SPEED, j) # Ring finger speed
-        self.send_command(FrameProperty.LITTLE_SPEED, j) # Little finger speed
+        self.request_command(FrameProperty.THUMB_SPEED, j) # Thumb speed
+        self.request_command(FrameProperty.INDEX_SPEED, j) # Index finger speed
+        self.request_command(FrameProperty.MIDDLE_SPEED, j) # Middle finger speed
+        self.request_command(FrameProperty.RING_SPEED, j) # Ring finger speed
+        self.request_command(FrameProperty.LITTLE_SPEED, j) # Little finger speed
         speed = self.x49+ self.x4a+ self.x4b+ self.x4c+ self.x4d
         if len(speed) == 30:
             l24_speed = self.state_to_cmd(l24_state=speed)
@@ -388,14 +293,7 @@ class RealHandL24Can:
     #     return self.x06
     # def get_fault(self):
     #     return self.x07
-    def close_can_interface(self):
-        if self.bus:
-            self.bus.shutdown()  # Close CAN bus
 
-    '''
-    This method is only used to demonstrate the data mapping relationship.
-    For actual use, it is better to use the methods above.
-    '''
     def joint_map_2(self, pose):
         l24_pose = [0.0]*30 # L24 CAN by default receives 30 data; pose is the command data with 25 elements used to control L24, here we map it
         '''
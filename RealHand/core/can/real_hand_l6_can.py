@@ -2,18 +2,53 @@ import can
 import time, sys
 import threading
 import numpy as np
-from utils.open_can import OpenCan
 from utils.color_msg import ColorMsg
+from utils.can_bus_manager import CanBusManager
 from can.exceptions import CanError
-
-
-class RealHandL6Can:
-    def __init__(self, can_id, can_channel='can0', baudrate=1000000,yaml=""):
-        self.can_id = can_id
-        self.can_channel = can_channel
-        self.baudrate = baudrate
-        self.open_can = OpenCan(load_yaml=yaml)
-
+from core.can.hand_driver import HandDriver
+
+
+class RealHandL6Can(HandDriver):
+    # Replies come back on can_id and on can_id + 8
+    RX_ID_OFFSETS = (0, 8)
+    SLOTS = {
+        0x01: "x01", 0x02: "x02", 0x05: "x05", 0x33: "x33", 0x35: "x35", 0x36: "x36",
+        0xb0: "xb0", 0x64: "version", 0xC2: "version",
+    }
+    FLOATS = {
+        0x20: "normal_force",
+        0x21: "tangential_force",
+        0x22: "tangential_force_dir",
+        0x23: "approach_inc",
+    }
+    MATRICES = {
+        0xb1: ("xb1", 0),
+        0xb2: ("xb2", 1),
+        0xb3: ("xb3", 2),
+        0xb4: ("xb4", 3),
+        0xb5: ("xb5", 4),
+    }
+    HANDLERS = {
+        0xC0: "_decode_serial_number",
+    }
+    # Frames without payload carry nothing to decode
+    MIN_FRAME_LEN = 2
+    DOF = 6
+    # Frames behind each getter group, see HandDriver.get_sample_time
+    STAMP_GROUPS = {
+        "position": (0x01,),
+        "torque": (0x02,),
+        "temperature": (0x33,),
+        "fault": (0x35,),
+        "current": (0x36,),
+        "force": (0x20, 0x21, 0x22, 0x23),
+    }
+    # Temperature, fault and version queries, sent behind position and tactile queries
+    DIAGNOSTIC_FRAMES = (0x33, 0x35, 0x64, 0xC0, 0xC2)
+    SEND_SLEEP = 0.003
+    REPLY_TIMEOUT = 0.005
+
+    def __init__(self, can_id, can_channel='can0', baudrate=1000000,yaml="", interface=None):
         self.x01 = [0] * 6 # Joint positions
         self.x02 = [-1] * 6 # Torque limits
         self.x05 = [0] * 6 # Speed
@@ -22,26 +57,6 @@ class RealHandL6Can:
         self.x35 = [0] * 6 # Joint error codes
         self.x36 = [-1] * 6 # Current
         self.xb0,self.xb1,self.xb2,self.xb3,self.xb4,self.xb5 = [-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5,[-1] * 5
-
-        self.thumb_matrix = np.full((12, 6), -1)
-        self.index_matrix = np.full((12, 6), -1)
-        self.middle_matrix = np.full((12, 6), -1)
-        self.ring_matrix = np.full((12, 6), -1)
-        self.little_matrix = np.full((12, 6), -1)
-        self.matrix_map = {
-            0: 0,
-            16: 1,
-            32: 2,
-            48: 3,
-            64: 4,
-            80: 5,
-            96: 6,
-            112: 7,
-            128: 8,
-            144: 9,
-            160: 10,
-            176: 11,
-        }
         self.serial_number = []
         self.serial_number_map = {
             0: 0,
@@ -49,24 +64,20 @@ class RealHandL6Can:
             2: 2,
             3: 3,
         }
-        # Fault codes
-        
         self.joint_angles = [0] * 6
         self.pressures = [200] * 6  # Default torque 200
-        self.bus = self.init_can_bus(can_channel, baudrate)
         self.normal_force, self.tangential_force, self.tangential_force_dir, self.approach_inc = [[-1] * 6 for _ in range(4)]
         self.is_lock = False
         self.version = None
-        # Start the receiving thread
-        self.running = True
-        self.receive_thread = threading.Thread(target=self.receive_response)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
+        HandDriver.__init__(self, can_id, can_channel, baudrate, yaml, interface)
 
     def init_can_bus(self, channel, baudrate):
         """
         Try connecting to the CAN bus by priority order, and implement a fallback mechanism.
         """
+        if self.interface is not None:
+            # An explicit interface, e.g. "virtual", needs no fallback
+            return HandDriver.init_can_bus(self, channel, baudrate)
         # --- Unified exception handling block start ---
         try:
             if sys.platform == "linux":
@@ -74,7 +85,7 @@ class RealHandL6Can:
                 try:
                     self.open_can.open_can(self.can_channel)
                     # Try socketcan
-                    bus = can.interface.Bus(channel=channel, interface="socketcan", bitrate=baudrate)
+                    bus = CanBusManager.acquire(channel, bitrate=baudrate, interface="socketcan")
                     ColorMsg(msg=f"Connected successfully: interface='socketcan', channel='{channel}'", color="green")
                     return bus
                 except CanError as e:
@@ -84,14 +95,14 @@ class RealHandL6Can:
             elif sys.platform == "win32":
                 # Windows priority: 1. pcan
                 try:
-                    bus = can.interface.Bus(channel=channel, interface='pcan', bitrate=baudrate)
+                    bus = CanBusManager.acquire(channel, bitrate=baudrate, interface='pcan')
                     ColorMsg(msg=f"Connected successfully: interface='pcan', channel='{channel}'", color="green")
                     return bus
                 except CanError as e:
                     ColorMsg(msg=f"pcan interface connection failed, trying fallback to 'candle': {e}", color="yellow")
                 # Windows priority: 2. candle (fallback method)
                 try:
-                    bus = can.Bus(interface="candle", channel=channel, bitrate=baudrate)
+                    bus = CanBusManager.acquire(channel, bitrate=baudrate, interface="candle")
                     ColorMsg(msg=f"Connected successfully: interface='candle', channel='{channel}'", color="green")
                     return bus
                 except CanError as e:
@@ -106,25 +117,6 @@ class RealHandL6Can:
             # Keep the raise behavior to pass the error to the caller and prevent the program from continuing
             raise
 
-    def send_frame(self, frame_property, data_list,sleep=0.003):
-        """Send a single CAN frame with specified properties and data."""
-        frame_property_value = int(frame_property.value) if hasattr(frame_property, 'value') else frame_property
-        data = [frame_property_value] + [int(val) for val in data_list]
-        msg = can.Message(arbitration_id=self.can_id, data=data, is_extended_id=False)
-        try:
-            self.bus.send(msg)
-        except can.CanError as e:
-            print(f"Failed to send message: {e}")
-            self.open_can.open_can(self.can_channel)
-            time.sleep(1)
-            self.is_can = self.open_can.is_can_up_sysfs(interface=self.can_channel)
-            time.sleep(1)
-            if self.is_can:
-                self.bus = can.interface.Bus(channel=self.can_channel, interface="socketcan", bitrate=self.baudrate)
-            else:
-                print("Reconnecting CAN devices ....")
-        time.sleep(sleep)
-
     def set_joint_positions(self, joint_angles):
         """Set the positions of 10 joints (joint_angles: list of 10 values)."""
         if len(joint_angles) > 6:
@@ -160,136 +152,42 @@ class RealHandL6Can:
 
     ''' -------------------Pressure Sensors---------------------- '''
     def get_normal_force(self):
-        self.send_frame(0x20, [],sleep=0.01)
+        self.request_frame(0x20, [],timeout=0.01)
 
     def get_tangential_force(self):
-        self.send_frame(0x21, [],sleep=0.01)
+        self.request_frame(0x21, [],timeout=0.01)
 
     def get_tangential_force_dir(self):
-        self.send_frame(0x22, [],sleep=0.01)
+        self.request_frame(0x22, [],timeout=0.01)
 
     def get_approach_inc(self):
-        self.send_frame(0x23, [],sleep=0.01)
+        self.request_frame(0x23, [],timeout=0.01)
 
     ''' -------------------Motor Temperature---------------------- '''
     def get_motor_temperature(self):
-        self.send_frame(0x33, [])
+        self.request_frame(0x33, [])
 
     # Motor fault codes
     def get_motor_fault_code(self):
-        self.send_frame(0x35, [])
-
-    def receive_response(self):
-        """Receive CAN responses and process them."""
-        while self.running:
-            try:
-                msg = self.bus.recv(timeout=1.0)
-                if msg:
-                    self.process_response(msg)
-            except can.CanError as e:
-                print(f"Error receiving CAN message: {e}")
-
-    def process_response(self, msg):
-        """Process received CAN messages."""
-        #if msg.arbitration_id == self.can_id:
-        if msg.arbitration_id in (self.can_id, self.can_id + 8):
-            try:
-                frame_type = msg.data[0]
-                response_data = msg.data[1:]
-                if len(list(response_data)) == 0:
-                    return
-            except:
-                return
-            if frame_type == 0x01:   # 0x01
-                self.x01 = list(response_data)
-            elif frame_type == 0x02:    # 0x02
-                self.x02 = list(response_data)
-            elif frame_type == 0x05: # Set speed
-                self.x05 = list(response_data)
-            elif frame_type == 0x20:
-                d = list(response_data)
-                self.normal_force = [float(i) for i in d]
-            elif frame_type == 0x21:
-                d = list(response_data)
-                self.tangential_force = [float(i) for i in d]
-            elif frame_type == 0x22:
-                d = list(response_data)
-                self.tangential_force_dir = [float(i) for i in d]
-            elif frame_type == 0x23:
-                d = list(response_data)
-                self.approach_inc = [float(i) for i in d]
-            elif frame_type == 0x33: # L6 temperature
-                self.x33 = list(response_data)
-            elif frame_type == 0x35: # L6 fault codes
-                self.x35 = list(response_data)
-            elif frame_type == 0x36: # L6 current
-                self.x36 = list(response_data)
-            elif frame_type == 0xb0:
-                self.xb0 = list(response_data)
-            elif frame_type == 0xb1:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb1 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.thumb_matrix[index] = d[1:]  # Remove the first flag bit
-            elif frame_type == 0xb2:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb2 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.index_matrix[index] = d[1:]  # Remove the first flag bit
-            elif frame_type == 0xb3:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb3 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.middle_matrix[index] = d[1:]  # Remove the first flag bit
-            elif frame_type == 0xb4:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb4 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.ring_matrix[index] = d[1:]  # Remove the first flag bit
-            elif frame_type == 0xb5:
-                d = list(response_data)
-                if len(d) == 2:
-                    self.xb5 = d
-                elif len(d) == 7:
-                    index = self.matrix_map.get(d[0])
-                    if index is not None:
-                        self.little_matrix[index] = d[1:]  # Remove the first flag bit
-            elif frame_type == 0x64: # L6 version number
-                self.version = list(response_data)
-            elif frame_type == 0xC2: # L6 version number
-                self.version = list(response_data)
-            elif frame_type == 0xC0:
-                d = list(response_data)
-                index = self.serial_number_map.get(d[0])
-                if index is not None:
-                    self.serial_number=self.serial_number + d[1:]
-                else:
-                    self.serial_number=self.serial_number + [-1] * 6
-                
-
+        self.request_frame(0x35, [])
+
+    def _decode_serial_number(self, frame_type, data):
+        index = self.serial_number_map.get(data[0])
+        if index is not None:
+            self.serial_number = self.serial_number + list(data[1:])
+            if index == 3:
+                self.reply_waiter.notify(("serial", frame_type))
+        else:
+            self.serial_number = self.serial_number + [-1] * 6
 
     def get_version(self):
-        self.send_frame(0x64, [],sleep=0.1)
-        time.sleep(0.1)
+        self.request_frame(0x64, [],timeout=0.2)
         if self.version is None:
-            self.send_frame(0xC2, [],sleep=0.1)
-            time.sleep(0.1)
+            self.request_frame(0xC2, [],timeout=0.2)
         return self.version
 
     def get_current_status(self):
-        self.send_frame(0x01, [],sleep=0.005)
+        self.request_frame(0x01, [],timeout=0.005)
         return self.x01
         
     def get_current_pub_status(self):
@@ -302,28 +200,24 @@ class RealHandL6Can:
 
     def get_current(self):
         '''Not supported yet.'''
-        self.send_frame(0x36, [],sleep=0.005)
+        self.request_frame(0x36, [],timeout=0.005)
         return self.x36
 
 
 
     def get_torque(self):
         '''Not supported yet.'''
-        self.send_frame(0x2, [],sleep=0.01)
+        self.request_frame(0x2, [],timeout=0.01)
         return self.x02
 
     def get_touch_type(self):
         '''Get touch type'''
-        self.send_frame(0xb1,[])
-        t = []
-        for i in range(3):
-            t = self.xb1
-            time.sleep(0.01)
+        self.request_frame(0xb1,[],timeout=0.03)
+        t = self.xb1
         if len(t) == 2:
             return 2
         else:
-            self.send_frame(0x20,[],sleep=0.03)
-            time.sleep(0.01)
+            self.request_frame(0x20,[],timeout=0.04)
             if self.normal_force[0] == -1:
                 return -1
             else:
@@ -332,49 +226,49 @@ class RealHandL6Can:
 
     def get_touch(self):
         '''Get touch data'''
-        self.send_frame(0xb1,[],sleep=0.03)
-        self.send_frame(0xb2,[],sleep=0.03)
-        self.send_frame(0xb3,[],sleep=0.03)
-        self.send_frame(0xb4,[],sleep=0.03)
-        self.send_frame(0xb5,[],sleep=0.03)
+        self.request_frame(0xb1,[],timeout=0.03)
+        self.request_frame(0xb2,[],timeout=0.03)
+        self.request_frame(0xb3,[],timeout=0.03)
+        self.request_frame(0xb4,[],timeout=0.03)
+        self.request_frame(0xb5,[],timeout=0.03)
         return [self.xb1[1],self.xb2[1],self.xb3[1],self.xb4[1],self.xb5[1],0] # The last digit is palm, currently not available
     
     def get_matrix_touch(self):
-        self.send_frame(0xb1,[0xc6],sleep=0.01)
-        self.send_frame(0xb2,[0xc6],sleep=0.01)
-        self.send_frame(0xb3,[0xc6],sleep=0.01)
-        self.send_frame(0xb4,[0xc6],sleep=0.01)
-        self.send_frame(0xb5,[0xc6],sleep=0.01)
+        self.request_frame(0xb1,[0xc6],timeout=0.01,reply=("matrix", 0xb1))
+        self.request_frame(0xb2,[0xc6],timeout=0.01,reply=("matrix", 0xb2))
+        self.request_frame(0xb3,[0xc6],timeout=0.01,reply=("matrix", 0xb3))
+        self.request_frame(0xb4,[0xc6],timeout=0.01,reply=("matrix", 0xb4))
+        self.request_frame(0xb5,[0xc6],timeout=0.01,reply=("matrix", 0xb5))
 
-        return self.thumb_matrix , self.index_matrix , self.middle_matrix , self.ring_matrix , self.little_matrix
+        return self.tactile.fingers()
     
     def get_matrix_touch_v2(self):
-        self.send_frame(0xb1,[0xc6],sleep=0.009)
-        self.send_frame(0xb2,[0xc6],sleep=0.009)
-        self.send_frame(0xb3,[0xc6],sleep=0.009)
-        self.send_frame(0xb4,[0xc6],sleep=0.009)
-        self.send_frame(0xb5,[0xc6],sleep=0.009)
-        return self.thumb_matrix , self.index_matrix , self.middle_matrix , self.ring_matrix , self.little_matrix
+        self.request_frame(0xb1,[0xc6],timeout=0.009,reply=("matrix", 0xb1))
+        self.request_frame(0xb2,[0xc6],timeout=0.009,reply=("matrix", 0xb2))
+        self.request_frame(0xb3,[0xc6],timeout=0.009,reply=("matrix", 0xb3))
+        self.request_frame(0xb4,[0xc6],timeout=0.009,reply=("matrix", 0xb4))
+        self.request_frame(0xb5,[0xc6],timeout=0.009,reply=("matrix", 0xb5))
+        return self.tactile.fingers()
     
     def get_thumb_matrix_touch(self,sleep_time=0.005):
-        self.send_frame(0xb1,[0xc6],sleep=sleep_time)
-        return self.thumb_matrix
+        self.request_frame(0xb1,[0xc6],timeout=sleep_time,reply=("matrix", 0xb1))
+        return self.tactile.finger(0)
     
     def get_index_matrix_touch(self,sleep_time=0.005):
-        self.send_frame(0xb2,[0xc6],sleep=sleep_time)
-        return self.index_matrix
+        self.request_frame(0xb2,[0xc6],timeout=sleep_time,reply=("matrix", 0xb2))
+        return self.tactile.finger(1)
     
     def get_middle_matrix_touch(self,sleep_time=0.005):
-        self.send_frame(0xb3,[0xc6],sleep=sleep_time)
-        return self.middle_matrix
+        self.request_frame(0xb3,[0xc6],timeout=sleep_time,reply=("matrix", 0xb3))
+        return self.tactile.finger(2)
     
     def get_ring_matrix_touch(self,sleep_time=0.005):
-        self.send_frame(0xb4,[0xc6],sleep=sleep_time)
-        return self.ring_matrix
+        self.request_frame(0xb4,[0xc6],timeout=sleep_time,reply=("matrix", 0xb4))
+        return self.tactile.finger(3)
     
     def get_little_matrix_touch(self,sleep_time=0.005):
-        self.send_frame(0xb5,[0xc6],sleep=sleep_time)
-        return self.little_matrix
+        self.request_frame(0xb5,[0xc6],timeout=sleep_time,reply=("matrix", 0xb5))
+        return self.tactile.finger(4)
 
     def get_force(self):
         '''Get pressure.'''
@@ -398,7 +292,8 @@ class RealHandL6Can:
 
     def get_serial_number(self):
         try:
-            self.send_frame(0xC0,[],sleep=0.005)
+            self.serial_number = []
+            self.request_frame(0xC0,[],timeout=0.02,reply=("serial", 0xC0))
             # 1. Use the bytes() function to convert an integer list into a bytes object
             #    bytes() accepts a list of integers between 0 and 255.
             byte_data = bytes(self.serial_number)
@@ -412,11 +307,3 @@ class RealHandL6Can:
                 return result_string
         except:
             return "-1"
-
-    def close_can_interface(self):
-        """Stop the CAN communication."""
-        self.running = False
-        if self.receive_thread.is_alive():
-            self.receive_thread.join()
-        if self.bus:
-            self.bus.shutdown()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Asyncio Modbus-RTU backend for the O6/L6/L10 RS485 hands (based on pymodbus 3.5.1)
+
+All transactions go through one scheduler task per port. Read requests queued while the bus is
+busy are merged, and their register blocks coalesced, so a full status dump that takes one
+transaction per block on the sync drivers becomes a single read_input_registers call.
+"""
+
+import time
+import asyncio
+from typing import Any, Dict, List
+import numpy as np
+from pymodbus.client import AsyncModbusSerialClient
+
+from core.rs485.register_map import (INPUT_BLOCKS, HOLDING_BLOCKS, FRAME_GAP, PRESSURE_SELECT,
+                                     PRESSURE_DATA, PRESSURE_COUNT, PRESSURE_SKIP, PRESSURE_MODELS,
+                                     coalesce)
+
+STATUS_BLOCKS = ("state", "torque", "speed", "temperature", "fault", "version")
+
+
+class AsyncRealHandRS485:
+    """
+    O6/L6/L10 Modbus-RTU hand driven from an asyncio event loop.
+
+        async with AsyncRealHandRS485("O6", hand_id=0x27, modbus_port="/dev/ttyUSB0") as hand:
+            state = await hand.get_state()
+    """
+
+    TIMEOUT = 0.05
+
+    def __init__(self, hand_joint="O6", hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200,
+                 frame_gap=None, max_hole=0):
+        """
+        hand_joint: "O6", "L6" or "L10"
+        frame_gap: minimum time between transactions, defaults to the firmware gap of the model
+        max_hole: largest run of unmapped registers a coalesced read may span
+        """
+        self.hand_joint = hand_joint.upper()
+        if self.hand_joint not in INPUT_BLOCKS:
+            raise ValueError(f"No RS485 register map for {hand_joint}")
+        self.slave = hand_id
+        self.modbus_port = modbus_port
+        self.blocks = INPUT_BLOCKS[self.hand_joint]
+        self.holding = HOLDING_BLOCKS[self.hand_joint]
+        self.frame_gap = FRAME_GAP[self.hand_joint] if frame_gap is None else frame_gap
+        self.max_hole = max_hole
+        self.cli = AsyncModbusSerialClient(
+            port=modbus_port,
+            baudrate=baudrate,
+            bytesize=8,
+            parity="N",
+            stopbits=1,
+            timeout=self.TIMEOUT,
+        )
+        self.connected = False
+        self.transactions = 0
+        self._last_ts = 0.0
+        self._queue = None
+        self._worker = None
+
+    # ----------------------------------------------------------
+    # Connection
+    # ----------------------------------------------------------
+    async def connect(self):
+        self.connected = await self.cli.connect()
+        if not self.connected:
+            raise ConnectionError(f"RS485 connect fail to {self.modbus_port}")
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self.connected:
+            self.cli.close()
+            self.connected = False
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    # ----------------------------------------------------------
+    # Scheduler
+    # ----------------------------------------------------------
+    def _submit(self, kind, payload):
+        if self._queue is None:
+            raise ConnectionError("RS485 hand is not connected, await connect() first")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((kind, payload, future))
+        return future
+
+    async def _run(self):
+        while True:
+            jobs = [await self._queue.get()]
+            while not self._queue.empty():
+                jobs.append(self._queue.get_nowait())
+            # Serve in arrival order, merging each run of consecutive reads
+            reads = []
+            for job in jobs:
+                if job[0] == "read":
+                    reads.append(job)
+                    continue
+                if reads:
+                    await self._serve_reads(reads)
+                    reads = []
+                await self._serve(job)
+            if reads:
+                await self._serve_reads(reads)
+
+    async def _transact(self, request):
+        # Keep the bus busy but never closer than the firmware frame gap
+        delay = self._last_ts + self.frame_gap - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            rsp = await request()
+        finally:
+            self._last_ts = time.perf_counter()
+            self.transactions += 1
+        if rsp.isError():
+            raise RuntimeError(f"Modbus transaction failed: {rsp}")
+        return rsp
+
+    async def _serve_reads(self, jobs):
+        names = {name for job in jobs for name in job[1]}
+        try:
+            registers: Dict[int, int] = {}
+            for address, count in coalesce([self.blocks[name] for name in names], self.max_hole):
+                rsp = await self._transact(lambda: self.cli.read_input_registers(
+                    address=address, count=count, slave=self.slave))
+                for i, value in enumerate(rsp.registers):
+                    registers[address + i] = int(value)
+            values = {}
+            for name in names:
+                address, count = self.blocks[name]
+                values[name] = [registers[a] for a in range(address, address + count)]
+        except Exception as e:
+            for job in jobs:
+                if not job[2].done():
+                    job[2].set_exception(e)
+            return
+        for job in jobs:
+            if not job[2].done():
+                job[2].set_result({name: values[name] for name in job[1]})
+
+    async def _serve(self, job):
+        kind, payload, future = job
+        try:
+            if kind == "write":
+                address, values = payload
+                await self._transact(lambda: self.cli.write_registers(
+                    address=address, values=values, slave=self.slave))
+                result = None
+            else:
+                # Finger select and matrix read must not be split by another transaction
+                await self._transact(lambda: self.cli.write_register(
+                    address=PRESSURE_SELECT, value=payload, slave=self.slave))
+                rsp = await self._transact(lambda: self.cli.read_input_registers(
+                    address=PRESSURE_DATA, count=PRESSURE_COUNT, slave=self.slave))
+                result = rsp.registers
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    # ----------------------------------------------------------
+    # Reads
+    # ----------------------------------------------------------
+    async def read(self, *names) -> Dict[str, List[int]]:
+        """Read several register blocks by name, e.g. read("state", "fault")"""
+        for name in names:
+            if name not in self.blocks:
+                raise ValueError(f"{self.hand_joint} has no register block {name}")
+        return await self._submit("read", names)
+
+    async def _read_block(self, name) -> List[int]:
+        return (await self.read(name))[name]
+
+    async def get_state(self) -> List[int]:
+        return await self._read_block("state")
+
+    async def get_current_status(self) -> List[int]:
+        return await self.get_state()
+
+    async def get_torque(self) -> List[int]:
+        return await self._read_block("torque")
+
+    async def get_speed(self) -> List[int]:
+        return await self._read_block("speed")
+
+    async def get_joint_speed(self) -> List[int]:
+        return await self.get_speed()
+
+    async def get_temperature(self) -> List[int]:
+        return await self._read_block("temperature")
+
+    async def get_fault(self) -> List[int]:
+        return await self._read_block("fault")
+
+    async def get_version(self) -> List[int]:
+        version = await self._read_block("version")
+        if self.hand_joint == "L6":
+            # freedom, version, number, direction, software major, hardware
+            return version[:5] + version[7:8]
+        return version
+
+    async def dump_status(self) -> Dict[str, List[int]]:
+        """Every input register block, a single 36 register read on O6"""
+        return await self.read(*STATUS_BLOCKS)
+
+    # ----------------------------------------------------------
+    # Writes
+    # ----------------------------------------------------------
+    async def _write_block(self, name, values: List[Any]):
+        address, count = self.holding[name]
+        try:
+            values = [int(v) for v in values]
+        except (ValueError, TypeError):
+            raise ValueError(f"{name} values must be {count} integers between 0 and 255")
+        if len(values) != count or not all(0 <= v <= 255 for v in values):
+            raise ValueError(f"{name} values must be {count} integers between 0 and 255")
+        await self._submit("write", (address, values))
+
+    async def set_joint_positions(self, joint_angles=None):
+        await self._write_block("state", joint_angles or [0] * self.holding["state"][1])
+
+    async def set_torque(self, torque=None):
+        await self._write_block("torque", torque or [200] * self.holding["torque"][1])
+
+    async def set_speed(self, speed=None):
+        await self._write_block("speed", speed or [200] * self.holding["speed"][1])
+
+    # ----------------------------------------------------------
+    # Tactile matrices
+    # ----------------------------------------------------------
+    async def _pressure(self, finger: int) -> np.ndarray:
+        if finger < 1 or finger > 5:
+            raise ValueError(f"Invalid finger number: {finger}. Finger number should be between 1 and 5.")
+        registers = await self._submit("pressure", finger)
+        data = np.asarray(registers, dtype=np.uint16)[PRESSURE_SKIP:PRESSURE_SKIP + 72]
+        return (data & 0xFF).astype(np.uint8).reshape((12, 6))
+
+    async def get_matrix_touch(self):
+        if self.hand_joint not in PRESSURE_MODELS:
+            return tuple(np.full((12, 6), -1) for _ in range(5))
+        return tuple([await self._pressure(finger) for finger in range(1, 6)])
+
+    async def get_matrix_frame(self):
+        """(5, 12, 6) uint8 frame, RS485 hands have no frame sequence number"""
+        return np.asarray(await self.get_matrix_touch(), dtype=np.uint8), -1
+
+    async def get_touch_type(self):
+        return 2 if self.hand_joint in PRESSURE_MODELS else -1
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 import os
 import time
+from threading import Lock
 from typing import List
 import numpy as np
 from pymodbus.client import ModbusSerialClient
+from core.rs485.register_cache import RegisterCache
 _INTERVAL = 0.008  # 8 ms
 
 
@@ -11,9 +13,12 @@ class RealHandL10RS485:
     KEYS = ["thumb_cmc_pitch", "thumb_cmc_roll", "index_mcp_pitch", "middle_mcp_pitch",
             "ring_mcp_pitch", "pinky_mcp_pitch", "index_mcp_roll", "ring_mcp_roll",
             "pinky_mcp_roll", "thumb_cmc_yaw"]
+    DOF = 10
 
-    def __init__(self, hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200):
+    def __init__(self, hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200, cache_ttl=None):
         self.slave = hand_id
+        # Serialises the Modbus transactions of the caller and the state poller threads
+        self._lock = Lock()
         self.cli = ModbusSerialClient(
             port=modbus_port,
             baudrate=baudrate,
@@ -29,48 +34,64 @@ class RealHandL10RS485:
         self.connected = self.cli.connect()
         if not self.connected:
             raise ConnectionError(f"RS485 connect fail to {modbus_port}")
+        # get_* getters are served from here, read_* always query the hand
+        self.cache = RegisterCache(self._read_input_registers, "L10", ttl=cache_ttl)
 
     # --------------------------------------------------
     # Batch Read Interface
     # --------------------------------------------------
+    def _read_input_registers(self, address: int, count: int) -> List[int]:
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=address, count=count, slave=self.slave)
+        if rsp.isError():
+            raise RuntimeError(f"read input registers {address}+{count} failed: {rsp}")
+        return rsp.registers
+
     def read_angles(self) -> List[int]:
-        time.sleep(_INTERVAL)
-        rsp = self.cli.read_input_registers(address=0, count=10, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=0, count=10, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"read_angles failed: {rsp}")
         return rsp.registers
 
     def read_torques(self) -> List[int]:
-        time.sleep(_INTERVAL)
-        rsp = self.cli.read_input_registers(address=10, count=10, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=10, count=10, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"read_torques failed: {rsp}")
         return rsp.registers
 
     def read_speeds(self) -> List[int]:
-        time.sleep(_INTERVAL)
-        rsp = self.cli.read_input_registers(address=20, count=10, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=20, count=10, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"read_speeds failed: {rsp}")
         return rsp.registers
 
     def read_temperatures(self) -> List[int]:
-        time.sleep(_INTERVAL)
-        rsp = self.cli.read_input_registers(address=40, count=10, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=40, count=10, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"read_temperatures failed: {rsp}")
         return rsp.registers
 
     def read_error_codes(self) -> List[int]:
-        time.sleep(_INTERVAL)
-        rsp = self.cli.read_input_registers(address=50, count=10, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=50, count=10, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"read_error_codes failed: {rsp}")
         return rsp.registers
 
     def read_versions(self) -> dict:
-        time.sleep(_INTERVAL)
-        rsp = self.cli.read_input_registers(address=158, count=6, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.read_input_registers(address=158, count=6, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"read_versions failed: {rsp}")
         keys = ["hand_freedom", "hand_version", "hand_number",
@@ -131,17 +152,19 @@ class RealHandL10RS485:
             
         finger_write_value = finger 
         
-        # 1. Write finger selection register (address 60)
-        time.sleep(0.008)
-        wrsp = self.cli.write_register(address=write_address, value=finger_write_value, slave=self.slave)
-        if wrsp.isError():
-            raise RuntimeError(f"Failed to write finger selection {finger} to address {write_address}: {wrsp}")
-
-        # Wait a moment after writing
-        time.sleep(0.008) 
-        
-        # 2. Read data from address 62
-        rrsp = self.cli.read_input_registers(address=read_address, count=read_count, slave=self.slave)
+        # Finger selection and readout form one transaction
+        with self._lock:
+            # 1. Write finger selection register (address 60)
+            time.sleep(0.008)
+            wrsp = self.cli.write_register(address=write_address, value=finger_write_value, slave=self.slave)
+            if wrsp.isError():
+                raise RuntimeError(f"Failed to write finger selection {finger} to address {write_address}: {wrsp}")
+
+            # Wait a moment after writing
+            time.sleep(0.008)
+
+            # 2. Read data from address 62
+            rrsp = self.cli.read_input_registers(address=read_address, count=read_count, slave=self.slave)
         
         if rrsp.isError():
             raise RuntimeError(f"Failed to read pressure data from address {read_address}: {rrsp}")
@@ -180,8 +203,9 @@ class RealHandL10RS485:
         if not self.is_valid_10xuint8(vals):
             raise ValueError("Requires 10 integers between 0-255")
         
-        time.sleep(_INTERVAL)
-        rsp = self.cli.write_registers(address=0, values=vals, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.write_registers(address=0, values=vals, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"write_angles failed: {rsp}")
 
@@ -190,8 +214,9 @@ class RealHandL10RS485:
         if not self.is_valid_10xuint8(vals):
             raise ValueError("Requires 10 integers between 0-255")
             
-        time.sleep(_INTERVAL)
-        rsp = self.cli.write_registers(address=20, values=vals, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.write_registers(address=20, values=vals, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"write_speeds failed: {rsp}")
 
@@ -200,8 +225,9 @@ class RealHandL10RS485:
         if not self.is_valid_10xuint8(vals):
             raise ValueError("Requires 10 integers between 0-255")
             
-        time.sleep(_INTERVAL)
-        rsp = self.cli.write_registers(address=10, values=vals, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            rsp = self.cli.write_registers(address=10, values=vals, slave=self.slave)
         if rsp.isError():
             raise RuntimeError(f"write_torques failed: {rsp}")
 
@@ -209,9 +235,10 @@ class RealHandL10RS485:
     # Context Management
     # --------------------------------------------------
     def close(self):
-        if self.connected:
-            self.cli.close()
-            self.connected = False
+        with self._lock:
+            if self.connected:
+                self.cli.close()
+                self.connected = False
 
     def __enter__(self):
         return self
@@ -237,10 +264,12 @@ class RealHandL10RS485:
     def set_speed(self, speed=None):
         speed = speed or [200] * 10
         self.write_speeds(speed)
+        self.cache.invalidate("speed")
 
     def set_torque(self, torque=None):
         torque = torque or [200] * 10
         self.write_torques(torque)
+        self.cache.invalidate("torque")
 
     def set_current(self, current=None):
         print("Current setting not supported for L10", flush=True)
@@ -252,7 +281,7 @@ class RealHandL10RS485:
         print("Current retrieval not supported for L10", flush=True)
 
     def get_state(self) -> List[int]:
-        return self.read_angles()
+        return self.cache.get("state")
 
     def get_state_for_pub(self) -> List[int]:
         return self.get_state()
@@ -261,7 +290,7 @@ class RealHandL10RS485:
         return self.get_state()
 
     def get_speed(self) -> List[int]:
-        return self.read_speeds()
+        return self.cache.get("speed")
 
     def get_joint_speed(self) -> List[int]:
         return self.get_speed()
@@ -303,13 +332,13 @@ class RealHandL10RS485:
         return self.get_matrix_touch()
 
     def get_torque(self) -> List[int]:
-        return self.read_torques()
+        return self.cache.get("torque")
 
     def get_temperature(self) -> List[int]:
-        return self.read_temperatures()
+        return self.cache.get("temperature")
 
     def get_fault(self) -> List[int]:
-        return self.read_error_codes()
+        return self.cache.get("fault")
 
 
 # ------------------- demo -------------------
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import os
 import time
+from threading import Lock
 from pymodbus.client import ModbusSerialClient
+from core.rs485.register_cache import RegisterCache
 from typing import List, Dict
 import numpy as np
 
@@ -16,15 +18,19 @@ class RealHandL6RS485:
     
     # Finger names
     FINGER_NAMES = ["thumb", "index", "middle", "ring", "little"]
+    DOF = 6
     
-    def __init__(self, hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200):
+    def __init__(self, hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200, cache_ttl=None):
         """
         Initialize L6 robotic hand
         hand_id: right hand 0x27(39), left hand 0x28(40)
         modbus_port: serial device path
         baudrate: baud rate, fixed at 115200
+        cache_ttl: per block overrides of the register cache TTLs, e.g. {"temperature": 2.0}
         """
         self.slave = hand_id
+        # Serialises the Modbus transactions of the caller and the state poller threads
+        self._lock = Lock()
         self.cli = ModbusSerialClient(
             port=modbus_port, 
             baudrate=baudrate,
@@ -37,26 +43,31 @@ class RealHandL6RS485:
         self.connected = self.cli.connect()
         if not self.connected:
             raise ConnectionError(f"RS485 connection failed, port: {modbus_port}")
+        # get_* getters are served from here, read_* always query the hand
+        self.cache = RegisterCache(self._read_input_registers, "L6", ttl=cache_ttl)
 
     def _read_input_registers(self, address: int, count: int) -> List[int]:
         """Read input registers"""
-        time.sleep(_INTERVAL)
-        result = self.cli.read_input_registers(address=address, count=count, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            result = self.cli.read_input_registers(address=address, count=count, slave=self.slave)
         if result.isError():
             raise RuntimeError(f"Failed to read input registers: address={address}, count={count}")
         return result.registers
 
     def _write_register(self, address: int, value: int):
         """Write single register"""
-        time.sleep(_INTERVAL)
-        result = self.cli.write_register(address=address, value=value, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            result = self.cli.write_register(address=address, value=value, slave=self.slave)
         if result.isError():
             raise RuntimeError(f"Failed to write register: address={address}, value={value}")
 
     def _write_registers(self, address: int, values: List[int]):
         """Write multiple registers"""
-        time.sleep(_INTERVAL)
-        result = self.cli.write_registers(address=address, values=values, slave=self.slave)
+        with self._lock:
+            time.sleep(_INTERVAL)
+            result = self.cli.write_registers(address=address, values=values, slave=self.slave)
         if result.isError():
             raise RuntimeError(f"Failed to write multiple registers: address={address}, values={values}")
 
@@ -117,17 +128,19 @@ class RealHandL6RS485:
             
         finger_write_value = finger 
         
-        # 1. Write finger selection register (address 60)
-        time.sleep(0.008)
-        wrsp = self.cli.write_register(address=write_address, value=finger_write_value, slave=self.slave)
-        if wrsp.isError():
-            raise RuntimeError(f"Failed to write finger selection {finger} to address {write_address}: {wrsp}")
-
-        # Wait a moment after writing
-        time.sleep(0.008) 
-        
-        # 2. Read data from address 62
-        rrsp = self.cli.read_input_registers(address=read_address, count=read_count, slave=self.slave)
+        # Finger selection and readout form one transaction
+        with self._lock:
+            # 1. Write finger selection register (address 60)
+            time.sleep(0.008)
+            wrsp = self.cli.write_register(address=write_address, value=finger_write_value, slave=self.slave)
+            if wrsp.isError():
+                raise RuntimeError(f"Failed to write finger selection {finger} to address {write_address}: {wrsp}")
+
+            # Wait a moment after writing
+            time.sleep(0.008)
+
+            # 2. Read data from address 62
+            rrsp = self.cli.read_input_registers(address=read_address, count=read_count, slave=self.slave)
         
         if rrsp.isError():
             raise RuntimeError(f"Failed to read pressure data from address {read_address}: {rrsp}")
@@ -229,9 +242,10 @@ class RealHandL6RS485:
     
     def close(self):
         """Close connection"""
-        if self.connected:
-            self.cli.close()
-            self.connected = False
+        with self._lock:
+            if self.connected:
+                self.cli.close()
+                self.connected = False
     
     def __enter__(self):
         return self
@@ -258,11 +272,13 @@ class RealHandL6RS485:
         """Set speed"""
         speed = speed or [200] * 6
         self.write_speeds(speed)
+        self.cache.invalidate("speed")
     
     def set_torque(self, torque=None):
         """Set torque"""
         torque = torque or [200] * 6
         self.write_torques(torque)
+        self.cache.invalidate("torque")
 
     def set_current(self, current=None):
         """Set current (L6 not supported)"""
@@ -287,7 +303,7 @@ class RealHandL6RS485:
 
     def get_state(self) -> list:
         """Get joint state"""
-        return self.read_angles()
+        return self.cache.get("state")
     
     def get_state_for_pub(self) -> list:
         return self.get_state()
@@ -297,7 +313,7 @@ class RealHandL6RS485:
     
     def get_speed(self) -> list:
         """Get current speeds"""
-        return self.read_speeds()
+        return self.cache.get("speed")
     
     def get_joint_speed(self) -> list:
         return self.get_speed()
@@ -347,15 +363,15 @@ class RealHandL6RS485:
     
     def get_torque(self) -> list:
         """Get current torques"""
-        return self.read_torques()
+        return self.cache.get("torque")
     
     def get_temperature(self) -> list:
         """Get current motor temperatures"""
-        return self.read_temperatures()
+        return self.cache.get("temperature")
     
     def get_fault(self) -> list:
         """Get current motor fault codes"""
-        return self.read_error_codes()
+        return self.cache.get("fault")
 
     # --------------------------------------------------
     # Convenience methods
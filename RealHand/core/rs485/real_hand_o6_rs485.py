@@ -13,6 +13,7 @@ from threading import Lock # used for thread safety and bus arbitration
 # Import pymodbus client
 from pymodbus.client import ModbusSerialClient
 from struct import error as StructError 
+from core.rs485.register_cache import RegisterCache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -93,11 +94,14 @@ class RealHandO6RS485:
     # KEYS for easy indexing
     JOINT_KEYS = ["thumb_pitch", "thumb_yaw", "index_pitch", 
                   "middle_pitch", "ring_pitch", "little_pitch"]
+    DOF = 6
 
-    def __init__(self, hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200):
+    def __init__(self, hand_id=0x27, modbus_port="/dev/ttyUSB0", baudrate=115200, cache_ttl=None):
         self._id = hand_id
         self._last_ts = 0.0  # Last frame end time
         self._lock = Lock()  # Bus access lock
+        # get_* batch getters are served from here, read_all_* always query the hand
+        self.cache = RegisterCache(self._execute_read, "O6", ttl=cache_ttl)
 
         # Use pymodbus 3.x client
         self.cli = ModbusSerialClient(
@@ -124,23 +128,22 @@ class RealHandO6RS485:
     # Helper methods
     # ----------------------------------------------------------
     def _bus_free(self):
-        """Ensure interval from last frame ≥ 30 ms"""
-        with self._lock:
-            elapse = time.perf_counter() - self._last_ts
-            if elapse < self.FRAME_GAP:
-                time.sleep(self.FRAME_GAP - elapse)
+        """Ensure interval from last frame ≥ 30 ms, called with _lock held"""
+        elapse = time.perf_counter() - self._last_ts
+        if elapse < self.FRAME_GAP:
+            time.sleep(self.FRAME_GAP - elapse)
 
     def _execute_read(self, address: int, count: int) -> List[int]:
         """Execute Modbus read operation (function code 04) with bus arbitration."""
-        self._bus_free()
-        
-        rsp = self.cli.read_input_registers(
-            address=address, 
-            count=count, 
-            slave=self._id
-        )
-        
-        self._last_ts = time.perf_counter()
+        # Held for the whole transaction, the state poller shares the port with the caller
+        with self._lock:
+            self._bus_free()
+            rsp = self.cli.read_input_registers(
+                address=address,
+                count=count,
+                slave=self._id
+            )
+            self._last_ts = time.perf_counter()
         
         if rsp.isError():
             raise RuntimeError(f"Modbus Read Failed (Addr={address}, Count={count}): {rsp}")
@@ -150,16 +153,15 @@ class RealHandO6RS485:
 
     def _execute_write(self, address: int, values: List[int]):
         """Execute Modbus batch write operation (function code 16) with bus arbitration."""
-        self._bus_free()
-        
-        # values must be a list of native Python integers
-        rsp = self.cli.write_registers(
-            address=address, 
-            values=values, 
-            slave=self._id
-        )
-        
-        self._last_ts = time.perf_counter()
+        with self._lock:
+            self._bus_free()
+            # values must be a list of native Python integers
+            rsp = self.cli.write_registers(
+                address=address,
+                values=values,
+                slave=self._id
+            )
+            self._last_ts = time.perf_counter()
         
         if rsp.isError():
             raise RuntimeError(f"Modbus Write Failed (Addr={address}, Values={values}): {rsp}")
@@ -240,23 +242,23 @@ class RealHandO6RS485:
     # ----------------------------------------------------------
     def get_state(self) -> List[int]:
         """Get finger motor state (angles)"""
-        return self.read_all_angles()
+        return self.cache.get("state")
 
     def get_torque(self) -> List[int]:
         """Get current torque"""
-        return self.read_all_torques()
+        return self.cache.get("torque")
 
     def get_speed(self) -> List[int]:
         """Get current speed"""
-        return self.read_all_speeds()
+        return self.cache.get("speed")
 
     def get_temperature(self) -> List[int]:
         """Get current motor temperature"""
-        return self.read_all_temperatures()
+        return self.cache.get("temperature")
     
     def get_fault(self) -> List[int]:
         """Get current motor fault codes"""
-        return self.read_all_errors()
+        return self.cache.get("fault")
     
     def get_version(self) -> list:
         """Get current firmware version numbers"""
@@ -346,6 +348,7 @@ class RealHandO6RS485:
         
         int_speed = [int(v) for v in speed]
         self._write_regs(REG_WR_THUMB_SPEED, int_speed)
+        self.cache.invalidate("speed")
     
     def set_torque(self, torque: List[Any] = None):
         torque = torque or [200] * 6
@@ -355,6 +358,7 @@ class RealHandO6RS485:
             
         int_torque = [int(v) for v in torque]
         self._write_regs(REG_WR_THUMB_TORQUE, int_torque)
+        self.cache.invalidate("torque")
 
     # ... (other fixed functions remain unchanged) ...
 
@@ -416,10 +420,11 @@ class RealHandO6RS485:
     # Context management
     # ----------------------------------------------------------
     def close(self):
-        if hasattr(self, 'connected') and self.connected:
-            self.cli.close()
-            self.connected = False
-            logging.info("Modbus connection closed.")
+        with self._lock:
+            if hasattr(self, 'connected') and self.connected:
+                self.cli.close()
+                self.connected = False
+                logging.info("Modbus connection closed.")
 
     def __enter__(self):
         return self
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Time-to-live cache over the input registers of an RS485 hand
+"""
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from core.rs485.register_map import INPUT_BLOCKS, CONTIGUOUS_INPUT
+
+# Seconds a block stays fresh, None never expires. Joint angles are always read.
+DEFAULT_TTL = {
+    "state": 0.0,
+    "torque": 0.1,
+    "speed": 0.1,
+    "temperature": 1.0,
+    "fault": 0.5,
+    "version": None,
+}
+
+
+class RegisterCache:
+    """
+    Serve register blocks from memory while they are fresh.
+    A miss re-reads every stale block of the contiguous range in one transaction, so a full
+    status refresh costs one round trip and the following getters cost none.
+    """
+
+    def __init__(self, read: Callable[[int, int], List[int]], hand_joint: str, ttl: Optional[Dict] = None):
+        """
+        read: read(address, count) doing one read_input_registers transaction
+        ttl: per block overrides of DEFAULT_TTL
+        """
+        self._read = read
+        self.blocks = INPUT_BLOCKS[hand_joint]
+        self.span = CONTIGUOUS_INPUT[hand_joint]
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self._values: Dict[str, List[int]] = {}
+        self._stamps: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def _fresh(self, name, now):
+        if name not in self._stamps:
+            return False
+        ttl = self.ttl.get(name, 0.0)
+        return ttl is None or now - self._stamps[name] < ttl
+
+    def _in_span(self, name):
+        address, count = self.blocks[name]
+        return self.span[0] <= address and address + count <= self.span[1]
+
+    def get(self, name: str) -> List[int]:
+        with self._lock:
+            now = time.monotonic()
+            if self._fresh(name, now):
+                return list(self._values[name])
+            if not self._in_span(name):
+                address, count = self.blocks[name]
+                self._values[name] = list(self._read(address, count))
+                self._stamps[name] = time.monotonic()
+                return list(self._values[name])
+            stale = [n for n in self.blocks if self._in_span(n) and not self._fresh(n, now)]
+            start = min(self.blocks[n][0] for n in stale)
+            end = max(self.blocks[n][0] + self.blocks[n][1] for n in stale)
+            registers = self._read(start, end - start)
+            stamp = time.monotonic()
+            for n in stale:
+                address, count = self.blocks[n]
+                self._values[n] = [int(v) for v in registers[address - start:address - start + count]]
+                self._stamps[n] = stamp
+            return list(self._values[name])
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one block, or every block, so the next get reads the hand"""
+        with self._lock:
+            if name is None:
+                self._stamps.clear()
+            else:
+                self._stamps.pop(name, None)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Modbus register layout of the RS485 hands, shared by the sync and async drivers
+"""
+from typing import Dict, List, Tuple
+
+# ------------------------------------------------------------------
+# Input register blocks (function code 04): name -> (address, count)
+# ------------------------------------------------------------------
+INPUT_BLOCKS: Dict[str, Dict[str, Tuple[int, int]]] = {
+    "O6": {
+        "state":       (0, 6),
+        "torque":      (6, 6),
+        "speed":       (12, 6),
+        "temperature": (18, 6),
+        "fault":       (24, 6),
+        "version":     (30, 6),
+    },
+    "L6": {
+        "state":       (0, 6),
+        "torque":      (6, 6),
+        "speed":       (12, 6),
+        "temperature": (18, 6),
+        "fault":       (24, 6),
+        "version":     (148, 8),
+    },
+    "L10": {
+        "state":       (0, 10),
+        "torque":      (10, 10),
+        "speed":       (20, 10),
+        "temperature": (40, 10),
+        "fault":       (50, 10),
+        "version":     (158, 6),
+    },
+}
+
+# ------------------------------------------------------------------
+# Holding register blocks (function code 16): name -> (address, count)
+# ------------------------------------------------------------------
+HOLDING_BLOCKS: Dict[str, Dict[str, Tuple[int, int]]] = {
+    "O6":  {"state": (0, 6), "torque": (6, 6), "speed": (12, 6)},
+    "L6":  {"state": (0, 6), "torque": (6, 6), "speed": (12, 6)},
+    "L10": {"state": (0, 10), "torque": (10, 10), "speed": (20, 10)},
+}
+
+# Input register range the register cache refreshes in a single read
+CONTIGUOUS_INPUT = {"O6": (0, 36), "L6": (0, 30), "L10": (0, 60)}
+
+# Minimum time between two transactions required by the hand firmware, in seconds
+FRAME_GAP = {"O6": 0.030, "L6": 0.006, "L10": 0.008}
+
+# Tactile matrix: finger select holding register, data input register, count and header length
+PRESSURE_SELECT = 60
+PRESSURE_DATA = 62
+PRESSURE_COUNT = 96
+PRESSURE_SKIP = 10
+PRESSURE_MODELS = ("L6", "L10")
+
+# Largest read_input_registers count allowed by the Modbus specification
+MAX_READ = 125
+
+
+def coalesce(blocks: List[Tuple[int, int]], max_hole: int = 0) -> List[Tuple[int, int]]:
+    """
+    Merge (address, count) blocks into the fewest reads.
+    Blocks closer than max_hole registers are joined, the registers in between are read and dropped.
+    The default only joins blocks that touch, so no unmapped register is ever read.
+    """
+    reads: List[List[int]] = []
+    for address, count in sorted(set(blocks)):
+        if reads:
+            start, end = reads[-1]
+            if address - end <= max_hole and max(end, address + count) - start <= MAX_READ:
+                reads[-1][1] = max(end, address + count)
+                continue
+        reads.append([address, address + count])
+    return [(start, end - start) for start, end in reads]
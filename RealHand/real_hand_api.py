@@ -1,19 +1,40 @@
 #!/usr/bin/env python3 
 # -*- coding: utf-8 -*-
 import sys, os, time,threading
+import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils.mapping import *
 from utils.color_msg import ColorMsg
 from utils.load_write_yaml import LoadWriteYaml
 from utils.open_can import OpenCan
+from utils.state_poller import StatePoller
+from utils.tactile_stream import TactileStreamer
+from utils.trajectory import TrajectoryExecutor, sample_trajectory
+from utils.flight_recorder import FlightRecorder
+from utils.metrics import Metrics, prometheus_text
+
+# Public methods not timed by enable_metrics()
+METRICS_UNTIMED = {"enable_metrics", "disable_metrics", "get_metrics", "get_metrics_text", "close_can",
+                   "show_fun_table", "on_connection_state"}
+
 
 class RealHandApi:
-    def __init__(self, hand_type="left", hand_joint="L10", modbus = "None",can="can0"):  # Ubuntu:can0   win:PCAN_USBBUS1
+    def __init__(self, hand_type="left", hand_joint="L10", modbus = "None",can="can0", interface=None):  # Ubuntu:can0   win:PCAN_USBBUS1
+        # interface: python-can interface, None for the platform default, "virtual" for utils.virtual_hand,
+        # "rawcan" for the raw AF_CAN socket of utils.raw_can
         self.last_position = []
+        self.poller = None
+        self.tactile_streamer = None
+        self.trajectory = None
+        self.recorder = None
+        self.metrics = None
+        self.bus_metrics = None
         self.yaml = LoadWriteYaml()
         self.config = self.yaml.load_setting_yaml()
         self.version = self.config["VERSION"]
         self.can = can
+        self.interface = interface
+        self.open_can = None
         ColorMsg(msg=f"Current SDK version: {self.version}", color="green")
         self.hand_joint = hand_joint
         self.hand_type = hand_type
@@ -27,38 +48,38 @@ class RealHandApi:
                 self.hand = RealHandO6RS485(hand_id=self.hand_id,modbus_port=modbus,baudrate=115200)
             else:
                 from core.can.real_hand_o6_can import RealHandO6Can
-                self.hand = RealHandO6Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+                self.hand = RealHandO6Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "L6":
             if modbus != "None":
                 from core.rs485.real_hand_l6_rs485 import RealHandL6RS485
                 self.hand = RealHandL6RS485(hand_id=self.hand_id,modbus_port=modbus,baudrate=115200)
             else:
                 from core.can.real_hand_l6_can import RealHandL6Can
-                self.hand = RealHandL6Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+                self.hand = RealHandL6Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "L7":
             from core.can.real_hand_l7_can import RealHandL7Can
-            self.hand = RealHandL7Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+            self.hand = RealHandL7Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "L10":
             if modbus != "None":
                 from core.rs485.real_hand_l10_rs485 import RealHandL10RS485
                 self.hand = RealHandL10RS485(hand_id=self.hand_id,modbus_port=modbus,baudrate=115200)
             else:
                 from core.can.real_hand_l10_can import RealHandL10Can
-                self.hand = RealHandL10Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+                self.hand = RealHandL10Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "L20":
             from core.can.real_hand_l20_can import RealHandL20Can
-            self.hand = RealHandL20Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+            self.hand = RealHandL20Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "G20":
             from core.can.real_hand_g20_can import RealHandG20Can
-            self.hand = RealHandG20Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+            self.hand = RealHandG20Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "L21":
             from core.can.real_hand_l21_can import RealHandL21Can
-            self.hand = RealHandL21Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+            self.hand = RealHandL21Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         if self.hand_joint == "L25":
             from core.can.real_hand_l25_can import RealHandL25Can
-            self.hand = RealHandL25Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml)
+            self.hand = RealHandL25Can(can_id=self.hand_id,can_channel=self.can, yaml=self.yaml, interface=self.interface)
         # Open can0
-        if sys.platform == "linux" and modbus=="None":
+        if sys.platform == "linux" and modbus=="None" and self.interface != "virtual":
             self.open_can = OpenCan(load_yaml=self.yaml)
             self.open_can.open_can(self.can)
             self.is_can = self.open_can.is_can_up_sysfs(interface=self.can)
@@ -102,6 +123,37 @@ class RealHandApi:
             ColorMsg(msg=f"Current RealHand is {self.hand_type}{self.hand_joint}, action sequence is {pose}, does not match", color="red")
         self.last_position = pose
 
+    def play_trajectory(self, times, waypoints, rate_hz=200, method="minjerk", wait=False):
+        '''
+        Stream a timed waypoint trajectory from a dedicated thread
+        @params: times list len(N) seconds, waypoints N x DoF 0~255 (DoF as for finger_move)
+                 method "linear" | "cubic" | "minjerk", wait block until the motion finished
+        Return the TrajectoryExecutor, its stats() reports overruns and timing jitter.
+        Each cycle is one set_joint_positions call, keep rate_hz below what the model can send
+        (about 100 Hz on L10, whose two position frames are paced by the driver).
+        '''
+        dof = getattr(self.hand, "DOF", None)
+        setpoints = sample_trajectory(times, waypoints, rate_hz=rate_hz, method=method)
+        if setpoints.shape[1] != dof:
+            ColorMsg(msg=f"Current RealHand is {self.hand_type}{self.hand_joint}, waypoints have {setpoints.shape[1]} joints, does not match", color="red")
+            return None
+        self.stop_trajectory()
+        self.trajectory = TrajectoryExecutor(self._send_setpoint, setpoints, rate_hz=rate_hz).start()
+        if wait:
+            self.trajectory.wait()
+        return self.trajectory
+
+    def _send_setpoint(self, pose):
+        '''Trajectory cycle, last_position follows the setpoints actually sent'''
+        self.hand.set_joint_positions(pose)
+        self.last_position = pose
+
+    def stop_trajectory(self):
+        '''Stop a running trajectory, the hand holds its last setpoint'''
+        if self.trajectory is not None:
+            self.trajectory.stop()
+            self.trajectory = None
+
     def _get_normal_force(self):
         '''# Get normal force'''
         self.hand.get_normal_force()
@@ -179,16 +231,100 @@ class RealHandApi:
         '''Get current'''
         return self.hand.get_current()
     
+    def start_state_poller(self, state_hz=100, speed_hz=20, status_hz=2):
+        '''
+        Start background telemetry polling. While running, get_state/get_speed/get_torque/
+        get_temperature/get_fault return the latest polled values without any bus I/O.
+        '''
+        if self.poller is None:
+            self.poller = StatePoller(self.hand, state_hz=state_hz, speed_hz=speed_hz, status_hz=status_hz)
+        self.poller.start()
+        return self.poller
+
+    def stop_state_poller(self):
+        '''Stop background telemetry polling, getters query the hand directly again'''
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller = None
+
+    def get_latest_state(self):
+        '''Get the latest polled HandState snapshot, None if the poller is not running'''
+        if self.poller is None:
+            return None
+        return self.poller.latest()
+
+    def _polled(self, field):
+        if self.poller is None or not self.poller.is_running():
+            return None
+        value = getattr(self.poller.latest(), field)
+        return None if value is None else list(value)
+
     def get_state(self):
         '''Get current joint state'''
+        state = self._polled("state")
+        if state is not None:
+            return state
         return self.hand.get_current_status()
 
+    def get_full_state(self, all_data=False):
+        '''
+        Get position, speed, torque, fault and temperature of every joint in one refresh (G20)
+        @params: all_data use the all finger data frames 0x98~0x9C instead of the per-finger queries
+        @return: dict of command order lists, see RealHandG20Can.get_full_state, None if not supported
+        '''
+        if not hasattr(self.hand, "get_full_state"):
+            ColorMsg(msg=f"get_full_state is not supported by {self.hand_joint}", color="yellow")
+            return None
+        return self.hand.get_full_state(all_data=all_data)
+
     
+    def get_sample_time(self, group="position"):
+        '''
+        Get when the values of a getter group were received (CAN)
+        @param group: position, speed, torque, temperature, fault, current, force or tactile
+        @return: (timestamp, seq), the kernel receive timestamp in seconds since the epoch and a sequence
+                 number that grows with every reply, (None, 0) before the first reply or on RS485
+        '''
+        if not hasattr(self.hand, "get_sample_time"):
+            return None, 0
+        return self.hand.get_sample_time(group)
+
+    def get_sample_times(self):
+        '''Get the (timestamp, seq) of every group the hand has, {} on RS485'''
+        if not hasattr(self.hand, "get_sample_times"):
+            return {}
+        return self.hand.get_sample_times()
+
+    def get_connection_state(self):
+        '''
+        Get the state of the CAN channel: "connected", "degraded" or "reconnecting"
+        See utils.connection_supervisor, None on RS485
+        '''
+        bus = getattr(self.hand, "bus", None)
+        if bus is None or not hasattr(bus, "supervisor"):
+            return None
+        return bus.supervisor.state
+
+    def on_connection_state(self, callback):
+        '''
+        Call callback(state, previous, error) whenever the CAN channel changes state.
+        It runs on the sending or the reconnect thread and must return quickly.
+        @return: False on RS485
+        '''
+        bus = getattr(self.hand, "bus", None)
+        if bus is None or not hasattr(bus, "supervisor"):
+            return False
+        bus.supervisor.add_listener(callback)
+        return True
+
     def get_state_for_pub(self):
         return self.hand.get_current_pub_status()
     
     def get_speed(self):
         '''Get speed'''
+        speed = self._polled("speed")
+        if speed is not None:
+            return speed
         return self.hand.get_speed()
 
     
@@ -232,6 +368,116 @@ class RealHandApi:
     
     def get_matrix_touch_v2(self):
         return self.hand.get_matrix_touch_v2()
+
+    def get_matrix_frame(self):
+        '''
+        Get the tactile matrices as one (5, 12, 6) uint8 frame plus its sequence number.
+        On CAN hands the frame is never torn: a finger is only published once all 12 rows arrived.
+        '''
+        matrices = self.hand.get_matrix_touch()
+        tactile = getattr(self.hand, "tactile", None)
+        if tactile is None:
+            # RS485 hands read each finger in one transaction and have no sequence number
+            return np.asarray(matrices, dtype=np.uint8), -1
+        # A copy, the receive thread reuses the memory of the buffer's frame
+        return tactile.snapshot()
+
+    def subscribe_tactile(self, callback, rate_hz=30):
+        '''
+        Stream complete tactile frames in the background.
+        callback(frame, seq, stamp) gets a (5, 12, 6) uint8 frame, its sequence number and a time.monotonic() stamp.
+        '''
+        if not hasattr(self.hand, "get_matrix_touch"):
+            ColorMsg(msg=f"{self.hand_joint} does not support tactile matrices", color="red")
+            return None
+        self.unsubscribe_tactile()
+        self.tactile_streamer = TactileStreamer(self.hand, callback, rate_hz=rate_hz)
+        self.tactile_streamer.start()
+        return self.tactile_streamer
+
+    def unsubscribe_tactile(self):
+        '''Stop tactile streaming'''
+        if self.tactile_streamer is not None:
+            self.tactile_streamer.stop()
+            self.tactile_streamer = None
+
+    def start_recording(self, path, capacity=1 << 20):
+        '''
+        Record every CAN frame sent and received on this channel into a memory-mapped ring file
+        @params: path capture file, capacity number of frames kept, the oldest are overwritten
+        Load the capture with utils.flight_recorder.load_capture.
+        '''
+        bus = getattr(self.hand, "bus", None)
+        if bus is None or not hasattr(bus, "set_recorder"):
+            ColorMsg(msg="Recording is only supported on CAN hands", color="red")
+            return None
+        self.stop_recording()
+        self.recorder = FlightRecorder(path, capacity=capacity)
+        bus.set_recorder(self.recorder)
+        return self.recorder
+
+    def stop_recording(self):
+        '''Stop recording and flush the capture file'''
+        if self.recorder is not None:
+            self.hand.bus.set_recorder(None)
+            self.recorder.close()
+            self.recorder = None
+
+    def enable_metrics(self):
+        '''
+        Count frames, reply timeouts, send errors, reconnects and unknown frames, and time replies, the receive loop
+        and every public method of this API. Read them with get_metrics() or get_metrics_text().
+        Until this is called the driver hooks are skipped by a None check.
+        '''
+        if self.metrics is not None:
+            return self.metrics
+        self.metrics = Metrics(labels={"hand": self.hand_joint, "hand_type": self.hand_type})
+        self.hand.metrics = self.metrics
+        bus = getattr(self.hand, "bus", None)
+        if bus is not None and hasattr(bus, "set_metrics") and bus.metrics is None:
+            # The receive loop is shared by the hands on the channel, the first one to ask times it
+            self.bus_metrics = Metrics(labels={"channel": self.can})
+            bus.set_metrics(self.bus_metrics)
+        for name in dir(type(self)):
+            if name.startswith("_") or name in METRICS_UNTIMED:
+                continue
+            method = getattr(self, name)
+            if callable(method):
+                # Instance attribute shadowing the method until disable_metrics()
+                setattr(self, name, self.metrics.timed("api_call_seconds", name, method))
+        return self.metrics
+
+    def disable_metrics(self):
+        '''Remove the hooks installed by enable_metrics(), the collected metrics are dropped'''
+        if self.metrics is None:
+            return
+        for name in list(vars(self)):
+            if getattr(vars(self)[name], "__wrapped_metrics__", None) is self.metrics:
+                delattr(self, name)
+        self.hand.metrics = None
+        if self.bus_metrics is not None:
+            if self.hand.bus.metrics is self.bus_metrics:
+                self.hand.bus.set_metrics(None)
+            self.bus_metrics = None
+        self.metrics = None
+
+    def get_metrics(self):
+        '''
+        Snapshot of the metrics as a dict, None before enable_metrics()
+        @return: {"hand": utils.metrics.Metrics.snapshot(), "bus": snapshot of the receive loop or None}
+        '''
+        if self.metrics is None:
+            return None
+        return {
+            "hand": self.metrics.snapshot(),
+            "bus": self.bus_metrics.snapshot() if self.bus_metrics is not None else None,
+        }
+
+    def get_metrics_text(self):
+        '''Metrics in the Prometheus text format, serve them with utils.metrics.serve_prometheus'''
+        if self.metrics is None:
+            return ""
+        return prometheus_text([m for m in (self.metrics, self.bus_metrics) if m is not None])
     
 
     def get_thumb_matrix_touch(self,sleep_time=0):
@@ -266,14 +512,23 @@ class RealHandApi:
 
     def get_torque(self):
         '''Get current maximum torque'''
+        torque = self._polled("torque")
+        if torque is not None:
+            return torque
         return self.hand.get_torque()
     
     def get_temperature(self):
         '''Get current motor temperature'''
+        temperature = self._polled("temperature")
+        if temperature is not None:
+            return temperature
         return self.hand.get_temperature()
     
     def get_fault(self):
         '''Get motor fault code'''
+        fault = self._polled("fault")
+        if fault is not None:
+            return fault
         return self.hand.get_fault()
     
     def clear_faults(self):
@@ -319,7 +574,12 @@ class RealHandApi:
     def show_fun_table(self):
         self.hand.show_fun_table()
     def close_can(self):
-        self.open_can.close_can0()                         
+        self.stop_trajectory()
+        self.stop_state_poller()
+        self.unsubscribe_tactile()
+        self.stop_recording()
+        if self.open_can is not None:
+            self.open_can.close_can0()                         
 
 if __name__ == "__main__":
     hand = RealHandApi(hand_type="right", hand_joint="L10")
\ No newline at end of file
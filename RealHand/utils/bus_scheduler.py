@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import heapq
+import threading
+import itertools
+from contextlib import contextmanager
+
+# Priority classes, lower goes first
+CONTROL = 0
+STATE = 1
+TACTILE = 2
+DIAGNOSTICS = 3
+
+# Seconds a queued frame may wait before it is dropped, None never drops.
+# A dropped query simply times out in the requester, a stale one is worth nothing.
+DEFAULT_DEADLINES = {CONTROL: None, STATE: 0.02, TACTILE: 0.05, DIAGNOSTICS: 0.5}
+
+
+def query_class(key, diagnostics=()):
+    '''
+    Priority class of a query from its ReplyWaiter key: tactile matrix requests yield to state
+    queries, the frame bytes in diagnostics (temperature, fault, version) yield to both
+    '''
+    if isinstance(key, tuple):
+        return TACTILE if key[0] == "matrix" else STATE
+    if key in diagnostics:
+        return DIAGNOSTICS
+    return STATE
+
+
+class BusScheduler:
+    '''
+    Transmit scheduler in front of one CAN socket.
+    Senders queue their frames and the one at the head of the queue transmits in its own thread,
+    so an idle bus costs no hand-off. The queue is ordered by priority class, then deadline.
+    Control frames always go first and are never throttled. The other classes share the
+    optional bandwidth budget and are dropped once their deadline has passed.
+    '''
+    def __init__(self, transmit, budget=None, deadlines=None):
+        '''
+        :param transmit: transmit(msgs, gap) sending frames on the socket
+        :param budget: frames per second for the whole channel, None for no limit. Control frames
+                       count against it but never wait for it.
+        '''
+        self._transmit = transmit
+        self.deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self._cond = threading.Condition()
+        self._queue = []
+        self._busy = False
+        self._order = itertools.count()
+        self._local = threading.local()
+        self.dropped = 0
+        self.set_budget(budget)
+
+    def set_budget(self, budget):
+        '''Limit the channel to budget frames per second, None removes the limit'''
+        with self._cond:
+            self.budget = budget
+            # Allow a burst of 10 ms worth of frames, at least one full batch of 8
+            self._burst = None if budget is None else max(8.0, budget * 0.01)
+            self._tokens = self._burst
+            self._refill_ts = time.monotonic()
+            self._cond.notify_all()
+
+    @contextmanager
+    def priority(self, priority):
+        '''
+        Send the frames of this thread in priority class priority.
+        The outermost block wins, so a poller can demote the queries a driver runs inside it.
+        '''
+        if getattr(self._local, "priority", None) is not None:
+            yield
+            return
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = None
+
+    def current(self, priority=None):
+        '''Class submit() sends this thread's frames in for priority'''
+        local = getattr(self._local, "priority", None)
+        if local is not None:
+            return local
+        return CONTROL if priority is None else priority
+
+    def _token_wait(self, n, now):
+        if self._burst is None:
+            return 0.0
+        self._tokens = min(self._burst, self._tokens + (now - self._refill_ts) * self.budget)
+        self._refill_ts = now
+        need = min(n, self._burst)
+        if self._tokens >= need:
+            return 0.0
+        return (need - self._tokens) / self.budget
+
+    def submit(self, msgs, gap=0.0, priority=None, deadline=None):
+        '''
+        Transmit msgs back-to-back once they reach the head of the queue.
+        :param priority: class for this call, the thread's priority() block takes precedence, CONTROL by default
+        :param deadline: seconds the frames may wait, defaults to the class deadline
+        Return False if the frames were dropped at their deadline.
+        '''
+        priority = self.current(priority)
+        if deadline is None:
+            deadline = self.deadlines.get(priority)
+        expires = float("inf") if deadline is None else time.monotonic() + deadline
+        job = (priority, expires, next(self._order))
+        with self._cond:
+            heapq.heappush(self._queue, job)
+            while True:
+                now = time.monotonic()
+                if now >= expires:
+                    self._queue.remove(job)
+                    heapq.heapify(self._queue)
+                    self.dropped += 1
+                    self._cond.notify_all()
+                    return False
+                timeout = None
+                if self._queue[0] is job and not self._busy:
+                    timeout = self._token_wait(len(msgs), now)
+                    if priority == CONTROL or timeout <= 0:
+                        break
+                if expires != float("inf"):
+                    timeout = expires - now if timeout is None else min(timeout, expires - now)
+                # Woken whenever a send completes or the queue changes, so control frames can jump ahead
+                self._cond.wait(timeout)
+            heapq.heappop(self._queue)
+            self._busy = True
+            if self._burst is not None:
+                self._tokens -= len(msgs)
+        try:
+            self._transmit(msgs, gap)
+        finally:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+        return True
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import time
+import threading
+import can
+from utils.color_msg import ColorMsg
+from utils.bus_scheduler import BusScheduler, CONTROL
+from utils.flight_recorder import RX, TX
+from utils.raw_can import RAW_INTERFACE, RawCanBus
+from utils.connection_supervisor import ConnectionSupervisor, CONNECTED, RECONNECTING, STATES
+
+# Longest wait of the receive thread in recv(). A recv blocked on a socket that reconnect() closed is
+# not woken, so this bounds how long replies are missed after a reconnect.
+RECV_TIMEOUT = 0.1
+
+
+def default_interface():
+    if sys.platform == "linux":
+        return "socketcan"
+    elif sys.platform == "win32":
+        return "pcan"
+    raise EnvironmentError("Unsupported platform for CAN interface")
+
+
+class SharedCanBus:
+    '''
+    One CAN socket shared by every hand on a channel.
+    A single receive thread dispatches frames to the drivers registered for their arbitration_id.
+    '''
+    def __init__(self, channel, interface, bitrate, factory=None):
+        self.channel = channel
+        self.interface = interface
+        self.bitrate = bitrate
+        self._factory = factory
+        self._lock = threading.Lock()
+        # Keeps a batch from being interleaved with frames sent by another hand
+        self._tx_lock = threading.Lock()
+        # arbitration_id -> tuple of callbacks, replaced on change so the receive thread never locks
+        self._handlers = {}
+        self._refs = 0
+        self._bus = self._open()
+        # Message type the drivers build for this bus, utils.raw_can.RawFrame on the raw transport
+        self.message_class = getattr(self._bus, "message_class", can.Message)
+        # Orders frames of all hands on this channel by priority class, see utils.bus_scheduler
+        self.scheduler = BusScheduler(self._transmit)
+        # Recovers the channel in the background after send errors, see utils.connection_supervisor
+        self.supervisor = ConnectionSupervisor(self)
+        # Optional utils.flight_recorder.FlightRecorder seeing every frame sent and dispatched
+        self.recorder = None
+        # Optional utils.metrics.Metrics of the receive loop
+        self.metrics = None
+        self.running = True
+        self.receive_thread = threading.Thread(target=self.receive_response)
+        self.receive_thread.daemon = True
+        self.receive_thread.start()
+
+    def _open(self):
+        if self._factory is not None:
+            return self._factory()
+        if self.interface == RAW_INTERFACE:
+            return RawCanBus(self.channel)
+        return can.interface.Bus(channel=self.channel, interface=self.interface, bitrate=self.bitrate)
+
+    def _apply_filters(self):
+        # Let the kernel drop frames that no registered hand cares about
+        filters = [{"can_id": can_id, "can_mask": 0x7FF} for can_id in self._handlers]
+        try:
+            self._bus.set_filters(filters or None)
+        except Exception:
+            pass
+
+    def register(self, can_ids, callback):
+        '''Deliver frames with any of can_ids to callback(msg)'''
+        if isinstance(can_ids, int):
+            can_ids = [can_ids]
+        with self._lock:
+            handlers = dict(self._handlers)
+            for can_id in can_ids:
+                handlers[can_id] = handlers.get(can_id, ()) + (callback,)
+            self._handlers = handlers
+            self._apply_filters()
+
+    def unregister(self, callback):
+        with self._lock:
+            handlers = {}
+            for can_id, callbacks in self._handlers.items():
+                callbacks = tuple(cb for cb in callbacks if cb != callback)
+                if callbacks:
+                    handlers[can_id] = callbacks
+            self._handlers = handlers
+            self._apply_filters()
+
+    def priority(self, priority):
+        '''Context manager sending this thread's frames in a bus_scheduler priority class'''
+        return self.scheduler.priority(priority)
+
+    def set_budget(self, budget):
+        '''Limit this channel to budget frames per second, control frames are never held back'''
+        self.scheduler.set_budget(budget)
+
+    def set_recorder(self, recorder):
+        '''Record every frame sent and dispatched on this channel, None stops recording'''
+        self.recorder = recorder
+
+    def set_metrics(self, metrics):
+        '''Time the dispatch of every received frame into metrics, None stops it'''
+        if metrics is not None:
+            metrics.gauge("scheduler_dropped", lambda: self.scheduler.dropped)
+            metrics.gauge("reconnects", lambda: self.supervisor.reconnects)
+            # 0 connected, 1 degraded, 2 reconnecting
+            metrics.gauge("connection_state", lambda: STATES.index(self.supervisor.state))
+        self.metrics = metrics
+
+    def send(self, msg, timeout=None, priority=None):
+        '''
+        Send one frame through the scheduler, False if it was dropped at its deadline or held while
+        the channel reconnects. A CanError is reported to the supervisor and raised.
+        '''
+        return self._submit([msg], 0.0, priority)
+
+    def send_batch(self, msgs, gap=0.0, priority=None):
+        '''
+        Send frames back-to-back with a fixed inter-frame gap in seconds.
+        Sub-millisecond gaps are spun on perf_counter because time.sleep cannot resolve them.
+        '''
+        return self._submit(msgs, gap, priority)
+
+    def _submit(self, msgs, gap, priority):
+        supervisor = self.supervisor
+        # Only control frames are commands worth replaying, a query answered after the outage is stale
+        control = self.scheduler.current(priority) == CONTROL
+        if supervisor.state == RECONNECTING:
+            # Never wait for the link, the supervisor sends the latest setpoints once it is back
+            if control:
+                supervisor.hold(msgs, gap)
+            return False
+        try:
+            sent = self.scheduler.submit(msgs, gap=gap, priority=priority)
+        except can.CanError as e:
+            supervisor.report_error(e, msgs if control else (), gap)
+            raise
+        if sent and supervisor.state != CONNECTED:
+            supervisor.report_ok()
+        return sent
+
+    def _transmit(self, msgs, gap):
+        last = len(msgs) - 1
+        with self._tx_lock:
+            for i, msg in enumerate(msgs):
+                self._bus.send(msg)
+                recorder = self.recorder
+                if recorder is not None:
+                    recorder.record(msg, TX)
+                if gap > 0 and i < last:
+                    end = time.perf_counter() + gap
+                    if gap > 0.002:
+                        time.sleep(gap - 0.001)
+                    while time.perf_counter() < end:
+                        pass
+
+    def reconnect(self):
+        '''Reopen the socket once for all hands on this channel'''
+        with self._lock:
+            try:
+                self._bus.shutdown()
+            except Exception:
+                pass
+            self._bus = self._open()
+            self._apply_filters()
+
+    def receive_response(self):
+        while self.running:
+            bus = self._bus
+            try:
+                msg = bus.recv(timeout=RECV_TIMEOUT)
+            except can.CanError as e:
+                if bus is not self._bus:
+                    # Socket replaced by reconnect while waiting
+                    continue
+                print(f"Error receiving CAN message: {e}")
+                self.supervisor.report_error(e)
+                # A downed interface fails every recv at once, wait for the supervisor
+                time.sleep(0.01)
+                continue
+            except Exception:
+                # Socket closed under us by reconnect or shutdown
+                if not self.running:
+                    break
+                continue
+            if msg is None:
+                continue
+            metrics = self.metrics
+            if metrics is not None:
+                start = time.perf_counter()
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record(msg, RX)
+            callbacks = self._handlers.get(msg.arbitration_id, ())
+            for callback in callbacks:
+                try:
+                    callback(msg)
+                except Exception as e:
+                    if metrics is not None:
+                        metrics.count("callback_errors", msg.arbitration_id)
+                    ColorMsg(msg=f"Error processing CAN frame 0x{msg.arbitration_id:X}: {e}", color="red")
+            if metrics is not None:
+                if not callbacks:
+                    metrics.count("unrouted_frames", msg.arbitration_id)
+                metrics.observe("rx_loop_seconds", None, time.perf_counter() - start)
+
+    def shutdown(self):
+        '''Release this reference, the socket is closed when the last hand releases it'''
+        CanBusManager.release(self)
+
+    def _close(self):
+        self.running = False
+        self.supervisor.stop()
+        if self.receive_thread.is_alive() and self.receive_thread is not threading.current_thread():
+            self.receive_thread.join(timeout=2)
+        self._bus.shutdown()
+
+
+class CanBusManager:
+    '''Process-wide registry owning one SharedCanBus per channel'''
+    _buses = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, channel, bitrate=1000000, interface=None, factory=None):
+        '''
+        Return the shared bus for channel, opening it on first use.
+        :param factory: optional callable returning a python-can bus, used instead of the default open
+        '''
+        interface = interface or default_interface()
+        with cls._lock:
+            shared = cls._buses.get(channel)
+            if shared is None:
+                shared = SharedCanBus(channel, interface, bitrate, factory=factory)
+                cls._buses[channel] = shared
+            elif shared.bitrate != bitrate:
+                ColorMsg(msg=f"{channel} is already open at {shared.bitrate} bps, ignoring bitrate {bitrate}", color="yellow")
+            shared._refs += 1
+            return shared
+
+    @classmethod
+    def release(cls, shared):
+        with cls._lock:
+            shared._refs -= 1
+            if shared._refs > 0:
+                return
+            if cls._buses.get(shared.channel) is shared:
+                del cls._buses[shared.channel]
+        shared._close()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import time
+import threading
+from collections import OrderedDict
+from utils.color_msg import ColorMsg
+from utils.raw_can import RAW_INTERFACE
+
+# Connection states of a channel
+CONNECTED = "connected"
+DEGRADED = "degraded"
+RECONNECTING = "reconnecting"
+STATES = (CONNECTED, DEGRADED, RECONNECTING)
+# Interfaces on a Linux network device, brought up with ip link before the socket is reopened
+LINK_INTERFACES = ("socketcan", RAW_INTERFACE)
+
+
+class ConnectionSupervisor:
+    '''
+    Connection state machine of one SharedCanBus, recovering the channel without blocking senders.
+
+        connected    -> degraded      on a send or receive error
+        degraded     -> connected     on the next successful send
+        degraded     -> reconnecting  after DEGRADED_ERRORS errors in a row or DEGRADED_TIMEOUT
+                                      seconds without a successful send
+        reconnecting -> connected     once the link is up, the socket reopened and the held frames sent
+
+    While reconnecting a background thread retries with exponential backoff and senders return at
+    once: command frames (the bus_scheduler CONTROL class) are held, only the latest per
+    (arbitration id, frame byte), so the hand gets the newest setpoint when the link is back.
+    Queries are sent in the other classes and dropped, their requesters time out.
+    '''
+    DEGRADED_ERRORS = 3
+    DEGRADED_TIMEOUT = 0.1
+    # Pause between reconnect attempts in seconds, doubled after each failure
+    BACKOFF_MIN = 0.05
+    BACKOFF_MAX = 1.0
+    # Period of the sysfs link check during a pause, a link coming back ends the pause
+    LINK_POLL = 0.01
+    # Most frames held while reconnecting, the oldest is dropped beyond it
+    HOLD_LIMIT = 64
+
+    def __init__(self, bus, open_can=None):
+        '''
+        :param bus: the SharedCanBus supervised
+        :param open_can: utils.open_can.OpenCan bringing a link interface up, None only reopens the socket
+        '''
+        self.bus = bus
+        self.open_can = open_can
+        self.state = CONNECTED
+        self.errors = 0
+        self.reconnects = 0
+        self.last_error = None
+        self._cond = threading.Condition()
+        self._degraded_at = 0.0
+        self._held = OrderedDict()
+        self._gap = 0.0
+        self._listeners = ()
+        self._thread = None
+        self._running = True
+
+    def add_listener(self, callback):
+        '''Call callback(state, previous, error) on every state change, from the thread making it'''
+        with self._cond:
+            self._listeners = self._listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self._cond:
+            self._listeners = tuple(cb for cb in self._listeners if cb != callback)
+
+    def _changed(self, state, previous, error):
+        for callback in self._listeners:
+            try:
+                callback(state, previous, error)
+            except Exception as e:
+                ColorMsg(msg=f"Connection state callback failed: {e}", color="red")
+
+    def _hold(self, msgs, gap):
+        held = self._held
+        for msg in msgs:
+            key = (msg.arbitration_id, msg.data[0])
+            held.pop(key, None)
+            held[key] = msg
+            if len(held) > self.HOLD_LIMIT:
+                held.popitem(last=False)
+        if msgs:
+            self._gap = gap
+
+    def hold(self, msgs, gap=0.0):
+        '''Keep the command frames msgs until the channel is reconnected'''
+        with self._cond:
+            self._hold(msgs, gap)
+
+    def report_error(self, error, msgs=(), gap=0.0):
+        '''Record a failed send or receive, msgs are the command frames that failed to go out'''
+        with self._cond:
+            previous = self.state
+            self.errors += 1
+            self.last_error = error
+            if previous == CONNECTED:
+                self.state = DEGRADED
+                self._degraded_at = time.monotonic()
+            elif previous == DEGRADED and self.errors >= self.DEGRADED_ERRORS:
+                self.state = RECONNECTING
+            if self.state == RECONNECTING:
+                self._hold(msgs, gap)
+            if self._running and self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            state = self.state
+        if state != previous:
+            self._changed(state, previous, error)
+
+    def report_ok(self):
+        '''Record a successful send, a degraded channel counts as connected again'''
+        with self._cond:
+            if self.state != DEGRADED:
+                return
+            self.state = CONNECTED
+            self.errors = 0
+            self._cond.notify_all()
+        self._changed(CONNECTED, DEGRADED, None)
+
+    def _has_link(self):
+        return self.open_can is not None and sys.platform == "linux" and self.bus.interface in LINK_INTERFACES
+
+    def _link_up(self):
+        if not self._has_link():
+            return True
+        channel = self.bus.channel
+        if self.open_can.is_can_up_sysfs(interface=channel):
+            return True
+        self.open_can.open_can(channel)
+        return bool(self.open_can.is_can_up_sysfs(interface=channel))
+
+    def _attempt(self):
+        '''One reconnect attempt, True once the socket is reopened and every held frame sent'''
+        try:
+            if not self._link_up():
+                return False
+            self.bus.reconnect()
+        except Exception as e:
+            self.last_error = e
+            return False
+        while True:
+            with self._cond:
+                if not self._held:
+                    self.state = CONNECTED
+                    self.errors = 0
+                    self.reconnects += 1
+                    return True
+                msgs = list(self._held.values())
+                self._held.clear()
+                gap = self._gap
+            try:
+                self.bus.scheduler.submit(msgs, gap=gap)
+            except Exception as e:
+                self.last_error = e
+                self.hold(msgs, gap)
+                return False
+
+    def _run(self):
+        backoff = self.BACKOFF_MIN
+        while True:
+            with self._cond:
+                if not self._running or self.state == CONNECTED:
+                    self._thread = None
+                    return
+                previous = self.state
+                if previous == DEGRADED:
+                    wait = self._degraded_at + self.DEGRADED_TIMEOUT - time.monotonic()
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    self.state = RECONNECTING
+                error = self.last_error
+            if previous == DEGRADED:
+                self._changed(RECONNECTING, DEGRADED, error)
+            if self._attempt():
+                ColorMsg(msg=f"{self.bus.channel} reconnected", color="green")
+                self._changed(CONNECTED, RECONNECTING, None)
+                backoff = self.BACKOFF_MIN
+                continue
+            # Error reports wake the condition too, only stop() or the link coming up end the pause early
+            deadline = time.monotonic() + backoff
+            link = self._has_link() and not self.open_can.is_can_up_sysfs(interface=self.bus.channel)
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    if not self._running or now >= deadline:
+                        break
+                    self._cond.wait(min(deadline - now, self.LINK_POLL) if link else deadline - now)
+                if link and self.open_can.is_can_up_sysfs(interface=self.bus.channel):
+                    break
+            backoff = min(backoff * 2, self.BACKOFF_MAX)
+
+    def stop(self):
+        '''Stop reconnecting, called when the bus is closed'''
+        with self._cond:
+            self._running = False
+            self._held.clear()
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
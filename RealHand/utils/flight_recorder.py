@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import time
+import itertools
+import numpy as np
+
+# Frame direction
+RX = 0
+TX = 1
+
+MAGIC = b"RHFLIGHT"
+VERSION = 1
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("capacity", "<u4")])
+HEADER_SIZE = 64
+# One fixed-size record per frame. seq counts from 1 across laps of the ring, 0 marks an empty slot.
+# data[0] is the frame byte the drivers decode on, see utils.frame_table.
+RECORD_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("timestamp", "<f8"),
+    ("can_id", "<u4"),
+    ("direction", "u1"),
+    ("dlc", "u1"),
+    ("data", "u1", (8,)),
+], align=True)
+
+
+class FlightRecorder:
+    '''
+    Record CAN frames into a memory-mapped ring file.
+    The file is a small header followed by capacity RECORD_DTYPE records. When the ring is full the
+    oldest frames are overwritten. record() only writes into preallocated column views of the map,
+    so it can be called from the receive thread at kHz rates. The pages belong to the kernel, and a
+    capture survives a crash of the process.
+    '''
+    def __init__(self, path, capacity=1 << 20):
+        self.path = path
+        self.capacity = int(capacity)
+        size = HEADER_SIZE + self.capacity * RECORD_DTYPE.itemsize
+        with open(path, "wb") as f:
+            f.truncate(size)
+        header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["capacity"] = self.capacity
+        header.flush()
+        del header
+        self._records = np.memmap(path, dtype=RECORD_DTYPE, mode="r+", offset=HEADER_SIZE, shape=(self.capacity,))
+        # Plain ndarray views, indexing through the memmap subclass costs several times more
+        records = self._records.view(np.ndarray)
+        self._seq = records["seq"]
+        self._timestamp = records["timestamp"]
+        self._can_id = records["can_id"]
+        self._direction = records["direction"]
+        self._dlc = records["dlc"]
+        self._data = records["data"]
+        # next() on itertools.count is atomic, so the receive and send threads never share a slot
+        self._counter = itertools.count(1)
+
+    def record(self, msg, direction):
+        '''Store one python-can message, direction RX or TX'''
+        seq = next(self._counter)
+        i = (seq - 1) % self.capacity
+        self._timestamp[i] = msg.timestamp or time.time()
+        self._can_id[i] = msg.arbitration_id
+        self._direction[i] = direction
+        n = msg.dlc
+        self._dlc[i] = n
+        self._data[i, :n] = msg.data
+        if n < 8:
+            self._data[i, n:] = 0
+        # Written last, a reader only trusts slots whose seq is set
+        self._seq[i] = seq
+
+    def flush(self):
+        self._records.flush()
+
+    def close(self):
+        '''
+        Flush the capture. The map is released with the recorder, so a frame recorded by a thread
+        that still held it while recording was being stopped lands harmlessly in the ring.
+        '''
+        self.flush()
+
+
+def load_capture(path):
+    '''
+    Load a capture written by FlightRecorder for offline analysis.
+    Return a RECORD_DTYPE array of the recorded frames, oldest first.
+    '''
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) == 0 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path} is not a flight recorder capture")
+    if header["version"][0] != VERSION:
+        raise ValueError(f"{path} has capture version {header['version'][0]}, expected {VERSION}")
+    capacity = int(header["capacity"][0])
+    if os.path.getsize(path) < HEADER_SIZE + capacity * RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is truncated")
+    records = np.fromfile(path, dtype=RECORD_DTYPE, count=capacity, offset=HEADER_SIZE)
+    records = records[records["seq"] > 0]
+    return records[np.argsort(records["seq"], kind="stable")]
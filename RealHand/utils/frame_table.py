@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+def build_frame_table(driver, slots=None, floats=None, matrices=None, handlers=None):
+    '''
+    Build the frame byte -> decoder table used by process_response.
+    Each decoder is called from the receive thread as decode(frame_type, payload).
+    :param slots: {frame_type: attribute}, payload stored on the driver as a list
+    :param floats: {frame_type: attribute}, payload stored as a list of floats
+    :param matrices: {frame_type: (touch type attribute, finger index)}, a 2 byte payload is the
+                     touch type and a 7 byte payload is one matrix row for driver.tactile
+    :param handlers: {frame_type: callable(frame_type, payload)} for frames with their own decoding
+    '''
+    attrs = driver.__dict__
+    table = {}
+    for frame_type, name in (slots or {}).items():
+        table[frame_type] = _slot(attrs, name)
+    for frame_type, name in (floats or {}).items():
+        table[frame_type] = _float_slot(attrs, name)
+    for frame_type, (type_name, finger) in (matrices or {}).items():
+        table[frame_type] = _matrix_row(driver, attrs, type_name, finger)
+    table.update(handlers or {})
+    return table
+
+
+def _slot(attrs, name):
+    # Slots stay fresh lists: getters hand them out and concatenate them
+    def decode(frame_type, data):
+        attrs[name] = list(data)
+    return decode
+
+
+def _float_slot(attrs, name):
+    def decode(frame_type, data):
+        attrs[name] = [float(i) for i in data]
+    return decode
+
+
+def _matrix_row(driver, attrs, type_name, finger):
+    row_map = driver.matrix_map
+    write_row = driver.tactile.write_row
+    notify = driver.reply_waiter.notify
+
+    def decode(frame_type, data):
+        n = len(data)
+        if n == 2:
+            attrs[type_name] = list(data)
+        elif n == 7:
+            index = row_map.get(data[0])
+            if index is not None:
+                # Drop the row flag byte
+                write_row(finger, index, data[1:])
+                # Wake the requester on the last row even if a row was lost, the buffer
+                # then still holds the previous complete matrix
+                if index == 11:
+                    notify(("matrix", frame_type))
+    return decode
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class JointPermutation:
+    '''
+    Index tables between the command pose order used by RealHandApi and the CAN frame order of a model.
+    Built once per model. encode/decode are then a single NumPy gather, with an extra zero slot
+    appended to the source so reserved frame slots and unmapped pose slots read as 0.
+    '''
+    def __init__(self, frame_from_pose, pose_from_frame, frame_len, pose_len):
+        '''
+        :param frame_from_pose: {frame index: pose index or None for a reserved slot}, used by encode
+        :param pose_from_frame: {frame index: pose index} or (frame index, pose index) pairs, used by
+                                decode. Applied in order, so when two frame slots feed one pose slot
+                                the later one wins, as the original loops did.
+        '''
+        self.frame_len = frame_len
+        self.pose_len = pose_len
+        encode = np.full(frame_len, pose_len, dtype=np.intp)
+        for frame_idx, pose_idx in frame_from_pose.items():
+            if pose_idx is not None:
+                encode[frame_idx] = pose_idx
+        decode = np.full(pose_len, frame_len, dtype=np.intp)
+        pairs = pose_from_frame.items() if isinstance(pose_from_frame, dict) else pose_from_frame
+        for frame_idx, pose_idx in pairs:
+            decode[pose_idx] = frame_idx
+        self.encode_index = encode
+        self.decode_index = decode
+
+    @staticmethod
+    def _gather(values, n, index):
+        if len(values) < n:
+            raise IndexError(f"expected {n} values, got {len(values)}")
+        return np.concatenate((np.asarray(values[:n]), [0]))[index]
+
+    def encode(self, pose):
+        '''Command pose (pose_len values) -> frame order list (frame_len values)'''
+        return self._gather(pose, self.pose_len, self.encode_index).tolist()
+
+    def decode(self, frame):
+        '''Frame order state (frame_len values) -> command pose order list'''
+        return self._gather(frame, self.frame_len, self.decode_index).tolist()
@@ -1,3 +1,4 @@
+import numpy as np
 #---------------------------------------------------------------------------------------------------
 # L6 L
 l6_l_min = [0, 0, 0, 0, 0, 0]
@@ -72,218 +73,119 @@ l25_r_max = [0.9, 1.57, 1.57, 1.57, 1.57, 1.3, 0.26, 0.26, 0.26, 0.26, 0.61, 0,
 l25_r_derict = [-1, -1, -1, -1, -1, -1, 0, 0, 0, 0, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1]
 #---------------------------------------------------------------------------------------------------
 
+# (hand_joint, side) -> (min, max, direction) tables used by the vectorized mapping below
+_JOINT_LIMITS = {
+    ("O6", "left"): (o6_l_min, o6_l_max, o6_l_derict),
+    ("O6", "right"): (o6_r_min, o6_r_max, o6_r_derict),
+    ("L7", "left"): (l7_l_min, l7_l_max, l7_l_derict),
+    ("L7", "right"): (l7_r_min, l7_r_max, l7_r_derict),
+    ("L10", "left"): (l10_l_min, l10_l_max, l10_l_derict),
+    ("L10", "right"): (l10_r_min, l10_r_max, l10_r_derict),
+    ("L20", "left"): (l20_l_min, l20_l_max, l20_l_derict),
+    ("L20", "right"): (l20_r_min, l20_r_max, l20_r_derict),
+    ("G20", "left"): (g20_l_min, g20_l_max, g20_l_derict),
+    ("G20", "right"): (g20_r_min, g20_r_max, g20_r_derict),
+    ("L21", "left"): (l21_l_min, l21_l_max, l21_l_derict),
+    ("L21", "right"): (l21_r_min, l21_r_max, l21_r_derict),
+    ("L25", "left"): (l25_l_min, l25_l_max, l25_l_derict),
+    ("L25", "right"): (l25_r_min, l25_r_max, l25_r_derict),
+}
+_joint_maps = {}
+
+
+class _JointMap:
+    """Per-(model, side) vectors, computed once"""
+    def __init__(self, j_min, j_max, j_derict):
+        self.num = len(j_min)
+        self.j_min = np.array(j_min, dtype=np.float64)
+        self.j_max = np.array(j_max, dtype=np.float64)
+        reverse = np.array(j_derict) == -1
+        # Joints with min == max are unused (reserved slots), they always map to 0
+        self.unused = self.j_min == self.j_max
+        # range -> arc: val * (b_max - b_min) / 255 + b_min
+        self.arc_base = np.where(reverse, self.j_max, self.j_min)
+        self.arc_span = np.where(reverse, self.j_min - self.j_max, self.j_max - self.j_min)
+        # arc -> range: (val - min) * (b_max - b_min) / (max - min) + b_min
+        self.range_base = np.where(reverse, 255.0, 0.0)
+        self.range_span = np.where(reverse, -255.0, 255.0)
+        self.arc_width = np.where(self.unused, 1.0, self.j_max - self.j_min)
+
+
+def _joint_map(hand_joint, side):
+    m = _joint_maps.get((hand_joint, side))
+    if m is None:
+        limits = _JOINT_LIMITS.get((hand_joint, side))
+        if limits is None:
+            return None
+        m = _joint_maps[(hand_joint, side)] = _JointMap(*limits)
+    return m
+
+
+def _prepare(values, hand_joint, side, out):
+    m = _joint_map(hand_joint, side)
+    if m is None:
+        raise ValueError(f"No joint mapping for {side} {hand_joint}")
+    x = np.asarray(values, dtype=np.float64)[..., :m.num]
+    if x.shape[-1] != m.num:
+        raise ValueError(f"{hand_joint} needs {m.num} joints, got {x.shape[-1]}")
+    if out is None:
+        out = np.empty(x.shape, dtype=np.float64)
+    return m, x, out
+
+
+def range_to_arc(hand_range, hand_joint, side="left", out=None):
+    """
+    Convert 0~255 joint ranges to radians.
+    hand_range may be one pose or an (N, DoF) array of poses; out is an optional preallocated
+    float64 buffer of the same shape. Lists come back as lists, arrays as arrays.
+    """
+    m, x, res = _prepare(hand_range, hand_joint, side, out)
+    np.clip(x, 0, 255, out=res)
+    res *= m.arc_span
+    res /= 255
+    res += m.arc_base
+    res[..., m.unused] = 0
+    if out is None and not isinstance(hand_range, np.ndarray):
+        return res.tolist()
+    return res
+
+
+def arc_to_range(hand_arc, hand_joint, side="left", out=None):
+    """
+    Convert joint radians to 0~255 ranges.
+    Accepts the same shapes as range_to_arc.
+    """
+    m, x, res = _prepare(hand_arc, hand_joint, side, out)
+    np.clip(x, m.j_min, m.j_max, out=res)
+    res -= m.j_min
+    res *= m.range_span
+    res /= m.arc_width
+    res += m.range_base
+    res[..., m.unused] = 0
+    if out is None and not isinstance(hand_arc, np.ndarray):
+        return res.tolist()
+    return res
+
+
 def range_to_arc_left(left_range,hand_joint):
-    num=0
-    if hand_joint == "O6":
-        num = 6
-        l_min = o6_l_min
-        l_max = o6_l_max
-        l_derict = o6_l_derict
-    elif hand_joint == "L7":
-        num = 7
-        l_min = l7_l_min
-        l_max = l7_l_max
-        l_derict = l7_l_derict
-    elif hand_joint == "L10":
-        num = 10
-        l_min = l10_l_min
-        l_max = l10_l_max
-        l_derict = l10_l_derict
-    elif hand_joint == "L20":
-        num = 20
-        l_min = l20_l_min
-        l_max = l20_l_max
-        l_derict = l20_l_derict
-    elif hand_joint == "G20":
-        num = 20
-        l_min = g20_l_min
-        l_max = g20_l_max
-        l_derict = g20_l_derict
-    elif hand_joint == "L21":
-        num = 25
-        l_min = l21_l_min
-        l_max = l21_l_max
-        l_derict = l21_l_derict
-    hand_arc = [0] * num
-    for i in range(num):
-        if hand_joint == "L20" or hand_joint == "G20":
-            if 11 <= i <= 14: continue
-        if hand_joint == "L21":
-            if 11 <= i <= 14: continue
-            if 16 <= i <= 19: continue
-        val_l = is_within_range(left_range[i], 0, 255)
-        if l_derict[i] == -1:
-            hand_arc[i] = scale_value(val_l, 0, 255, l_max[i], l_min[i])
-        else:
-            hand_arc[i] = scale_value(val_l, 0, 255, l_min[i], l_max[i])
-    return hand_arc
+    if _joint_map(hand_joint, "left") is None:
+        return []
+    return range_to_arc(left_range, hand_joint, "left")
 
 def range_to_arc_right(right_range,hand_joint):
-    num=0
-    if hand_joint == "O6":
-        num = 6
-        r_min = o6_r_min
-        r_max = o6_r_max
-        r_derict = o6_r_derict
-    elif hand_joint == "L7":
-        num = 7
-        r_min = l7_r_min
-        r_max = l7_r_max
-        r_derict = l7_r_derict
-    elif hand_joint == "L10":
-        num = 10
-        r_min = l10_r_min
-        r_max = l10_r_max
-        r_derict = l10_r_derict
-    elif hand_joint == "L20":
-        num = 20
-        r_min = l20_r_min
-        r_max = l20_r_max
-        r_derict = l20_r_derict
-    elif hand_joint == "G20":
-        num = 20
-        r_min = g20_r_min
-        r_max = g20_r_max
-        r_derict = g20_r_derict
-    elif hand_joint == "L21":
-        num = 25
-        r_min = l21_r_min
-        r_max = l21_r_max
-        r_derict = l21_r_derict
-    hand_arc = [0] * num
-    for i in range(num):
-        if hand_joint == "L20" or hand_joint == "G20":
-            if 11 <= i <= 14: continue
-        if hand_joint == "L21":
-            if 11 <= i <= 14: continue
-            if 16 <= i <= 19: continue
-        val_r = is_within_range(right_range[i], 0, 255)
-        if r_derict[i] == -1:
-            hand_arc[i] = scale_value(val_r, 0, 255, r_max[i], r_min[i])
-        else:
-            hand_arc[i] = scale_value(val_r, 0, 255, r_min[i], r_max[i])
-    return hand_arc
-        
-'''
-def arc_to_range_left(left_arc,hand_joint):
-    num=0
-    if hand_joint == "L7":
-        num = 7
-        l_min = l7_l_min
-        l_max = l7_l_max
-        l_derict = l7_l_derict
-    elif hand_joint == "L10":
-        num = 10
-        l_min = l10_l_min
-        l_max = l10_l_max
-        l_derict = l10_l_derict
-    elif hand_joint == "L20":
-        num = 20
-        l_min = l20_l_min
-        l_max = l20_l_max
-        l_derict = l20_l_derict
-    elif hand_joint == "L21":
-        num = 25
-        l_min = l21_l_min
-        l_max = l21_l_max
-        l_derict = l21_l_derict
-    hand_range = [0] * num
-    for i in range(num):
-        if hand_joint == "L20":
-            if 11 <= i <= 14: continue
-        if hand_joint == "L21":
-            if 11 <= i <= 14: continue
-            if 16 <= i <= 19: continue
-        val_l = is_within_range(left_arc[i], 0, 255)
-        if l_derict[i] == -1:
-            hand_range[i] = scale_value(val_l, 0, 255, l_max[i], l_min[i])
-        else:
-            hand_range[i] = scale_value(val_l, 0, 255, l_min[i], l_max[i])
-    return hand_range
-    '''
-def arc_to_range_left(hand_arc_l,hand_joint):
-    num=0
-    if hand_joint == "O6":
-        num = 6
-        l_min = o6_l_min
-        l_max = o6_l_max
-        l_derict = o6_l_derict
-    elif hand_joint == "L7":
-        num = 7
-        l_min = l7_l_min
-        l_max = l7_l_max
-        l_derict = l7_l_derict
-    elif hand_joint == "L10":
-        num = 10
-        l_min = l10_l_min
-        l_max = l10_l_max
-        l_derict = l10_l_derict
-    elif hand_joint == "L20":
-        num = 20
-        l_min = l20_l_min
-        l_max = l20_l_max
-        l_derict = l20_l_derict
-    elif hand_joint == "L21":
-        num = 25
-        l_min = l21_l_min
-        l_max = l21_l_max
-        l_derict = l21_l_derict
-    hand_range = [0] * num
-    #hand_range_l = [0] * 7
-    for i in range(num):
-        if hand_joint == "L20":
-            if 11 <= i <= 14: continue
-        if hand_joint == "L21":
-            if 11 <= i <= 14: continue
-            if 16 <= i <= 19: continue
-        val_l = is_within_range(hand_arc_l[i], l_min[i], l_max[i])
-        if l_derict[i] == -1:
-            hand_range[i] = scale_value(val_l, l_min[i], l_max[i], 255, 0)
-        else:
-            hand_range[i] = scale_value(val_l, l_min[i], l_max[i], 0, 255)
+    if _joint_map(hand_joint, "right") is None:
+        return []
+    return range_to_arc(right_range, hand_joint, "right")
 
-    return hand_range
+def arc_to_range_left(hand_arc_l,hand_joint):
+    if _joint_map(hand_joint, "left") is None:
+        return []
+    return arc_to_range(hand_arc_l, hand_joint, "left")
 
 def arc_to_range_right(right_arc,hand_joint):
-    num=0
-    if hand_joint == "O6":
-        num = 6
-        r_min = o6_r_min
-        r_max = o6_r_max
-        r_derict = o6_r_derict
-    elif hand_joint == "L7":
-        num = 7
-        r_min = l7_r_min
-        r_max = l7_r_max
-        r_derict = l7_r_derict
-    elif hand_joint == "L10":
-        num = 10
-        r_min = l10_r_min
-        r_max = l10_r_max
-        r_derict = l10_r_derict
-    elif hand_joint == "L20":
-        num = 20
-        r_min = l20_r_min
-        r_max = l20_r_max
-        r_derict = l20_r_derict
-    elif hand_joint == "L21":
-        num = 25
-        r_min = l21_r_min
-        r_max = l21_r_max
-        r_derict = l21_r_derict
-    hand_range = [0] * num
-    for i in range(num):
-        if hand_joint == "L20":
-            if 11 <= i <= 14: continue
-        if hand_joint == "L21":
-            if 11 <= i <= 14: continue
-            if 16 <= i <= 19: continue
-        val_r = is_within_range(right_arc[i], r_min[i], r_max[i])
-        if r_derict[i] == -1:
-            hand_range[i] = scale_value(val_r, r_min[i], r_max[i], 255, 0)
-        else:
-            hand_range[i] = scale_value(val_r, r_min[i], r_max[i], 0, 255)
-    return hand_range
+    if _joint_map(hand_joint, "right") is None:
+        return []
+    return arc_to_range(right_arc, hand_joint, "right")
 
 
 
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Log-linear buckets in microseconds as in HdrHistogram: values below SUB_BUCKETS get one bucket
+# each, above that every power of two is split into SUB_BUCKETS / 2 buckets (6.25 % resolution).
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+# Up to 2**36 us, longer samples land in the last bucket
+BUCKETS = SUB_BUCKETS + (36 - SUB_BUCKET_BITS) * HALF_BUCKETS
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Metric name -> label of its key in the Prometheus text, "frame" for the others
+KEY_LABELS = {"api_call_seconds": "method", "unrouted_frames": "can_id", "short_frames": "can_id",
+              "callback_errors": "can_id"}
+PREFIX = "realhand"
+
+
+def _bucket(us):
+    if us < SUB_BUCKETS:
+        return us if us > 0 else 0
+    shift = us.bit_length() - SUB_BUCKET_BITS
+    index = SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (us >> shift) - HALF_BUCKETS
+    return index if index < BUCKETS else BUCKETS - 1
+
+
+def _bucket_value(index):
+    '''Middle of a bucket in seconds'''
+    if index < SUB_BUCKETS:
+        return (index + 0.5) * 1e-6
+    shift = (index - SUB_BUCKETS) // HALF_BUCKETS + 1
+    top = (index - SUB_BUCKETS) % HALF_BUCKETS + HALF_BUCKETS
+    return ((top << shift) + (1 << (shift - 1))) * 1e-6
+
+
+def key_name(key):
+    '''Label value of a metric key: frame bytes in hex, ("matrix", 0xb1) as matrix_0xB1'''
+    if key is None:
+        return ""
+    if isinstance(key, tuple):
+        return "_".join(key_name(k) for k in key)
+    if isinstance(key, int):
+        return f"0x{key:02X}"
+    return str(key)
+
+
+class Histogram:
+    '''
+    Latency histogram with a fixed set of log-linear buckets.
+    record() is an index computation and three additions, so it can stay on the hot path.
+    '''
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[_bucket(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        '''Value in seconds below which a share q of the samples lies, 0.0 when empty'''
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(_bucket_value(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        '''Count, mean, quantiles and max in milliseconds'''
+        snap = {"count": self.count, "mean_ms": round(1000.0 * self.total / self.count, 4) if self.count else 0.0}
+        for q in QUANTILES:
+            snap[f"p{q * 100:g}_ms"] = round(1000.0 * self.percentile(q), 4)
+        snap["max_ms"] = round(1000.0 * self.max, 4)
+        return snap
+
+
+class Metrics:
+    '''
+    Counters and latency histograms of one hand or one bus, keyed by (name, key).
+    The key is a frame byte, a reply key, a method name or None. Updates are not locked: a sample
+    may be lost when two threads update the same entry at once, which is acceptable for statistics.
+    Hooks check `metrics is not None` first, so a component without metrics pays one comparison.
+    '''
+    def __init__(self, labels=None):
+        self.labels = dict(labels or {})
+        self.counters = {}
+        self.histograms = {}
+        # Name -> callable read at snapshot time
+        self.gauges = {}
+        self.started = time.time()
+
+    def count(self, name, key=None, n=1):
+        k = (name, key)
+        self.counters[k] = self.counters.get(k, 0) + n
+
+    def observe(self, name, key, seconds):
+        histogram = self.histograms.get((name, key))
+        if histogram is None:
+            histogram = self.histograms[(name, key)] = Histogram()
+        histogram.record(seconds)
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def timed(self, name, key, fn):
+        '''Wrap fn so each call is observed under (name, key)'''
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(name, key, perf_counter() - start)
+        wrapper.__name__ = getattr(fn, "__name__", name)
+        wrapper.__doc__ = getattr(fn, "__doc__", None)
+        wrapper.__wrapped_metrics__ = self
+        return wrapper
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def snapshot(self):
+        '''{"labels", "uptime_s", "counters", "histograms", "gauges"} with the keys as label strings'''
+        counters = {}
+        for (name, key), n in list(self.counters.items()):
+            counters.setdefault(name, {})[key_name(key)] = n
+        histograms = {}
+        for (name, key), histogram in list(self.histograms.items()):
+            histograms.setdefault(name, {})[key_name(key)] = histogram.snapshot()
+        return {
+            "labels": dict(self.labels),
+            "uptime_s": round(time.time() - self.started, 3),
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": {name: read() for name, read in list(self.gauges.items())},
+        }
+
+    def prometheus(self):
+        return prometheus_text([self])
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(registries):
+    '''
+    Prometheus text exposition of several Metrics, each metric family written once.
+    Counters become <name>_total, histograms summaries in seconds with QUANTILES.
+    '''
+    families = {}
+
+    def add(name, kind, line):
+        families.setdefault(name, (kind, []))[1].append(line)
+
+    for metrics in registries:
+        for (name, key), n in list(metrics.counters.items()):
+            labels = dict(metrics.labels)
+            if key is not None:
+                labels[KEY_LABELS.get(name, "frame")] = key_name(key)
+            family = f"{PREFIX}_{name}_total"
+            add(family, "counter", f"{family}{_labels(labels)} {n}")
+        for (name, key), histogram in list(metrics.histograms.items()):
+            labels = dict(metrics.labels)
+            if key is not None:
+                labels[KEY_LABELS.get(name, "frame")] = key_name(key)
+            family = f"{PREFIX}_{name}"
+            for q in QUANTILES:
+                add(family, "summary", f"{family}{_labels(dict(labels, quantile=q))} {histogram.percentile(q):.9f}")
+            add(family, "summary", f"{family}_sum{_labels(labels)} {histogram.total:.9f}")
+            add(family, "summary", f"{family}_count{_labels(labels)} {histogram.count}")
+        for name, read in list(metrics.gauges.items()):
+            family = f"{PREFIX}_{name}"
+            add(family, "gauge", f"{family}{_labels(metrics.labels)} {read()}")
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(registries, port=9108, host=""):
+    '''
+    Serve prometheus_text(registries()) on http://host:port/metrics from a daemon thread.
+    :param registries: callable returning the Metrics to export, or a list of them
+    Return the server, stop it with server.shutdown().
+    '''
+    source = registries if callable(registries) else (lambda: registries)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = prometheus_text(source()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
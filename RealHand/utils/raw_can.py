@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import errno
+import select
+import socket
+import struct
+from collections import deque
+import can
+
+# Interface name selecting RawCanBus in CanBusManager.acquire and RealHandApi(interface=...)
+RAW_INTERFACE = "rawcan"
+# struct can_frame of linux/can.h: 32 bit id with flags, dlc, 3 padding bytes, 8 data bytes
+CAN_FRAME = struct.Struct("=IB3x8s")
+CAN_HEADER = struct.Struct("=IB")
+FRAME_SIZE = CAN_FRAME.size
+DATA_OFFSET = 8
+CAN_FILTER = struct.Struct("=II")
+CAN_EFF_FLAG = 0x80000000
+CAN_ERR_FLAG = 0x20000000
+CAN_EFF_MASK = 0x1FFFFFFF
+# Most frames read from the socket per wakeup
+BATCH = 64
+# Kernel receive timestamp as ancillary data, struct timespec (value of asm-generic/socket.h)
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+TIMESPEC = struct.Struct("@ll")
+ANCILLARY_SIZE = socket.CMSG_SPACE(TIMESPEC.size)
+
+
+class RawFrame:
+    '''
+    Lightweight stand-in for can.Message with the fields the SDK reads.
+    Takes the same keywords as can.Message, so HandDriver builds it the same way, and data is a
+    bytearray as in can.Message.
+    '''
+    __slots__ = ("arbitration_id", "data", "dlc", "timestamp", "is_extended_id", "is_rx")
+
+    def __init__(self, arbitration_id=0, data=b"", is_extended_id=False, timestamp=0.0, is_rx=False):
+        self.arbitration_id = arbitration_id
+        self.data = data if type(data) is bytearray else bytearray(data)
+        self.dlc = len(self.data)
+        self.timestamp = timestamp
+        self.is_extended_id = is_extended_id
+        self.is_rx = is_rx
+
+    def __repr__(self):
+        return f"RawFrame(arbitration_id=0x{self.arbitration_id:X}, data={self.data.hex(' ')})"
+
+
+class RawCanBus:
+    '''
+    Linux SocketCAN transport on a raw AF_CAN socket, without the python-can message layer.
+    Implements the bus methods SharedCanBus uses: send, recv, set_filters and shutdown.
+    The socket is non-blocking. recv() drains every queued frame into one preallocated buffer with
+    recv_into and hands them out one by one, so a burst of tactile rows costs one poll() wakeup.
+    Received frames are RawFrame objects carrying the kernel receive timestamp (SO_TIMESTAMPNS),
+    the time of the drain where the socket delivers none. One RawFrame per buffer slot is reused:
+    a frame is valid until recv() drains the socket again, copy what must outlive it.
+
+        hand = RealHandApi(hand_joint="L10", can="can0", interface="rawcan")
+
+    Bitrate and link state are configured on the interface (ip link), as for socketcan.
+    '''
+    message_class = RawFrame
+
+    def __init__(self, channel, **kwargs):
+        if not hasattr(socket, "AF_CAN"):
+            raise can.CanInterfaceNotImplementedError("rawcan needs Linux SocketCAN")
+        self.channel = channel
+        self.channel_info = f"raw AF_CAN socket on {channel}"
+        self._sock = self._open_socket(channel)
+        self._sock.setblocking(False)
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        except OSError:
+            pass
+        self._poll = select.poll()
+        self._poll.register(self._sock, select.POLLIN)
+        self._buffer = bytearray(FRAME_SIZE * BATCH)
+        view = memoryview(self._buffer)
+        self._views = [[view[i * FRAME_SIZE:(i + 1) * FRAME_SIZE]] for i in range(BATCH)]
+        # Payload slices of each buffer slot by dlc, and the frame handed out for that slot
+        self._payloads = [[view[i * FRAME_SIZE + DATA_OFFSET:i * FRAME_SIZE + DATA_OFFSET + dlc] for dlc in range(9)]
+                          for i in range(BATCH)]
+        self._frames = [RawFrame(data=bytearray(8), is_rx=True) for _ in range(BATCH)]
+        self._stamps = [None] * BATCH
+        self._tx = bytearray(FRAME_SIZE)
+        self._pending = deque()
+
+    def _open_socket(self, channel):
+        sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        try:
+            sock.bind((channel,))
+        except OSError as e:
+            sock.close()
+            raise can.CanInitializationError(f"Cannot bind {channel}: {e}") from e
+        return sock
+
+    def _drain(self):
+        recvmsg_into = self._sock.recvmsg_into
+        views = self._views
+        stamps = self._stamps
+        n = 0
+        try:
+            while n < BATCH:
+                ancillary = recvmsg_into(views[n], ANCILLARY_SIZE)[1]
+                stamps[n] = ancillary[0][2] if ancillary else None
+                n += 1
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            raise can.CanOperationError(f"Error receiving on {self.channel}: {e}") from e
+        if n == 0:
+            return False
+        now = None
+        unpack_from = CAN_HEADER.unpack_from
+        unpack_stamp = TIMESPEC.unpack
+        buffer = self._buffer
+        payloads = self._payloads
+        frames = self._frames
+        pending = self._pending
+        for i in range(n):
+            can_id, dlc = unpack_from(buffer, i * FRAME_SIZE)
+            if can_id & CAN_ERR_FLAG:
+                continue
+            stamp = stamps[i]
+            if stamp is not None:
+                seconds, nanoseconds = unpack_stamp(stamp)
+                timestamp = seconds + nanoseconds * 1e-9
+            else:
+                if now is None:
+                    now = time.time()
+                timestamp = now
+            frame = frames[i]
+            frame.arbitration_id = can_id & CAN_EFF_MASK
+            # Copied in place from the ring, the frame and its bytearray are reused by the next drain
+            frame.data[:] = payloads[i][dlc if dlc < 8 else 8]
+            frame.dlc = len(frame.data)
+            frame.timestamp = timestamp
+            frame.is_extended_id = bool(can_id & CAN_EFF_FLAG)
+            pending.append(frame)
+        return True
+
+    def recv(self, timeout=None):
+        '''Return the next frame, None if none arrived within timeout seconds'''
+        pending = self._pending
+        if pending:
+            return pending.popleft()
+        # Frames already queued in the socket are read without waiting
+        if not self._drain():
+            if not self._poll.poll(None if timeout is None else timeout * 1000):
+                return None
+            self._drain()
+        return pending.popleft() if pending else None
+
+    def send(self, msg, timeout=None):
+        data = msg.data
+        can_id = msg.arbitration_id | (CAN_EFF_FLAG if msg.is_extended_id else 0)
+        CAN_FRAME.pack_into(self._tx, 0, can_id, len(data), data)
+        sock = self._sock
+        try:
+            try:
+                sock.send(self._tx)
+            except BlockingIOError:
+                # Transmit queue full, wait for room once
+                if not select.select([], [sock], [], 0.1 if timeout is None else timeout)[1]:
+                    raise can.CanOperationError(f"Transmit buffer of {self.channel} full")
+                sock.send(self._tx)
+        except OSError as e:
+            if e.errno == errno.ENOBUFS:
+                raise can.CanOperationError(f"Transmit buffer of {self.channel} full") from e
+            raise can.CanOperationError(f"Failed to transmit on {self.channel}: {e}") from e
+
+    def set_filters(self, filters=None):
+        '''Kernel receive filters as python-can filter dicts, None receives every frame'''
+        if not filters:
+            filters = [{"can_id": 0, "can_mask": 0}]
+        packed = bytearray()
+        for f in filters:
+            can_id, can_mask = f["can_id"], f["can_mask"]
+            if "extended" in f:
+                # Match the frame format too
+                can_mask |= CAN_EFF_FLAG
+                if f["extended"]:
+                    can_id |= CAN_EFF_FLAG
+            packed += CAN_FILTER.pack(can_id, can_mask)
+        self._sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER, bytes(packed))
+
+    def shutdown(self):
+        try:
+            self._poll.unregister(self._sock)
+        except (KeyError, ValueError):
+            pass
+        self._sock.close()
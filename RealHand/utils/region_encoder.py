@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+class RegionEncoder:
+    '''
+    Position command encoder for hands with two position regions: the serial region, one frame per
+    finger (0x41-0x45), and the parallel region, one frame per joint class (0x01-0x06).
+    encode() diffs a pose against the last one encoded and returns the fewest frames of either or
+    both regions that carry every changed joint. Each frame is filled from the new pose, so frames
+    of both regions agree and their order does not matter.
+
+        encoder = RegionEncoder(SERIAL, PARALLEL, pose_len=25)
+        hand.send_commands(encoder.encode(pose))
+
+    The first pose, every full_every-th pose and the pose after reset() send the whole serial
+    region, so a lost frame is repaired without a change of the target.
+    '''
+    def __init__(self, serial, parallel, pose_len, drives=None, full_every=100):
+        '''
+        :param serial: {frame byte: command pose index of each payload byte, None sends 0}
+        :param parallel: the same for the parallel region frames
+        :param drives: {frame byte: pose indices the hand takes from that frame}, defaults to the
+                       payload indices. Needed where a frame repeats pose values in reserved bytes.
+        :param full_every: send the full serial region every full_every poses, 0 never
+        '''
+        drives = drives or {}
+        self.pose_len = pose_len
+        self.full_every = full_every
+        self.payloads = dict(serial)
+        self.payloads.update(parallel)
+        self._serial = [(ft, self._mask(drives.get(ft, indices))) for ft, indices in sorted(serial.items())]
+        self._parallel = [(ft, self._mask(drives.get(ft, indices))) for ft, indices in sorted(parallel.items())]
+        self._parallel_mask = 0
+        for _, mask in self._parallel:
+            self._parallel_mask |= mask
+        self._all_mask = self._parallel_mask
+        for _, mask in self._serial:
+            self._all_mask |= mask
+        # Every subset of the serial frames with the joints it covers, fewest frames first
+        self._subsets = []
+        n = len(self._serial)
+        for bits in range(1 << n):
+            frames = [self._serial[i][0] for i in range(n) if bits >> i & 1]
+            mask = 0
+            for i in range(n):
+                if bits >> i & 1:
+                    mask |= self._serial[i][1]
+            self._subsets.append((frames, mask))
+        self._subsets.sort(key=lambda subset: len(subset[0]))
+        # Changed joint mask -> frames, teleoperation repeats a handful of patterns
+        self._plans = {}
+        self.last = None
+        self._count = 0
+
+    @staticmethod
+    def _mask(indices):
+        mask = 0
+        for i in indices:
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def reset(self):
+        '''Send the full serial region with the next pose'''
+        self.last = None
+
+    def writes(self, data):
+        '''
+        True if the frame data (frame byte first) writes a position frame. Queries of the same
+        bytes carry no payload or a single selector byte, e.g. get_thumb_positions(j=[0]).
+        '''
+        return len(data) > 2 and data[0] in self.payloads
+
+    def invalidate(self, data):
+        '''Forget the last pose once a position frame was written outside encode()'''
+        if self.writes(data):
+            self.last = None
+
+    def plan(self, changed):
+        '''Frame bytes covering the joints set in the changed bit mask with the fewest frames'''
+        frames = self._plans.get(changed)
+        if frames is not None:
+            return frames
+        best = None
+        best_parallel = 0
+        for serial, mask in self._subsets:
+            if best is not None and len(serial) > len(best):
+                break
+            rest = changed & ~mask
+            if rest & ~self._parallel_mask:
+                # A joint only the serial region drives is left out
+                continue
+            parallel = [ft for ft, pmask in self._parallel if rest & pmask]
+            cost = len(serial) + len(parallel)
+            # Ties keep the serial region, the one the drivers always used
+            if best is None or cost < len(best) or (cost == len(best) and len(parallel) < best_parallel):
+                best = serial + parallel
+                best_parallel = len(parallel)
+        frames = tuple(best)
+        self._plans[changed] = frames
+        return frames
+
+    def encode(self, pose):
+        '''Return the (frame byte, payload) list carrying the joints of pose that changed'''
+        last = self.last
+        self._count += 1
+        if last is None or (self.full_every and self._count >= self.full_every):
+            frames = tuple(ft for ft, _ in self._serial)
+            self._count = 0
+        else:
+            changed = 0
+            for i in range(self.pose_len):
+                if pose[i] != last[i]:
+                    changed |= 1 << i
+            changed &= self._all_mask
+            frames = self.plan(changed) if changed else ()
+        self.last = list(pose[:self.pose_len])
+        return [(ft, [pose[i] if i is not None else 0 for i in self.payloads[ft]]) for ft in frames]
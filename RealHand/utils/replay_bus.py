@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import threading
+import can
+from utils.flight_recorder import RX, load_capture
+
+
+class ReplayBus(can.BusABC):
+    '''
+    python-can bus replaying the received frames of a flight recorder capture.
+    Open it as the shared bus of a channel, then build the driver on that channel. Recorded frames
+    reach process_response through the normal receive thread:
+
+        replay = ReplayBus("capture.bin", speed=None)
+        CanBusManager.acquire("replay", factory=lambda: replay)
+        hand = RealHandL10Can(can_id=0x27, can_channel="replay")
+        replay.play()
+        replay.wait_done()
+
+    Frames sent by the driver are counted and discarded.
+    '''
+    def __init__(self, capture, speed=1.0, paused=True, channel="replay", can_filters=None, **kwargs):
+        '''
+        :param capture: capture file path or the array returned by utils.flight_recorder.load_capture
+        :param speed: 1.0 for recorded timing, 10.0 for ten times faster, None or 0 as fast as possible
+        :param paused: hold the frames back until play(), so the driver can register first
+        '''
+        super().__init__(channel, can_filters=can_filters, **kwargs)
+        self.channel_info = f"Replay of {capture}" if isinstance(capture, str) else "Replay"
+        if isinstance(capture, str):
+            capture = load_capture(capture)
+        rx = capture[capture["direction"] == RX]
+        # Built up front so replaying measures the receive path, not message construction
+        self._messages = [
+            can.Message(timestamp=float(row["timestamp"]), arbitration_id=int(row["can_id"]),
+                        data=bytes(row["data"][:row["dlc"]]), is_extended_id=False, is_rx=True)
+            for row in rx
+        ]
+        self._offsets = [m.timestamp - self._messages[0].timestamp for m in self._messages] if self._messages else []
+        self.speed = speed or None
+        self.index = 0
+        self.sent = 0
+        self._start = None
+        self._playing = threading.Event()
+        self._done = threading.Event()
+        if not paused:
+            self.play()
+
+    def play(self):
+        '''Start, or restart from the current frame, the replay clock'''
+        if self.index < len(self._offsets) and self.speed:
+            self._start = time.perf_counter() - self._offsets[self.index] / self.speed
+        self._playing.set()
+
+    def pause(self):
+        self._playing.clear()
+
+    def wait_done(self, timeout=None):
+        '''Block until every frame was delivered and dispatched, False on timeout'''
+        return self._done.wait(timeout)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def _recv_internal(self, timeout):
+        if not self._playing.wait(timeout):
+            return None, False
+        if self.index >= len(self._messages):
+            # The receive thread only comes back here once the last frame was dispatched
+            self._done.set()
+            time.sleep(min(timeout, 0.05) if timeout is not None else 0.05)
+            return None, False
+        if self.speed:
+            due = self._start + self._offsets[self.index] / self.speed
+            remaining = due - time.perf_counter()
+            if remaining > 0:
+                if timeout is not None and remaining > timeout:
+                    time.sleep(timeout)
+                    return None, False
+                time.sleep(remaining)
+        msg = self._messages[self.index]
+        self.index += 1
+        return msg, False
+
+    def send(self, msg, timeout=None):
+        self.sent += 1
+
+    def shutdown(self):
+        self._playing.set()
+        super().shutdown()
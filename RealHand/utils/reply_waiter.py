@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import asyncio
+import threading
+
+
+class ReplyWaiter:
+    '''Pending request table keyed by frame type, completed by the receive thread.'''
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # Number of replies received so far for each key
+        self._counts = {}
+        self._waiting = 0
+        # (mark, future, loop) for coroutines awaiting in wait_async
+        self._async_waiters = []
+        # Per thread query pass, see defer() and collect()
+        self._local = threading.local()
+
+    def mark(self, *keys):
+        '''Snapshot reply counters before sending, so a fast reply is never missed.'''
+        if getattr(self._local, "mode", None) == "collect":
+            # Read pass of an async query, the replies are already stored unless the getter took a
+            # branch the send pass did not, see missed()
+            if not self._local.expected.issuperset(keys):
+                self._local.missed = True
+            return None
+        with self._cond:
+            return {key: self._counts.get(key, 0) for key in keys}
+
+    def notify(self, key):
+        '''Called from process_response when a reply for key has been stored.'''
+        with self._cond:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if self._waiting:
+                self._cond.notify_all()
+            if self._async_waiters:
+                for entry in list(self._async_waiters):
+                    if self._done(entry[0]):
+                        self._async_waiters.remove(entry)
+                        entry[2].call_soon_threadsafe(_resolve, entry[1])
+
+    def wait(self, mark, timeout):
+        '''Block until every key in mark got a new reply. Return False on timeout.'''
+        if getattr(self._local, "mode", None) == "defer":
+            # Send pass of an async query, the caller awaits the replies afterwards
+            self._local.pending.append((mark, timeout))
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._done(mark):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._waiting -= 1
+
+    async def wait_async(self, mark, timeout):
+        '''Coroutine version of wait(), completed from the receive thread through the event loop.'''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = (mark, future, loop)
+        with self._cond:
+            if self._done(mark):
+                return True
+            self._async_waiters.append(entry)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._cond:
+                if entry in self._async_waiters:
+                    self._async_waiters.remove(entry)
+
+    def defer(self):
+        '''
+        Start the send pass of an async query on this thread.
+        Request helpers still send, but wait() records (mark, timeout) and returns at once.
+        '''
+        self._local.mode = "defer"
+        self._local.pending = []
+
+    def collect(self, pending=()):
+        '''
+        Start the read pass: mark() returns None so request helpers return without sending.
+        pending are the pairs returned by the send pass, a key marked outside them is a miss.
+        '''
+        self._local.mode = "collect"
+        self._local.expected = {key for mark, _ in pending for key in mark}
+        self._local.missed = False
+
+    def missed(self):
+        '''True when the read pass marked a key the send pass did not request'''
+        return getattr(self._local, "missed", False)
+
+    def deferring(self):
+        '''True during the send pass of an async query on this thread'''
+        return getattr(self._local, "mode", None) == "defer"
+
+    def finish(self):
+        '''End the current pass and return the (mark, timeout) pairs recorded by defer().'''
+        pending = getattr(self._local, "pending", [])
+        self._local.mode = None
+        self._local.pending = []
+        self._local.missed = False
+        return pending
+
+    def _done(self, mark):
+        for key, count in mark.items():
+            if self._counts.get(key, 0) <= count:
+                return False
+        return True
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
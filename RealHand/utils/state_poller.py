@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import threading
+from contextlib import nullcontext
+from collections import namedtuple
+from utils.color_msg import ColorMsg
+from utils.bus_scheduler import STATE, DIAGNOSTICS
+
+# Immutable snapshot published by StatePoller. Each field is a tuple (or None before the
+# first successful read) and has its own time.monotonic() stamp in `stamps`. On CAN hands `samples`
+# holds the (receive timestamp, seq) of each field, see HandDriver.get_sample_time().
+HandState = namedtuple("HandState", ["state", "speed", "torque", "temperature", "fault", "stamps", "samples"])
+
+
+class StatePoller:
+    '''
+    Background telemetry poller for one hand.
+    Position is queried at a high rate, speed/torque at a medium rate and temperature/fault
+    at a low rate. Readers call latest() and never touch the bus.
+    On CAN the status group is sent as diagnostics traffic, behind commands and state queries.
+    '''
+    # rate group -> bus priority class
+    PRIORITIES = {"state_hz": STATE, "speed_hz": STATE, "status_hz": DIAGNOSTICS}
+    # field -> (driver getter, rate group)
+    FIELDS = (
+        ("state", "get_current_status", "state_hz"),
+        ("speed", "get_speed", "speed_hz"),
+        ("torque", "get_torque", "speed_hz"),
+        ("temperature", "get_temperature", "status_hz"),
+        ("fault", "get_fault", "status_hz"),
+    )
+    # field -> driver sample time group
+    SAMPLE_GROUPS = {"state": "position", "speed": "speed", "torque": "torque",
+                     "temperature": "temperature", "fault": "fault"}
+
+    def __init__(self, hand, state_hz=100, speed_hz=20, status_hz=2):
+        self.hand = hand
+        rates = {"state_hz": state_hz, "speed_hz": speed_hz, "status_hz": status_hz}
+        # Only poll what the driver implements and what has a positive rate
+        self._tasks = []
+        for field, getter, group in self.FIELDS:
+            fn = getattr(hand, getter, None)
+            if fn is not None and rates[group] > 0:
+                self._tasks.append([field, fn, 1.0 / rates[group], 0.0, self.PRIORITIES[group]])
+        # RS485 drivers have no receive stamps
+        self._sample_time = getattr(hand, "get_sample_time", None)
+        self._snapshot = HandState(None, None, None, None, None, {}, {})
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def is_running(self):
+        return self._running
+
+    def latest(self):
+        '''Return the most recent HandState. Lock free: the snapshot is replaced, never mutated.'''
+        return self._snapshot
+
+    def _priority(self, priority):
+        bus = getattr(self.hand, "bus", None)
+        if bus is None or not hasattr(bus, "priority"):
+            return nullcontext()
+        return bus.priority(priority)
+
+    def _publish(self, field, value):
+        snap = self._snapshot
+        stamps = dict(snap.stamps)
+        stamps[field] = time.monotonic()
+        samples = snap.samples
+        if self._sample_time is not None:
+            samples = dict(samples)
+            samples[field] = self._sample_time(self.SAMPLE_GROUPS[field])
+        # Single reference assignment, readers always see a complete snapshot
+        self._snapshot = snap._replace(**{field: tuple(value), "stamps": stamps, "samples": samples})
+
+    def _loop(self):
+        while self._running:
+            now = time.monotonic()
+            # Earliest due task first
+            task = min(self._tasks, key=lambda t: t[3], default=None)
+            if task is None:
+                break
+            if task[3] > now:
+                time.sleep(min(task[3] - now, 0.01))
+                continue
+            field, fn, period, _, priority = task
+            task[3] = max(task[3] + period, now)
+            try:
+                with self._priority(priority):
+                    value = fn()
+            except Exception as e:
+                ColorMsg(msg=f"State poller failed to read {field}: {e}", color="red")
+                continue
+            if value is not None:
+                try:
+                    self._publish(field, value)
+                except TypeError:
+                    pass
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+import numpy as np
+
+
+class TactileFrameBuffer:
+    '''
+    Preallocated (5, 12, 6) uint8 tactile frame for the five finger matrices.
+    Rows are collected per finger in a scratch buffer. Once all 12 rows of a finger have arrived
+    the finger is copied into the back buffer, which is swapped with the front buffer readers see,
+    and seq is incremented. Readers therefore never see a half written finger.
+    '''
+    FINGERS = 5
+    ROWS = 12
+    COLS = 6
+    FULL_MASK = (1 << ROWS) - 1
+
+    def __init__(self):
+        shape = (self.FINGERS, self.ROWS, self.COLS)
+        self._rows = np.zeros(shape, dtype=np.uint8)
+        self._front = np.zeros(shape, dtype=np.uint8)
+        self._back = np.zeros(shape, dtype=np.uint8)
+        # Bit n set when row n of the finger being assembled has arrived
+        self._masks = [0] * self.FINGERS
+        self._lock = threading.Lock()
+        # Number of published frames, 0 means no finger has completed yet
+        self.seq = 0
+        # seq at which each finger was last completed
+        self.finger_seq = [0] * self.FINGERS
+
+    def write_row(self, finger, row, data):
+        '''Store one 6 byte row. Return True when this row completed the finger.'''
+        self._rows[finger, row] = data
+        # Row 0 starts a new matrix, drop rows left over from an incomplete one
+        mask = (0 if row == 0 else self._masks[finger]) | (1 << row)
+        if mask != self.FULL_MASK:
+            self._masks[finger] = mask
+            return False
+        self._masks[finger] = 0
+        self._publish(finger)
+        return True
+
+    def _publish(self, finger):
+        back = self._back
+        back[...] = self._front
+        back[finger] = self._rows[finger]
+        with self._lock:
+            self._back = self._front
+            self._front = back
+            self.seq += 1
+            self.finger_seq[finger] = self.seq
+
+    def frame(self):
+        '''
+        Return (frame, seq) for the latest complete frame.
+        frame is a (5, 12, 6) view without copying. Its memory is reused once two more fingers
+        have completed, use snapshot() to keep a frame longer.
+        '''
+        with self._lock:
+            return self._front, self.seq
+
+    def finger(self, finger):
+        '''Copy of one finger (12, 6) in the latest complete frame'''
+        with self._lock:
+            return self._front[finger].copy()
+
+    def fingers(self):
+        '''Five (12, 6) finger arrays copied from the same frame'''
+        frame = self.snapshot()[0]
+        return frame[0], frame[1], frame[2], frame[3], frame[4]
+
+    def snapshot(self, out=None):
+        '''Copy the latest complete frame into out (allocated if None) and return (out, seq)'''
+        with self._lock:
+            if out is None:
+                return self._front.copy(), self.seq
+            np.copyto(out, self._front)
+            return out, self.seq
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import threading
+import numpy as np
+from utils.color_msg import ColorMsg
+from utils.bus_scheduler import TACTILE
+
+# Thumb, index, middle, ring and little finger matrix request frames
+MATRIX_FRAMES = (0xb1, 0xb2, 0xb3, 0xb4, 0xb5)
+
+
+class TactileStreamer:
+    '''
+    Stream full-hand tactile frames at a fixed rate.
+    Each cycle sends the five finger requests back-to-back, waits until every finger has delivered
+    all 12 rows, then calls callback(frame, seq, stamp) with a (5, 12, 6) uint8 copy of the frame,
+    its sequence number and the time.monotonic() stamp at completion.
+    Cycles where a finger did not complete in time are counted in `dropped` and not delivered.
+    '''
+    def __init__(self, hand, callback, rate_hz=30, timeout=None):
+        self.hand = hand
+        self.callback = callback
+        self.period = 1.0 / rate_hz
+        # By default a cycle may use its whole period waiting for rows
+        self.timeout = self.period if timeout is None else timeout
+        self.tactile = getattr(hand, "tactile", None)
+        self.dropped = 0
+        self._seq = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def is_running(self):
+        return self._running
+
+    def _send(self, frame_type):
+        self.hand.send_frame(frame_type, [0xc6], 0)
+
+    def _read_can(self):
+        waiter = self.hand.reply_waiter
+        before = list(self.tactile.finger_seq)
+        mark = waiter.mark(*[("matrix", frame_type) for frame_type in MATRIX_FRAMES])
+        with self.hand.bus.priority(TACTILE):
+            for frame_type in MATRIX_FRAMES:
+                self._send(frame_type)
+        waiter.wait(mark, self.timeout)
+        after = self.tactile.finger_seq
+        if any(after[i] == before[i] for i in range(len(MATRIX_FRAMES))):
+            return None, 0
+        return self.tactile.snapshot()
+
+    def _read_rs485(self):
+        # RS485 hands return each finger matrix in one transaction
+        frame = np.asarray(self.hand.get_matrix_touch(), dtype=np.uint8)
+        self._seq += 1
+        return frame, self._seq
+
+    def _loop(self):
+        deadline = time.monotonic()
+        while self._running:
+            try:
+                if self.tactile is not None:
+                    frame, seq = self._read_can()
+                else:
+                    frame, seq = self._read_rs485()
+            except Exception as e:
+                ColorMsg(msg=f"Tactile stream read failed: {e}", color="red")
+                frame = None
+            if frame is None:
+                self.dropped += 1
+            else:
+                try:
+                    self.callback(frame, seq, time.monotonic())
+                except Exception as e:
+                    ColorMsg(msg=f"Tactile stream callback failed: {e}", color="red")
+            deadline += self.period
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                # Running late, do not try to catch up with a burst of requests
+                deadline = time.monotonic()
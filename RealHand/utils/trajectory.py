@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import time
+import threading
+import numpy as np
+from utils.color_msg import ColorMsg
+
+INTERPOLATIONS = ("linear", "cubic", "minjerk")
+
+
+def sample_trajectory(times, waypoints, rate_hz=200, method="minjerk"):
+    '''
+    Sample a waypoint trajectory at a fixed rate.
+    :param times: N increasing timestamps in seconds, relative to the start of the motion
+    :param waypoints: N x DoF positions in the 0~255 range
+    :param method: "linear", "cubic" (C1 Hermite through the waypoints, at rest at both ends)
+                   or "minjerk" (minimum-jerk blend, at rest at every waypoint)
+    Return a (cycles, DoF) uint8 array of setpoints, the last one being the final waypoint.
+    '''
+    if method not in INTERPOLATIONS:
+        raise ValueError(f"Unknown interpolation {method}, expected one of {INTERPOLATIONS}")
+    times = np.asarray(times, dtype=np.float64)
+    points = np.asarray(waypoints, dtype=np.float64)
+    if points.ndim != 2 or len(times) != len(points) or len(times) < 2:
+        raise ValueError("waypoints must be N x DoF with one timestamp per waypoint, N >= 2")
+    if np.any(np.diff(times) <= 0):
+        raise ValueError("timestamps must be strictly increasing")
+    t = times[0] + np.arange(int(np.floor((times[-1] - times[0]) * rate_hz)) + 1) / rate_hz
+    if t[-1] < times[-1]:
+        t = np.append(t, times[-1])
+    # Segment of every sample and its normalised phase
+    seg = np.clip(np.searchsorted(times, t, side="right") - 1, 0, len(times) - 2)
+    dt = times[seg + 1] - times[seg]
+    tau = ((t - times[seg]) / dt)[:, None]
+    p0 = points[seg]
+    p1 = points[seg + 1]
+    if method == "linear":
+        out = p0 + (p1 - p0) * tau
+    elif method == "minjerk":
+        out = p0 + (p1 - p0) * (tau ** 3 * (10 - 15 * tau + 6 * tau ** 2))
+    else:
+        # Finite-difference tangents on the non-uniform grid, zero at both ends
+        vel = np.zeros_like(points)
+        vel[1:-1] = (points[2:] - points[:-2]) / (times[2:] - times[:-2])[:, None]
+        m0 = vel[seg] * dt[:, None]
+        m1 = vel[seg + 1] * dt[:, None]
+        tau2 = tau * tau
+        tau3 = tau2 * tau
+        out = ((2 * tau3 - 3 * tau2 + 1) * p0 + (tau3 - 2 * tau2 + tau) * m0
+               + (-2 * tau3 + 3 * tau2) * p1 + (tau3 - tau2) * m1)
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+
+class TrajectoryExecutor:
+    '''
+    Stream precomputed setpoints to a hand from a dedicated thread.
+    Cycle k is sent at start + k / rate_hz on an absolute clock, so timing does not drift with the
+    cost of each send. A cycle that starts more than one period late is an overrun: the stale
+    setpoints are skipped and the motion stays on its timeline.
+    '''
+    def __init__(self, send, setpoints, rate_hz=200, realtime=True):
+        '''
+        :param send: send(list_of_int) taking one setpoint, e.g. hand.set_joint_positions
+        :param setpoints: (cycles, DoF) array from sample_trajectory
+        :param realtime: try to run the thread with SCHED_FIFO (needs CAP_SYS_NICE on Linux)
+        '''
+        self.send = send
+        self.setpoints = np.asarray(setpoints)
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.realtime = realtime
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped = 0
+        # Lateness of every sent cycle versus its deadline, in seconds
+        self.lateness = np.zeros(len(self.setpoints))
+        self._running = False
+        self._thread = None
+        self._done = threading.Event()
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._done.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def wait(self, timeout=None):
+        '''Block until the trajectory finished or was stopped, False on timeout'''
+        return self._done.wait(timeout)
+
+    def is_running(self):
+        return self._running
+
+    def stats(self):
+        '''Timing report: sent cycles, overruns, skipped setpoints and lateness in milliseconds'''
+        late = self.lateness[:self.cycles] * 1000.0
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "late_mean_ms": float(late.mean()) if self.cycles else 0.0,
+            "late_max_ms": float(late.max()) if self.cycles else 0.0,
+            "jitter_ms": float(late.std()) if self.cycles else 0.0,
+        }
+
+    def _raise_priority(self):
+        if not self.realtime or not hasattr(os, "sched_setscheduler"):
+            return
+        try:
+            # pid 0 is the calling thread on Linux
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(10))
+        except (OSError, AttributeError):
+            pass
+
+    def _loop(self):
+        self._raise_priority()
+        setpoints = self.setpoints
+        total = len(setpoints)
+        period = self.period
+        start = time.perf_counter()
+        k = 0
+        try:
+            while self._running and k < total:
+                deadline = start + k * period
+                remaining = deadline - time.perf_counter()
+                if remaining > 0.001:
+                    time.sleep(remaining - 0.001)
+                while time.perf_counter() < deadline:
+                    pass
+                late = time.perf_counter() - deadline
+                if late > period and k < total - 1:
+                    # Skip to the setpoint due now, the last one is always sent
+                    behind = min(int(late / period), total - 1 - k)
+                    self.overruns += 1
+                    self.skipped += behind
+                    k += behind
+                    late -= behind * period
+                try:
+                    self.send([int(v) for v in setpoints[k]])
+                except Exception as e:
+                    ColorMsg(msg=f"Trajectory send failed at cycle {k}: {e}", color="red")
+                self.lateness[self.cycles] = late
+                self.cycles += 1
+                k += 1
+        finally:
+            self._running = False
+            self._done.set()
+        if self.overruns:
+            stats = self.stats()
+            ColorMsg(msg=f"Trajectory finished with {self.overruns} overruns, {self.skipped} setpoints skipped, "
+                         f"max lateness {stats['late_max_ms']:.2f} ms", color="yellow")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import importlib
+import threading
+from collections import deque
+import can
+import numpy as np
+
+# Model -> driver class whose protocol description (core.can.hand_driver attributes) the simulator answers
+MODELS = {
+    "L6": ("core.can.real_hand_l6_can", "RealHandL6Can"),
+    "O6": ("core.can.real_hand_o6_can", "RealHandO6Can"),
+    "L7": ("core.can.real_hand_l7_can", "RealHandL7Can"),
+    "L10": ("core.can.real_hand_l10_can", "RealHandL10Can"),
+    "L20": ("core.can.real_hand_l20_can", "RealHandL20Can"),
+    "G20": ("core.can.real_hand_g20_can", "RealHandG20Can"),
+    "L21": ("core.can.real_hand_l21_can", "RealHandL21Can"),
+    "L24": ("core.can.real_hand_l24_can", "RealHandL24Can"),
+    "L25": ("core.can.real_hand_l25_can", "RealHandL25Can"),
+}
+# Frame byte -> payload answered before the first write. A list of payloads answers with several frames.
+PRESETS = {
+    "L6": {0x01: [255] * 6, 0x33: [35] * 6, 0xC0: [[i, 0, 0, 0, 0, 0, 0] for i in range(4)]},
+    "O6": {0x01: [255] * 6, 0x33: [35] * 6},
+    "L7": {0x01: [255] * 7, 0x33: [35] * 7},
+    "L10": {0x01: [255] * 6, 0x04: [255] * 4, 0x33: [35] * 5, 0x34: [35] * 5},
+}
+DEFAULT_PAYLOAD = [0] * 6
+VERSION = [1, 0, 0, 0, 0, 0]
+# Query payload asking for the 12 rows of a tactile matrix
+MATRIX_QUERY = 0xc6
+
+
+class VirtualHand:
+    '''
+    In-process simulated hand on a python-can "virtual" channel, for tests and benchmarks without hardware.
+    Frames addressed to can_id with at most one payload byte are queries, answered with the current
+    payload of that frame. Longer frames are writes: the payload is stored and read back by the next
+    query, so commanded positions, speeds and torques are reached at once. Tactile matrix frames of
+    the model answer their touch type, or 12 rows of self.tactile on a 0xc6 query.
+
+        sim = VirtualHand("L10", can_id=0x27, channel="sim0").start()
+        hand = RealHandApi(hand_type="right", hand_joint="L10", can="sim0", interface="virtual")
+
+    Any number of hands with different can_id can share a channel.
+    '''
+    def __init__(self, model="L10", can_id=0x27, channel="sim0", latency=0.0, state=None):
+        '''
+        :param latency: seconds between a query and its reply
+        :param state: {frame byte: payload} overriding the model presets
+        '''
+        module, name = MODELS[model.upper()]
+        driver = getattr(importlib.import_module(module), name)
+        self.model = model.upper()
+        self.can_id = can_id
+        self.channel = channel
+        self.latency = latency
+        self.state = {ft: payload for ft, payload in PRESETS.get(self.model, {}).items()}
+        for ft, attr in driver.SLOTS.items():
+            if attr == "version":
+                self.state[ft] = list(VERSION)
+        for ft in driver.MATRICES:
+            # Touch type 2 is the matrix sensor, see get_touch_type of the drivers
+            self.state[ft] = [2, 0]
+        if driver.MATRICES:
+            self.state[0xb0] = [2]
+        self.state.update(state or {})
+        # Frame byte -> finger of the tactile matrix frames
+        self.matrix_fingers = {ft: finger for ft, (_, finger) in driver.MATRICES.items()}
+        # All finger data frame -> per-finger frames of its fields, answered from their current payloads
+        all_data = getattr(driver, "ALL_DATA_FRAMES", ())
+        self.all_data = {ft: [base + finger for _, base in driver.ALL_DATA_FIELDS] for finger, ft in enumerate(all_data)}
+        # Parallel region position frame -> [(payload byte, finger frame, slot)] it moves, so finger
+        # frames read back positions written per joint class
+        drives = driver.POSITION_FRAME_DRIVES or {}
+        slots = {}
+        for ft, indices in driver.SERIAL_POSITION_FRAMES.items():
+            for slot, i in enumerate(indices):
+                if i is not None and i in drives.get(ft, indices):
+                    slots[i] = (ft, slot)
+        self.parallel = {
+            ft: [(k, slots[i][0], slots[i][1]) for k, i in enumerate(indices) if i in slots and i in drives.get(ft, indices)]
+            for ft, indices in driver.PARALLEL_POSITION_FRAMES.items()
+        }
+        # Thumb, index, middle, ring and little finger 12x6 matrices answered to matrix queries
+        self.tactile = np.zeros((5, 12, 6), dtype=np.uint8)
+        self.queries = 0
+        self.writes = 0
+        self._pending = deque()
+        self._bus = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._bus = can.Bus(channel=self.channel, interface="virtual")
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._bus is not None:
+            self._bus.shutdown()
+            self._bus = None
+
+    def is_running(self):
+        return self._running
+
+    def _replies(self, frame_type, payload):
+        finger = self.matrix_fingers.get(frame_type)
+        if finger is not None and payload == [MATRIX_QUERY]:
+            return [[frame_type, row << 4] + self.tactile[finger, row].tolist() for row in range(12)]
+        fields = self.all_data.get(frame_type)
+        if fields is not None:
+            return [[frame_type, i] + list(self.state.get(ft, DEFAULT_PAYLOAD))[:6] for i, ft in enumerate(fields)]
+        data = self.state.get(frame_type, DEFAULT_PAYLOAD)
+        if data and isinstance(data[0], list):
+            return [[frame_type] + d for d in data]
+        return [[frame_type] + list(data)]
+
+    def _handle(self, msg):
+        frame_type = msg.data[0]
+        payload = list(msg.data[1:])
+        if len(payload) > 1:
+            self.state[frame_type] = payload
+            for k, ft, slot in self.parallel.get(frame_type, ()):
+                if k < len(payload):
+                    finger = list(self.state.get(ft, DEFAULT_PAYLOAD))
+                    finger[slot] = payload[k]
+                    self.state[ft] = finger
+            self.writes += 1
+            return
+        self.queries += 1
+        due = time.perf_counter() + self.latency
+        for data in self._replies(frame_type, payload):
+            self._pending.append((due, can.Message(arbitration_id=self.can_id, data=data, is_extended_id=False)))
+
+    def _loop(self):
+        bus = self._bus
+        pending = self._pending
+        while self._running:
+            # Replies share one latency, so the queue is ordered by due time
+            while pending and pending[0][0] <= time.perf_counter():
+                bus.send(pending.popleft()[1])
+            timeout = 0.1 if not pending else max(pending[0][0] - time.perf_counter(), 0)
+            msg = bus.recv(timeout)
+            if msg is not None and msg.arbitration_id == self.can_id and len(msg.data) > 0:
+                self._handle(msg)